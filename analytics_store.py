@@ -0,0 +1,161 @@
+"""
+Analytics Store
+SQLite (WAL) replacement for the read-modify-write analytics.json file.
+Every write is a single O(1) transaction, so concurrent workers can't lose
+counts, and the admin dashboard reads pre-aggregated counters instead of
+re-scanning every visitor.
+
+Tables:
+- visitors:  one row per unique visitor, keyed by a hash of the IP
+- counters:  named totals (total_visitors, usage_count)
+- daily:     unique visitors per day
+- locations: unique visitors per location
+"""
+
+import os
+import json
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime
+
+# ============ CONFIGURATION ============
+ANALYTICS_DB = os.environ.get('ANALYTICS_DB', 'analytics.db')
+
+
+def visitor_key(ip):
+    """Hash index key for unique-visitor lookups"""
+    return hashlib.sha1((ip or '').encode('utf-8')).hexdigest()
+
+
+class AnalyticsStore:
+    """Visitor/usage counters with pre-aggregated daily and location summaries"""
+
+    def __init__(self, path=ANALYTICS_DB):
+        self.path = path
+        self._local = threading.local()
+
+        conn = self._conn()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS visitors (
+                key TEXT PRIMARY KEY,
+                ip TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                location TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_visitors_timestamp ON visitors(timestamp);
+            CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+            CREATE TABLE IF NOT EXISTS daily (day TEXT PRIMARY KEY, visits INTEGER NOT NULL);
+            CREATE TABLE IF NOT EXISTS locations (location TEXT PRIMARY KEY, visitors INTEGER NOT NULL);
+        """)
+        conn.commit()
+
+    def _conn(self):
+        """One connection per thread (sqlite3 connections are not thread-safe)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _bump(conn, table, column, key_column, key, delta=1):
+        conn.execute(
+            f"INSERT INTO {table} ({key_column}, {column}) VALUES (?, ?) "
+            f"ON CONFLICT({key_column}) DO UPDATE SET {column} = {column} + excluded.{column}",
+            (key, delta)
+        )
+
+    # --- Writes ---
+
+    def has_visitor(self, ip):
+        row = self._conn().execute("SELECT 1 FROM visitors WHERE key = ?", (visitor_key(ip),)).fetchone()
+        return row is not None
+
+    def record_visit(self, ip, location='Unknown', timestamp=None):
+        """Register a visitor; returns True only the first time this IP is seen"""
+        timestamp = timestamp or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        conn = self._conn()
+        with conn:
+            inserted = conn.execute(
+                "INSERT OR IGNORE INTO visitors (key, ip, timestamp, location) VALUES (?, ?, ?, ?)",
+                (visitor_key(ip), ip, timestamp, location)
+            ).rowcount
+            if inserted:
+                self._bump(conn, 'counters', 'value', 'name', 'total_visitors')
+                self._bump(conn, 'daily', 'visits', 'day', timestamp.split(' ')[0])
+                self._bump(conn, 'locations', 'visitors', 'location', location)
+        return bool(inserted)
+
+    def set_location(self, ip, location):
+        """Fill in a visitor's location once it has been resolved, moving the location counter"""
+        conn = self._conn()
+        with conn:
+            row = conn.execute("SELECT location FROM visitors WHERE key = ?", (visitor_key(ip),)).fetchone()
+            if row is None or row[0] == location:
+                return False
+            conn.execute("UPDATE visitors SET location = ? WHERE key = ?", (location, visitor_key(ip)))
+            self._bump(conn, 'locations', 'visitors', 'location', row[0], -1)
+            self._bump(conn, 'locations', 'visitors', 'location', location)
+        return True
+
+    def record_usage(self, count=1):
+        conn = self._conn()
+        with conn:
+            self._bump(conn, 'counters', 'value', 'name', 'usage_count', count)
+
+    # --- Reads ---
+
+    def summary(self, recent=10):
+        """Everything the admin dashboard shows, without scanning visitors"""
+        conn = self._conn()
+        counters = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+        daily = conn.execute("SELECT day, visits FROM daily ORDER BY day DESC").fetchall()
+        locations = conn.execute("SELECT location, visitors FROM locations WHERE visitors > 0 "
+                                 "ORDER BY visitors DESC").fetchall()
+        recent_rows = conn.execute("SELECT ip, timestamp, location FROM visitors "
+                                   "ORDER BY timestamp DESC LIMIT ?", (recent,)).fetchall()
+        return {
+            'total_visitors': counters.get('total_visitors', 0),
+            'usage_count': counters.get('usage_count', 0),
+            'daily_stats': dict(daily),
+            'locations': dict(locations),
+            'recent_visitors': [{'ip': ip, 'timestamp': ts, 'location': loc} for ip, ts, loc in recent_rows],
+        }
+
+    # --- Migration ---
+
+    def import_json(self, json_path):
+        """One-time import of the legacy analytics.json (skipped once migrated)"""
+        conn = self._conn()
+        if conn.execute("SELECT 1 FROM counters WHERE name = 'migrated_json'").fetchone():
+            return False
+        if not os.path.exists(json_path):
+            return False
+        with open(json_path, 'r') as f:
+            data = json.load(f)
+        for v in data.get('visitors', []):
+            if v.get('ip'):
+                self.record_visit(v['ip'], v.get('location', 'Unknown'),
+                                  v.get('timestamp') or datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        with conn:
+            self._bump(conn, 'counters', 'value', 'name', 'usage_count', data.get('usage_count', 0))
+            self._bump(conn, 'counters', 'value', 'name', 'migrated_json')
+        return True
+
+
+# ============ SHARED INSTANCE ============
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_analytics_store():
+    """Return the shared AnalyticsStore"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = AnalyticsStore()
+    return _store
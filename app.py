@@ -4,7 +4,7 @@ import uuid
 import urllib.parse
 
 # Flask related imports
-from flask import Flask, render_template, request, jsonify, send_from_directory, flash, redirect, url_for, send_file, session
+from flask import Flask, render_template, request, jsonify, send_from_directory, flash, redirect, url_for, send_file, session, Response
 from functools import wraps
 from werkzeug.utils import secure_filename
 
@@ -17,6 +17,12 @@ import json
 import requests
 from datetime import datetime, timedelta
 
+from job_queue import get_job_backend, QueueFullError, FINISHED, FAILED
+from conversion_pool import get_conversion_pool
+from conversion_cache import get_conversion_cache
+from analytics_store import get_analytics_store
+from geoip import get_geolocator
+
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'royal-enfield-racing-green-2026' # Change this for production
 app.config['ADMIN_USER'] = 'bapattanmay'
@@ -26,6 +32,7 @@ app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['ANALYTICS_FILE'] = 'analytics.json'
 app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50MB
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+FILE_TTL = 5 * 60  # Uploads and results are auto-deleted after 5 minutes
 
 # Authentication Decorator
 def admin_required(f):
@@ -57,10 +64,11 @@ def logout():
     session.pop('admin_logged_in', None)
     return redirect(url_for('login'))
 
-# Initialize Analytics File
-if not os.path.exists(app.config['ANALYTICS_FILE']):
-    with open(app.config['ANALYTICS_FILE'], 'w') as f:
-        json.dump({"visitors": [], "usage_count": 0}, f)
+# Initialize Analytics Store (imports the legacy analytics.json once)
+try:
+    get_analytics_store().import_json(app.config['ANALYTICS_FILE'])
+except Exception as e:
+    print(f"Analytics migration error: {e}")
 
 def log_visit():
     """Log a unique visitor visit with location data"""
@@ -68,55 +76,104 @@ def log_visit():
         # Get public IP (Simple heuristic for demo/local testing)
         ip = request.headers.get('X-Forwarded-For', request.remote_addr)
         
-        # Load current analytics
-        with open(app.config['ANALYTICS_FILE'], 'r') as f:
-            data = json.load(f)
-        
-        # Check if already logged (primitive session tracking)
-        # In a real app, we'd use cookies or a database
-        visitor_ips = [v.get('ip') for v in data['visitors']]
-        if ip not in visitor_ips:
-            # Get location via API (Free tier)
-            location = "Unknown"
-            try:
-                # Using ip-api.com (no key needed for bulk/simple calls)
-                res = requests.get(f"http://ip-api.com/json/{ip}", timeout=2).json()
-                if res.get('status') == 'success':
-                    location = f"{res.get('city')}, {res.get('country')}"
-            except: pass
-            
-            data['visitors'].append({
-                "ip": ip,
-                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                "location": location
-            })
-            
-            with open(app.config['ANALYTICS_FILE'], 'w') as f:
-                json.dump(data, f)
+        # Record immediately; geolocation is resolved by a background worker
+        store = get_analytics_store()
+        geo = get_geolocator()
+        location = geo.cached(ip)
+        if store.record_visit(ip, location or "Unknown") and location is None:
+            geo.enqueue(ip, store.set_location)
     except Exception as e:
         print(f"Tracking error: {e}")
 
 def log_usage():
     """Increment the usage counter for successful service completion"""
     try:
-        with open(app.config['ANALYTICS_FILE'], 'r') as f:
-            data = json.load(f)
-        data['usage_count'] = data.get('usage_count', 0) + 1
-        with open(app.config['ANALYTICS_FILE'], 'w') as f:
-            json.dump(data, f)
+        get_analytics_store().record_usage()
     except Exception as e:
         print(f"Usage logging error: {e}")
 
+# Inputs and outputs of queued/running jobs, kept out of the auto-deletion sweep
+_active_files = set()
+_active_files_lock = threading.Lock()
+
+def enqueue_job(kind, func, *args, files=()):
+    """Hand heavy work to the job backend and return the handle the frontend polls
+    
+    `files` (the job's input and output paths) are not auto-deleted while the
+    job waits in the queue or runs; the input is touched when the job starts,
+    so its 5 minutes count from then.
+    """
+    paths = {os.path.abspath(path) for path in files}
+    with _active_files_lock:
+        _active_files.update(paths)
+    
+    def release():
+        with _active_files_lock:
+            _active_files.difference_update(paths)
+    
+    def run():
+        try:
+            for path in paths:
+                if os.path.exists(path):
+                    os.utime(path)
+            return func(*args)
+        finally:
+            release()
+    
+    try:
+        job_id = get_job_backend().submit(kind, run)
+    except QueueFullError as e:
+        release()
+        return jsonify({'success': False, 'error': str(e)}), 503
+    except Exception:
+        release()
+        raise
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'status_url': f'/jobs/{job_id}',
+        'events_url': f'/jobs/{job_id}/events'
+    }), 202
+
+def lookup_cached_result(input_path, output_path, operation, **params):
+    """Check the result cache for an identical request.
+    
+    Returns (cache_key, metadata); metadata is None on a miss, otherwise the
+    cached output has already been linked to output_path.
+    """
+    cache = get_conversion_cache()
+    if cache is None:
+        return None, None
+    try:
+        cache_key = cache.make_key(input_path, operation, **params)
+        return cache_key, cache.fetch(cache_key, output_path)
+    except Exception as e:
+        print(f"Result cache lookup error: {e}")
+        return None, None
+
+def store_cached_result(cache_key, output_path, **metadata):
+    """Remember a finished output for future identical requests"""
+    cache = get_conversion_cache()
+    if cache is None or cache_key is None:
+        return
+    try:
+        cache.store(cache_key, output_path, **metadata)
+    except Exception as e:
+        print(f"Result cache store error: {e}")
+
 def cleanup_old_files():
-    """Background task to delete files older than 5 minutes"""
+    """Background task to delete files older than 5 minutes (files of pending jobs excepted)"""
     while True:
         try:
             now = time.time()
-            # 300 seconds = 5 minutes
-            threshold = now - 300
+            threshold = now - FILE_TTL
+            with _active_files_lock:
+                active = set(_active_files)
             
             for f in os.listdir(app.config['UPLOAD_FOLDER']):
                 f_path = os.path.join(app.config['UPLOAD_FOLDER'], f)
+                if os.path.abspath(f_path) in active:
+                    continue
                 if os.path.isfile(f_path):
                     # Check file modification time
                     if os.path.getmtime(f_path) < threshold:
@@ -170,51 +227,36 @@ def sitemap():
 def admin_dashboard():
     """Display analytics dashboard"""
     try:
-        with open(app.config['ANALYTICS_FILE'], 'r') as f:
-            data = json.load(f)
-        
-        visitors = data.get('visitors', [])
-        total_visitors = len(visitors)
-        usage_count = data.get('usage_count', 0)
+        # Pre-aggregated counters: locations by count, days newest first, last 10 visitors
+        summary = get_analytics_store().summary(recent=10)
+        total_visitors = summary['total_visitors']
+        usage_count = summary['usage_count']
         
         # Calculate Conversion Rate
         conversion_rate = 0
         if total_visitors > 0:
             conversion_rate = round((usage_count / total_visitors) * 100, 1)
-            
-        # Group by location
-        locations = {}
-        # Group by date
-        daily_stats = {}
-        
-        for v in visitors:
-            # Location stats
-            loc = v.get('location', 'Unknown')
-            locations[loc] = locations.get(loc, 0) + 1
-            
-            # Daily stats
-            try:
-                # v['timestamp'] is like "2026-03-05 15:45:12"
-                date_str = v['timestamp'].split(' ')[0]
-                daily_stats[date_str] = daily_stats.get(date_str, 0) + 1
-            except: pass
-            
-        # Sort locations by count
-        sorted_locations = dict(sorted(locations.items(), key=lambda item: item[1], reverse=True))
-        # Sort daily stats by date (newest first)
-        sorted_daily = dict(sorted(daily_stats.items(), key=lambda item: item[0], reverse=True))
         
         return render_template('admin.html', 
                              total_visitors=total_visitors,
                              usage_count=usage_count,
                              conversion_rate=conversion_rate,
-                             locations=sorted_locations,
-                             daily_stats=sorted_daily,
-                             recent_visitors=visitors[-10:][::-1], # Last 10
+                             locations=summary['locations'],
+                             daily_stats=summary['daily_stats'],
+                             recent_visitors=summary['recent_visitors'],
                              site_name=app.config['SITE_NAME'])
     except Exception as e:
         return f"Dashboard error: {e}", 500
 
+@app.route('/admin/cache-stats')
+@admin_required
+def cache_stats():
+    """Hit-rate and size statistics for the conversion result cache"""
+    cache = get_conversion_cache()
+    if cache is None:
+        return jsonify({'success': False, 'error': 'Result cache is disabled'}), 404
+    return jsonify({'success': True, **cache.stats()})
+
 @app.route('/')
 def home():
     log_visit()
@@ -229,6 +271,91 @@ def health():
     """Simple health check endpoint for keep-alive pings"""
     return jsonify({"status": "healthy", "timestamp": datetime.now().isoformat()}), 200
 
+JOB_EVENTS_HEARTBEAT = 10       # Seconds between keep-alive comments on an idle stream
+JOB_EVENTS_MAX_SECONDS = 30     # Streams are closed after this; EventSource reconnects by itself
+JOB_EVENTS_RETRY_MS = 1000      # Reconnect delay sent to the client
+# Each open stream holds a request thread (gunicorn --threads 8): beyond this
+# many, /jobs/<id>/events answers 503 and the page falls back to polling
+JOB_EVENTS_MAX_STREAMS = int(os.environ.get('JOB_EVENTS_MAX_STREAMS', 4))
+_event_streams = threading.BoundedSemaphore(JOB_EVENTS_MAX_STREAMS)
+
+def result_expired(job):
+    """True once a finished job's output has been auto-deleted (job records are kept longer)"""
+    download_url = (job.get('result') or {}).get('download_url')
+    if job['state'] != FINISHED or not download_url:
+        return False
+    filename = urllib.parse.urlsplit(download_url).path.rsplit('/', 1)[-1]
+    return not os.path.exists(os.path.join(app.config['UPLOAD_FOLDER'], filename))
+
+def job_payload(job):
+    """Public view of a job record (shared by /jobs/<id> and its event stream)"""
+    result = job.get('result') or {}
+    return {
+        'success': True,
+        'job_id': job['id'],
+        'kind': job['kind'],
+        'state': job['state'],
+        'progress': job['progress'],
+        'message': job['message'],
+        'stage': job.get('stage'),
+        'done': job.get('done'),
+        'total': job.get('total'),
+        'rate': job.get('rate'),
+        'error': job['error'],
+        'download_url': result.get('download_url') if job['state'] == FINISHED else None,
+        'result': result if job['state'] == FINISHED else None
+    }
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Report state, progress and (once finished) the download URL of a queued job"""
+    job = get_job_backend().get(job_id)
+    if job is None or result_expired(job):
+        return jsonify({'success': False, 'error': 'Job not found or expired'}), 404
+    return jsonify(job_payload(job))
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    """Server-sent events: the job status every time it changes, until it finishes
+    
+    Streams are short (JOB_EVENTS_MAX_SECONDS) and capped in number, so
+    watchers can't starve the other routes of request threads. The event id
+    is the record's 'updated' stamp, so a reconnecting client only gets
+    changes it has not seen.
+    """
+    backend = get_job_backend()
+    if backend.get(job_id) is None:
+        return jsonify({'success': False, 'error': 'Job not found or expired'}), 404
+    if not _event_streams.acquire(blocking=False):
+        return jsonify({'success': False, 'error': 'Too many open progress streams'}), 503
+    
+    try:
+        since = float(request.headers.get('Last-Event-ID') or 0)
+    except ValueError:
+        since = 0
+    
+    def stream(since):
+        yield f"retry: {JOB_EVENTS_RETRY_MS}\n\n"
+        deadline = time.monotonic() + JOB_EVENTS_MAX_SECONDS
+        while time.monotonic() < deadline:
+            job = backend.wait(job_id, since, timeout=min(JOB_EVENTS_HEARTBEAT, deadline - time.monotonic()))
+            if job is None or result_expired(job):
+                yield f"event: gone\ndata: {json.dumps({'success': False, 'error': 'Job expired'})}\n\n"
+                return
+            if job['updated'] <= since:
+                yield ": keep-alive\n\n"
+                continue
+            since = job['updated']
+            yield f"id: {since!r}\ndata: {json.dumps(job_payload(job))}\n\n"
+            if job['state'] in (FINISHED, FAILED):
+                return
+    
+    response = Response(stream(since), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # Runs when the response is closed, even if the client left before the first event
+    response.call_on_close(_event_streams.release)
+    return response
+
 @app.route('/converter')
 def converter():
     return render_template('converter.html', site_name=app.config['SITE_NAME'])
@@ -246,68 +373,49 @@ def merger():
 def merge_pdfs():
     """Handle PDF and Image merging into a single PDF"""
     if 'files' not in request.files:
-        flash('No files uploaded')
-        return redirect(url_for('merger'))
+        return jsonify({'success': False, 'error': 'No files uploaded'}), 400
     
     files = request.files.getlist('files')
     if not files or files[0].filename == '':
-        flash('No files selected')
-        return redirect(url_for('merger'))
-    
-    from PyPDF2 import PdfMerger
-    from PIL import Image
-    import io
+        return jsonify({'success': False, 'error': 'No files selected'}), 400
     
-    merger = PdfMerger()
     unique_id = str(uuid.uuid4())
     temp_files = []
+    names = []
     
-    try:
-        for file in files:
-            filename = secure_filename(file.filename)
-            ext = os.path.splitext(filename)[1].lower()
-            temp_path = os.path.join(app.config['UPLOAD_FOLDER'], f"tmp_{unique_id}_{filename}")
-            file.save(temp_path)
-            temp_files.append(temp_path)
-            
-            if ext in ['.jpg', '.jpeg', '.png', '.webp', '.bmp', '.tiff']:
-                # Bridge: Convert image to temporary PDF for merging
-                img_pdf_path = temp_path + ".bridge.pdf"
-                img = Image.open(temp_path)
-                if img.mode != 'RGB':
-                    img = img.convert('RGB')
-                img.save(img_pdf_path, "PDF")
-                merger.append(img_pdf_path)
-                temp_files.append(img_pdf_path)
-            else:
-                merger.append(temp_path)
-        
-        output_filename = f"merged_{unique_id}.pdf"
-        output_path = os.path.join(app.config['UPLOAD_FOLDER'], output_filename)
-        
-        with open(output_path, 'wb') as f:
-            merger.write(f)
-        
-        merger.close()
-        
-        # Comprehensive Cleanup
-        for tmp in temp_files:
-            try:
-                if os.path.exists(tmp):
-                    os.remove(tmp)
-            except:
-                pass
-                
-        return send_from_directory(app.config['UPLOAD_FOLDER'], output_filename, as_attachment=True)
+    for file in files:
+        filename = secure_filename(file.filename)
+        temp_path = os.path.join(app.config['UPLOAD_FOLDER'], f"tmp_{unique_id}_{len(temp_files)}_{filename}")
+        file.save(temp_path)
+        temp_files.append(temp_path)
+        names.append(filename)
     
-    except Exception as e:
-        # Cleanup on failure
+    output_filename = f"merged_{unique_id}.pdf"
+
+    def cleanup():
         for tmp in temp_files:
             try:
                 if os.path.exists(tmp): os.remove(tmp)
             except: pass
-        flash(f'Merging failed: {str(e)}')
-        return redirect(url_for('merger'))
+
+    from pdf_merger import plan_merge, iter_merged_pdf
+    try:
+        plan = plan_merge(temp_files, names)
+    except Exception as e:
+        cleanup()
+        return jsonify({'success': False, 'error': f'Merging failed: {str(e)}'}), 400
+
+    def generate():
+        # Pages go out as they are written; uploads are removed when the
+        # stream finishes or the client disconnects
+        try:
+            yield from iter_merged_pdf(plan)
+        finally:
+            cleanup()
+
+    response = Response(generate(), mimetype='application/pdf')
+    response.headers['Content-Disposition'] = f'attachment; filename="{output_filename}"'
+    return response
 
 @app.route('/compressor')
 def compressor():
@@ -348,150 +456,61 @@ def compress():
         output_filename = f"processed_{unique_id}_{filename}"
         output_path = os.path.join(app.config['UPLOAD_FOLDER'], output_filename)
         
+        cache_key, cached = lookup_cached_result(input_path, output_path, 'compress', ext=ext, target_bytes=target_bytes)
+        if cached is not None:
+            return jsonify(run_compress(input_path, output_filename, ext, target_bytes, unit, cached=cached))
+        
+        return enqueue_job('compress', run_compress, input_path, output_filename, ext, target_bytes, unit, cache_key,
+                           files=(input_path, output_path))
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+def run_compress(input_path, output_filename, ext, target_bytes, unit, cache_key=None, cached=None):
+    """Compress an uploaded image/PDF towards target_bytes (runs inside a job worker)
+    
+    `cached` is the result-cache metadata when the route already linked a
+    cached output into place.
+    """
+    try:
+        output_path = os.path.join(app.config['UPLOAD_FOLDER'], output_filename)
+        
         success = False
         message = ""
+        dimensions = {}
 
-        if ext in ['jpg', 'jpeg', 'png', 'webp']:
-            from PIL import Image
-            import io
-            
-            orig_img = Image.open(input_path)
-            orig_format = 'JPEG' if ext in ['jpg', 'jpeg'] else ext.upper()
-            
-            # --- Lever 1: Quality Tuning ---
-            low_q, high_q = 1, 100
-            best_q = 75
-            
-            for _ in range(7):
-                mid_q = (low_q + high_q) // 2
-                buf = io.BytesIO()
-                
-                # Parameters for format
-                params = {'format': orig_format, 'optimize': True}
-                if orig_format in ['JPEG', 'WEBP']: params['quality'] = mid_q
-                elif orig_format == 'PNG': params['compress_level'] = mid_q // 11
-                
-                temp_img = orig_img
-                if temp_img.mode != 'RGB' and orig_format == 'JPEG':
-                    temp_img = temp_img.convert('RGB')
-                    
-                temp_img.save(buf, **params)
-                if buf.tell() <= target_bytes:
-                    best_q = mid_q
-                    low_q = mid_q + 1
-                else:
-                    high_q = mid_q - 1
-
-            # Check if Lever 1 was enough
-            final_buf = io.BytesIO()
-            test_params = {'format': orig_format, 'optimize': True}
-            if orig_format in ['JPEG', 'WEBP']: test_params['quality'] = best_q
-            elif orig_format == 'PNG': test_params['compress_level'] = best_q // 11
-            
-            temp_img = orig_img
-            if temp_img.mode != 'RGB' and orig_format == 'JPEG':
-                temp_img = temp_img.convert('RGB')
-            temp_img.save(final_buf, **test_params)
-            
-            current_size = final_buf.tell()
-            
-            # --- Lever 2: Precision Convergence Loop (v3.0) ---
-            # We iteratively recalibrate dimensions based on actual size feedback
-            current_scale = 1.0
-            tolerance = 0.05 # 5% error margin
-            working_img = orig_img
-            
-            for attempt in range(10):  # Increased iterations for tighter convergence
-                # Calculate dimensions for this pass
-                temp_w = max(1, int(orig_img.width * current_scale))
-                temp_h = max(1, int(orig_img.height * current_scale))
-                
-                # Resize from ORIGINAL to avoid compound blur
-                working_img = orig_img.resize((temp_w, temp_h), Image.Resampling.LANCZOS)
-                if working_img.mode != 'RGB' and orig_format == 'JPEG':
-                    working_img = working_img.convert('RGB')
-                
-                # Check output size
-                buf = io.BytesIO()
-                working_img.save(buf, **test_params)
-                current_size = buf.tell()
-                
-                # Are we close enough? (Within 0.1% or close to target)
-                if abs(current_size - target_bytes) / target_bytes <= 0.001:
-                    break
-                
-                # Recalculate scale based on actual size result
-                size_ratio = target_bytes / current_size
-                # Using 0.5 power for area-proportional scaling
-                scale_adjustment = (size_ratio ** 0.5)
-                
-                # Dampen only if we are oscillating
-                if (size_ratio < 1 and current_scale > 1) or (size_ratio > 1 and current_scale < 1):
-                    scale_adjustment *= 0.98
-                    
-                current_scale *= scale_adjustment
-                
-                # Safety boundaries (0.01x to 32.0x original to support up to 100MB+)
-                current_scale = max(0.01, min(32.0, current_scale))
-
-            # Final Save
-            # Upgrade quality for expansion cases
-            if current_size > os.path.getsize(input_path) * 0.9:
-                from PIL import ImageFilter
-                # Multi-stage enhancement: 
-                # 1. Subtle Gaussian Blur to smooth original artifacts/noise
-                # 2. Strong UnsharpMask to restore edges at NEW resolution
-                working_img = working_img.filter(ImageFilter.GaussianBlur(radius=0.5))
-                working_img = working_img.filter(ImageFilter.UnsharpMask(radius=2, percent=180, threshold=2))
-                test_params['quality'] = 98 # Near lossless for expansion
-
-            working_img.save(output_path, **test_params)
-            
-            # --- Lever 3: Exact Byte Padding (v4.0) ---
-            # After expansion reaches the limits of JPEG/WebP headers, we pad to match target_bytes EXACTLY.
-            final_size = os.path.getsize(output_path)
-            if final_size < target_bytes:
-                padding_needed = int(target_bytes - final_size)
-                # Appending safe NULL bytes to the end of the image container
-                # Most image decoders ignore extra data at the end of the file.
-                with open(output_path, 'ab') as f:
-                    f.write(b'\0' * padding_needed)
-                final_size = os.path.getsize(output_path)
-                message = f"Exact size matched: {final_size} bytes (with precision padding)"
-            else:
-                message = f"Precision calibrated ({unit}) after {attempt+1} passes"
+        if cached is not None:
+            # Identical upload and target already processed
+            success, message = True, cached.get('message', 'Compressed')
+            dimensions = cached.get('dimensions', {})
+        elif ext in ['jpg', 'jpeg', 'png', 'webp']:
+            # Size-model driven: cheap proxy probes, then 1-2 full-resolution checks
+            from image_compressor import compress_image_to_target
+            success, message, dimensions = compress_image_to_target(input_path, output_path, target_bytes, ext, unit)
             
         elif ext == 'pdf':
-            # PDF compression is less granular with PyPDF2
-            from PyPDF2 import PdfReader, PdfWriter
-            reader = PdfReader(input_path)
-            writer = PdfWriter()
-            for page in reader.pages:
-                page.compress_content_streams()
-                writer.add_page(page)
-            
-            with open(output_path, 'wb') as f:
-                writer.write(f)
-            success, message = True, "PDF processed with standard compression"
+            # Image downsampling/recompression + stream dedupe, iterated to the target
+            from pdf_compressor import compress_pdf_to_target
+            success, message = compress_pdf_to_target(input_path, output_path, target_bytes, unit)
         else:
             success, message = False, f"Format {ext} not supported for target-size processing"
 
         if success and os.path.exists(output_path):
+            if cached is None:
+                store_cached_result(cache_key, output_path, message=message, dimensions=dimensions)
             # Usage tracked
             log_usage()
-            return jsonify({
+            return {
                 'success': True,
                 'message': message,
                 'download_url': f'/download/{output_filename}',
                 'filename': output_filename,
-                'original_dim': f"{orig_img.width}x{orig_img.height}",
-                'new_dim': f"{working_img.width}x{working_img.height}"
-            })
+                **dimensions
+            }
         else:
-            return jsonify({'success': False, 'error': message or "Processing failed"}), 500
+            return {'success': False, 'error': message or "Processing failed"}
             
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return {'success': False, 'error': str(e)}
 
 @app.route('/convert', methods=['POST'])
 def convert_file_universal():
@@ -514,33 +533,60 @@ def convert_file_universal():
     # Get file extension
     source_format = os.path.splitext(filename)[1].lower().replace('.', '')
     
+    # PDF page rendering options (DPI and page selection like "1-3,5")
+    options = {}
+    if source_format == 'pdf' and target_format in ('png', 'jpg', 'zip'):
+        options = {'dpi': request.form.get('dpi', type=int), 'pages': request.form.get('pages', '').strip() or None}
+    
     # Generate output filename
     base_name = os.path.splitext(filename)[0]
     output_filename = f"converted_{unique_id}_{base_name}.{target_format}"
     output_path = os.path.join(app.config['UPLOAD_FOLDER'], output_filename)
     
-    # Import converter
+    cache_key, cached = lookup_cached_result(input_path, output_path, 'convert',
+                                             source=source_format, target=target_format, **options)
+    if cached is not None:
+        return jsonify(run_conversion(input_path, output_filename, source_format, target_format, cached=cached))
+    
+    return enqueue_job('convert', run_conversion, input_path, output_filename, source_format, target_format,
+                       cache_key, None, options, files=(input_path, output_path))
+
+def run_conversion(input_path, output_filename, source_format, target_format, cache_key=None, cached=None,
+                   options=None):
+    """Run a FILE_CONVERSIONS entry (runs inside a job worker)"""
     import converter_universal as cv
+    output_path = os.path.join(app.config['UPLOAD_FOLDER'], output_filename)
     
-    # Perform conversion
+    # Perform conversion (in a resource-capped worker process when the pool is available)
+    error_type = None
     try:
-        if source_format in cv.FILE_CONVERSIONS and target_format in cv.FILE_CONVERSIONS[source_format]:
+        pool = get_conversion_pool()
+        if cached is not None:
+            success, message = True, cached.get('message', 'Conversion successful')
+        elif pool is not None:
+            outcome = pool.convert(source_format, target_format, input_path, output_path, options)
+            success = outcome['success']
+            message = outcome.get('message') if success else outcome.get('error')
+            error_type = outcome.get('error_type')
+        elif source_format in cv.FILE_CONVERSIONS and target_format in cv.FILE_CONVERSIONS[source_format]:
             conversion_func = cv.FILE_CONVERSIONS[source_format][target_format]
-            success, message = conversion_func(input_path, output_path)
+            success, message = conversion_func(input_path, output_path, **(options or {}))
         else:
             success, message = False, f"Unsupported conversion from {source_format} to {target_format}"
     except Exception as e:
         success, message = False, str(e)
     
     if success and os.path.exists(output_path):
-        return jsonify({
+        if cached is None:
+            store_cached_result(cache_key, output_path, message=message)
+        return {
             'success': True,
             'message': message,
             'download_url': f'/download/{output_filename}',
             'filename': output_filename
-        })
+        }
     else:
-        return jsonify({'success': False, 'error': message}), 500
+        return {'success': False, 'error': message, 'error_type': error_type or 'error'}
 
 @app.route('/convert-image', methods=['POST'])
 def convert_image():
@@ -554,6 +600,8 @@ def convert_image():
     
     target_format = request.form.get('format', 'jpg')
     quality = int(request.form.get('quality', 90))
+    # Optional cap on the longest side (lets JPEG sources decode at reduced size)
+    max_dimension = request.form.get('max_dimension', type=int)
     
     # Save uploaded file
     filename = secure_filename(file.filename)
@@ -569,12 +617,27 @@ def convert_image():
     # Handle conversion
     from converter_universal import convert_image_to_pdf, convert_image_to_image
     
-    if target_format == 'pdf':
+    cache_key, cached = lookup_cached_result(input_path, output_path, 'convert-image',
+                                             target=target_format, quality=quality, max_dimension=max_dimension)
+    pool = get_conversion_pool()
+    if cached is not None:
+        success, message = True, cached.get('message', 'Image converted')
+    elif pool is not None:
+        if target_format == 'pdf':
+            outcome = pool.call('converter_universal', 'convert_image_to_pdf', input_path, output_path)
+        else:
+            outcome = pool.call('converter_universal', 'convert_image_to_image',
+                                input_path, output_path, target_format, quality, max_dimension)
+        success = outcome['success']
+        message = outcome.get('message') if success else outcome.get('error')
+    elif target_format == 'pdf':
         success, message = convert_image_to_pdf(input_path, output_path)
     else:
-        success, message = convert_image_to_image(input_path, output_path, target_format, quality)
+        success, message = convert_image_to_image(input_path, output_path, target_format, quality, max_dimension)
     
     if success and os.path.exists(output_path):
+        if cached is None:
+            store_cached_result(cache_key, output_path, message=message)
         return jsonify({
             'success': True,
             'message': message,
@@ -598,6 +661,16 @@ def translate_file_route():
         target_lang = request.form.get('target_lang', 'es')
         source_lang = request.form.get('source_lang', 'auto')
         
+        # Optional per-request translation provider (see translation_backends.BACKENDS);
+        # stubs such as 'local' are reserved for admin sessions
+        from translation_backends import BACKENDS, normalize_provider, is_public_provider
+        provider = normalize_provider(request.form.get('provider'))
+        if provider:
+            if provider not in BACKENDS:
+                return jsonify({'success': False, 'error': f'Unknown translation provider: {provider}'}), 400
+            if not is_public_provider(provider) and not session.get('admin_logged_in'):
+                return jsonify({'success': False, 'error': f'Translation provider not available: {provider}'}), 403
+        
         # Validate file size (50MB max)
         file.seek(0, os.SEEK_END)
         file_size = file.tell()
@@ -639,16 +712,50 @@ def translate_file_route():
         if file_ext == '.pdf':
             download_name = f"[Translated]_{base_name}.pdf"
         
+        # Stub/offline providers are never cached (see TranslationBackend.cacheable)
+        from translation_backends import get_backend
+        backend = get_backend(provider)
+        cache_key = cached = None
+        if backend.cacheable:
+            cache_key, cached = lookup_cached_result(input_path, output_path, 'translate', ext=file_ext,
+                                                     target=target_lang, source=source_lang, provider=backend.name)
+        if cached is not None:
+            return jsonify(run_translation(input_path, output_path, target_lang, source_lang, file_ext,
+                                           download_name, provider, cached=cached))
+        
+        return enqueue_job('translate', run_translation, input_path, output_path,
+                           target_lang, source_lang, file_ext, download_name, provider, cache_key,
+                           files=(input_path, output_path))
+            
+    except Exception as e:
+        try:
+            print(f"Translation route error: {e}")
+            import traceback
+            traceback.print_exc()
+        except UnicodeEncodeError:
+            pass
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+def run_translation(input_path, output_path, target_lang, source_lang, file_ext, download_name, provider=None,
+                    cache_key=None, cached=None):
+    """Translate a saved upload (runs inside a job worker)"""
+    try:
         # Import translator function
-        from translator_engine import translate_document
+        from translator_engine import translate_document, count_untranslated
         
-        # Call the translator function
-        result = translate_document(
-            input_path, output_path, target_lang, source_lang, file_ext
-        )
+        # Call the translator function (unless the route already linked a cached result)
+        untranslated = 0
+        if cached is not None:
+            result = (True, cached.get('message', 'Translation completed'), output_path)
+        else:
+            with count_untranslated() as tally:
+                result = translate_document(
+                    input_path, output_path, target_lang, source_lang, file_ext, provider=provider
+                )
+            untranslated = tally.failed
         
         # After translation, if it succeeded, we want the client to download it with our clean name
-        # download_name is already prepared above
+        # download_name is prepared by the route before queueing
 
         # Handle both 2-value and 3-value returns
         if isinstance(result, tuple) and len(result) == 2:
@@ -662,7 +769,7 @@ def translate_file_route():
                 print(f"Unexpected return from translate_document: {result}")
             except UnicodeEncodeError:
                 print("Unexpected return from translate_document: [Unicode Content]")
-            return jsonify({'success': False, 'error': 'Internal server error'}), 500
+            return {'success': False, 'error': 'Internal server error'}
         
         # Update output_filename for response
         output_filename = os.path.basename(output_path)
@@ -687,6 +794,13 @@ def translate_file_route():
             # The engine might have changed the extension (e.g., .pdf -> .txt)
             final_filename = os.path.basename(res_path)
             
+            # Only the planned output is cached; fallback formats (.docx/.txt) are not,
+            # and neither are results with segments the provider failed to translate
+            if untranslated:
+                print(f"Translation left {untranslated} segments untranslated; result not cached")
+            elif cached is None and res_path == output_path:
+                store_cached_result(cache_key, output_path, message=message)
+            
             # Update download name if extension changed
             final_ext = os.path.splitext(final_filename)[1].lower()
             if final_ext != file_ext:
@@ -695,24 +809,24 @@ def translate_file_route():
             # URL encode the download name for stability in headers
             encoded_download_name = urllib.parse.quote(download_name)
             
-            return jsonify({
+            return {
                 'success': True,
                 'message': message,
                 'download_url': f'/download/{final_filename}?display_name={encoded_download_name}',
                 'filename': download_name,
                 'preview_filename': final_filename
-            })
+            }
         else:
-            return jsonify({'success': False, 'error': message or 'Translation failed'}), 500
+            return {'success': False, 'error': message or 'Translation failed'}
             
     except Exception as e:
         try:
-            print(f"Translation route error: {e}")
+            print(f"Translation job error: {e}")
             import traceback
             traceback.print_exc()
         except UnicodeEncodeError:
             pass
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return {'success': False, 'error': str(e)}
 
 @app.route('/get-preview/<filename>')
 def get_preview(filename):
@@ -768,14 +882,12 @@ def get_preview(filename):
             
         elif ext == 'pdf':
             # Use pdfplumber for robust text extraction (handles non-Latin scripts like Hindi much better)
-            import pdfplumber
+            from pdf_text import extract_text
             content = ""
-            with pdfplumber.open(file_path) as pdf:
-                # Get text from first few pages to show in preview
-                for page in pdf.pages[:3]:
-                    text = page.extract_text()
-                    if text:
-                        content += text + "\n"
+            # Get text from first few pages to show in preview
+            for text in extract_text(file_path, backend='pdfplumber', max_pages=3):
+                if text:
+                    content += text + "\n"
             return jsonify({'success': True, 'content': content[:10000], 'type': 'text'})
             
         elif ext in ['xlsx', 'xls']:
@@ -0,0 +1,209 @@
+"""
+Conversion Result Cache
+Content-addressed cache of finished outputs keyed by SHA-256 of the input
+bytes + operation + parameters (conversion pair, quality, target size,
+languages...). Repeat requests are served by hard-linking (or reflinking) the
+cached file into uploads/ instead of re-running the converter.
+
+Layout: <CONVERSION_CACHE_DIR>/<key[:2]>/<key>       output bytes
+        <CONVERSION_CACHE_DIR>/<key[:2]>/<key>.json  result metadata
+Eviction is least-recently-used by mtime, bounded by total size.
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import threading
+from collections import OrderedDict
+
+# ============ CONFIGURATION ============
+CACHE_DIR = os.environ.get('CONVERSION_CACHE_DIR', 'conversion_cache')
+CACHE_MAX_BYTES = int(os.environ.get('CONVERSION_CACHE_MAX_MB', 512)) * 1024 * 1024
+CACHE_ENABLED = os.environ.get('CONVERSION_CACHE', 'on').lower() not in ('0', 'off', 'false')
+CACHE_VERSION = 1  # Bump when converter output changes so stale entries stop matching
+
+_HASH_CHUNK = 1024 * 1024
+_FICLONE = 0x40049409  # Linux ioctl: share extents (btrfs/xfs reflink)
+
+
+def _link_or_copy(src, dst):
+    """Hard link, else reflink, else plain copy"""
+    try:
+        os.link(src, dst)
+        return
+    except OSError:
+        pass
+    try:
+        import fcntl
+        with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+            fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+        return
+    except (ImportError, OSError):
+        if os.path.exists(dst):
+            os.remove(dst)
+    shutil.copyfile(src, dst)
+
+
+class ConversionCache:
+    """Size-bounded on-disk LRU of conversion outputs with hit/miss counters"""
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> size, least recently used first
+        self._total = 0
+        self._hits = 0
+        self._misses = 0
+        self._stores = 0
+        self._evictions = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        found = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith('.json') or name.endswith('.tmp'):
+                    continue
+                path = os.path.join(root, name)
+                if not os.path.exists(path + '.json'):
+                    continue
+                st = os.stat(path)
+                found.append((st.st_mtime, name, st.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._total += size
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    @staticmethod
+    def make_key(input_path, operation, **params):
+        """SHA-256 over the input bytes and the canonicalised operation/parameters"""
+        digest = hashlib.sha256()
+        with open(input_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(_HASH_CHUNK), b''):
+                digest.update(chunk)
+        digest.update(json.dumps({'v': CACHE_VERSION, 'op': operation, 'params': params},
+                                 sort_keys=True, default=str).encode('utf-8'))
+        return digest.hexdigest()
+
+    # --- Lookups ---
+
+    def fetch(self, key, dest_path):
+        """Link the cached output to dest_path; returns its metadata, or None on a miss"""
+        if key is None:
+            return None
+        path = self._path(key)
+        with self._lock:
+            known = key in self._entries
+            if known:
+                self._entries.move_to_end(key)
+        if known:
+            try:
+                with open(path + '.json', 'r', encoding='utf-8') as f:
+                    metadata = json.load(f)
+                # Refresh mtime: LRU order on restart, and the shared inode keeps
+                # the uploads/ link alive past the 5-minute cleanup window
+                os.utime(path)
+                _link_or_copy(path, dest_path)
+                with self._lock:
+                    self._hits += 1
+                return metadata
+            except (OSError, ValueError) as e:
+                print(f"Conversion cache entry {key[:12]} unusable: {e}")
+                self._discard(key)
+        with self._lock:
+            self._misses += 1
+        return None
+
+    # --- Writes ---
+
+    def store(self, key, output_path, **metadata):
+        """Add a finished output (and its result metadata) to the cache"""
+        if key is None or not os.path.exists(output_path):
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            _link_or_copy(output_path, tmp)
+            with open(path + '.json', 'w', encoding='utf-8') as f:
+                json.dump(metadata, f)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"Conversion cache store failed: {e}")
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return
+
+        size = os.path.getsize(path)
+        with self._lock:
+            self._total += size - self._entries.pop(key, 0)
+            self._entries[key] = size
+            self._stores += 1
+        self.evict()
+
+    def _discard(self, key):
+        with self._lock:
+            self._total -= self._entries.pop(key, 0)
+        path = self._path(key)
+        for p in (path, path + '.json'):
+            try:
+                os.remove(p)
+            except OSError:
+                pass
+
+    def evict(self):
+        """Drop least-recently-used entries until the cache fits max_bytes"""
+        removed = 0
+        while True:
+            with self._lock:
+                if self._total <= self.max_bytes or not self._entries:
+                    break
+                key = next(iter(self._entries))
+            self._discard(key)
+            removed += 1
+        if removed:
+            with self._lock:
+                self._evictions += removed
+        return removed
+
+    # --- Stats ---
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._total,
+                'max_bytes': self.max_bytes,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / lookups, 3) if lookups else 0.0,
+                'stores': self._stores,
+                'evictions': self._evictions,
+            }
+
+
+# ============ SHARED INSTANCE ============
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_conversion_cache():
+    """Return the shared ConversionCache, or None when disabled/unavailable"""
+    global _cache
+    if not CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                try:
+                    _cache = ConversionCache()
+                except Exception as e:
+                    print(f"Conversion cache unavailable: {e}")
+                    return None
+    return _cache
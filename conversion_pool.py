@@ -0,0 +1,312 @@
+"""
+Conversion Process Pool
+Runs converters in pre-forked worker processes instead of the web process, so
+one Aspose/WeasyPrint call on a pathological file cannot pin or OOM-kill the
+gunicorn worker.
+
+Each worker:
+- runs under an RLIMIT_CPU cap, and optionally an RLIMIT_DATA memory cap
+- is killed and replaced when a job exceeds the wall-clock timeout
+- is recycled after N jobs or once its peak RSS passes a threshold
+
+Memory is bounded by the RSS-based recycling rather than an address-space
+cap: runtimes such as .NET (behind aspose-words) reserve far more virtual
+memory than they use, so an RLIMIT_AS cap would fail their conversions.
+
+Every pre-warmed worker imports converter_universal, so each costs roughly
+as much baseline memory as the web process itself: the default 2 workers
+about double the baseline, a lot on a 512 MB instance. Set
+CONVERSION_WORKERS=1 there (or CONVERSION_POOL=off to convert in-process).
+
+Progress reported by converters (progress.report_progress) is forwarded over
+the worker pipe to the reporter of the job that called the pool.
+
+Failures come back as structured results:
+    {'success': False, 'error': '...', 'error_type': 'timeout' | 'memory' | 'cpu' | 'killed' | 'crash' | 'error'}
+"""
+
+import os
+import sys
+import atexit
+import time
+import signal
+import importlib
+import threading
+import traceback
+import multiprocessing
+
+from progress import progress_scope, current_reporter
+
+try:
+    import resource
+except ImportError:  # Windows: no rlimits, timeouts still apply
+    resource = None
+
+# ============ CONFIGURATION ============
+CONVERSION_POOL_ENABLED = os.environ.get('CONVERSION_POOL', 'on').lower() not in ('0', 'off', 'false')
+CONVERSION_WORKERS = int(os.environ.get('CONVERSION_WORKERS', min(2, os.cpu_count() or 1)))
+CONVERSION_TIMEOUT = int(os.environ.get('CONVERSION_TIMEOUT', 240))               # Wall clock, seconds
+CONVERSION_CPU_LIMIT = int(os.environ.get('CONVERSION_CPU_LIMIT', 300))           # CPU seconds per worker (0 = off)
+CONVERSION_MEMORY_LIMIT_MB = int(os.environ.get('CONVERSION_MEMORY_LIMIT_MB', 0))  # RLIMIT_DATA (0 = off)
+CONVERSION_MAX_JOBS = int(os.environ.get('CONVERSION_MAX_JOBS', 25))              # Recycle after N jobs
+CONVERSION_MAX_RSS_MB = int(os.environ.get('CONVERSION_MAX_RSS_MB', 768))         # Recycle above this peak RSS
+
+
+# ============ WORKER PROCESS ============
+
+def _apply_memory_limit(memory_limit_mb):
+    """Cap the worker's data segment and private writable mappings
+
+    Unlike RLIMIT_AS this ignores reserved-but-inaccessible address space.
+    """
+    if resource is None or not memory_limit_mb or not hasattr(resource, 'RLIMIT_DATA'):
+        return
+    limit = memory_limit_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_DATA, (limit, limit))
+
+def _arm_cpu_limit(cpu_limit):
+    """RLIMIT_CPU counts the whole process lifetime, so re-arm it per job"""
+    if resource is None or not cpu_limit:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft = int(usage.ru_utime + usage.ru_stime) + cpu_limit
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    # Crossing the soft limit delivers SIGXCPU, which terminates the worker
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+def _peak_rss_mb():
+    if resource is None:
+        return 0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+def _worker_main(conn, memory_limit_mb, cpu_limit):
+    """Worker loop: receive (module, function, args), send back a result dict
+
+    Progress reports are sent ahead of the result as ('progress', report).
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _apply_memory_limit(memory_limit_mb)
+    send_lock = threading.Lock()  # Converters may report from several threads
+
+    def send_progress(report):
+        with send_lock:
+            conn.send(('progress', report))
+
+    # Pre-warm the converter registry so the first job doesn't pay for it
+    try:
+        importlib.import_module('converter_universal')
+    except Exception as e:
+        print(f"Conversion worker warm-up failed: {e}")
+
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            break
+        if task is None:
+            break
+
+        module_name, func_name, args = task
+        _arm_cpu_limit(cpu_limit)
+        try:
+            func = getattr(importlib.import_module(module_name), func_name)
+            with progress_scope(send_progress, log=False):
+                success, message = func(*args)
+            result = {'success': bool(success), 'message': message}
+            if not success:
+                result.update(error=message, error_type='error')
+        except MemoryError:
+            result = {'success': False, 'error': 'Conversion ran out of memory', 'error_type': 'memory'}
+        except Exception as e:
+            traceback.print_exc()
+            result = {'success': False, 'error': str(e), 'error_type': 'error'}
+
+        result['rss_mb'] = round(_peak_rss_mb(), 1)
+        try:
+            with send_lock:
+                conn.send(result)
+        except (EOFError, OSError):
+            break
+
+def run_file_conversion(source_format, target_format, input_path, output_path, options=None):
+    """Look up and run a FILE_CONVERSIONS entry (entries are lambdas, so they
+    are resolved inside the worker rather than pickled)"""
+    import converter_universal as cv
+    conversions = cv.FILE_CONVERSIONS.get(source_format, {})
+    if target_format not in conversions:
+        return False, f"Unsupported conversion from {source_format} to {target_format}"
+    return conversions[target_format](input_path, output_path, **(options or {}))
+
+
+# ============ POOL ============
+
+class _Worker:
+    """Parent-side handle for one worker process"""
+
+    def __init__(self, context, memory_limit_mb, cpu_limit):
+        self.conn, child_conn = context.Pipe()
+        # Not daemonic, so converters can use process pools of their own
+        # (pdf_text); workers exit on EOF and are stopped at interpreter exit
+        self.process = context.Process(target=_worker_main, args=(child_conn, memory_limit_mb, cpu_limit),
+                                       daemon=False, name='conversion-worker')
+        self.process.start()
+        child_conn.close()
+        self.jobs = 0
+
+    def stop(self, timeout=2):
+        try:
+            self.conn.send(None)
+        except (EOFError, OSError):
+            pass
+        self.process.join(timeout)
+        self.kill()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join(1)
+        self.conn.close()
+
+
+class ConversionPool:
+    """Fixed-size pool of pre-forked, resource-capped conversion workers"""
+
+    def __init__(self, workers=CONVERSION_WORKERS, timeout=CONVERSION_TIMEOUT, cpu_limit=CONVERSION_CPU_LIMIT,
+                 memory_limit_mb=CONVERSION_MEMORY_LIMIT_MB, max_jobs=CONVERSION_MAX_JOBS,
+                 max_rss_mb=CONVERSION_MAX_RSS_MB):
+        self.timeout = timeout
+        self.cpu_limit = cpu_limit
+        self.memory_limit_mb = memory_limit_mb
+        self.max_jobs = max_jobs
+        self.max_rss_mb = max_rss_mb
+        # forkserver: workers fork from a clean process, not the threaded web worker
+        methods = multiprocessing.get_all_start_methods()
+        self._context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+        self._idle = []
+        self._cond = threading.Condition()
+        self._closed = False
+        self._stats = {'jobs': 0, 'failures': 0, 'timeouts': 0, 'crashes': 0, 'recycled': 0}
+        for _ in range(max(1, workers)):
+            self._idle.append(self._spawn())
+
+    def _spawn(self):
+        return _Worker(self._context, self.memory_limit_mb, self.cpu_limit)
+
+    def _count(self, key):
+        with self._cond:
+            self._stats[key] += 1
+
+    def _acquire(self):
+        with self._cond:
+            while not self._idle:
+                if self._closed:
+                    raise RuntimeError("Conversion pool is shut down")
+                self._cond.wait()
+            return self._idle.pop()
+
+    def _release(self, worker):
+        with self._cond:
+            if self._closed:
+                worker.stop()
+                return
+            self._idle.append(worker)
+            self._cond.notify()
+
+    def _crash_result(self, exitcode):
+        """Translate a dead worker's exit code into a structured error"""
+        if exitcode == -signal.SIGXCPU:
+            return {'success': False, 'error': 'Conversion exceeded its CPU time limit', 'error_type': 'cpu'}
+        if exitcode == -signal.SIGKILL:
+            # Most likely the kernel OOM killer
+            return {'success': False, 'error': 'Conversion was killed (out of memory?)', 'error_type': 'killed'}
+        return {'success': False, 'error': f'Conversion worker crashed (exit code {exitcode})',
+                'error_type': 'crash'}
+
+    def call(self, module_name, func_name, *args, timeout=None):
+        """Run module.func(*args) -> (success, message) in a worker; returns a result dict"""
+        timeout = timeout or self.timeout
+        progress = current_reporter()  # The calling job's, if any
+        worker = self._acquire()
+        start = time.monotonic()
+        self._count('jobs')
+        try:
+            worker.conn.send((module_name, func_name, args))
+            while True:
+                remaining = start + timeout - time.monotonic()
+                if remaining <= 0 or not worker.conn.poll(remaining):
+                    worker.kill()
+                    worker = self._spawn()
+                    self._count('timeouts')
+                    result = {'success': False, 'error': f'Conversion timed out after {timeout} seconds',
+                              'error_type': 'timeout'}
+                    break
+                message = worker.conn.recv()
+                if isinstance(message, tuple) and message[0] == 'progress':
+                    report = message[1]
+                    progress.report(report['done'], report['total'], report['stage'])
+                    continue
+                result = message
+                worker.jobs += 1
+                break
+        except (EOFError, OSError):
+            worker.process.join(1)
+            result = self._crash_result(worker.process.exitcode)
+            worker.kill()
+            worker = self._spawn()
+            self._count('crashes')
+
+        if worker.jobs >= self.max_jobs or result.get('rss_mb', 0) > self.max_rss_mb:
+            worker.stop()
+            worker = self._spawn()
+            self._count('recycled')
+        self._release(worker)
+
+        if not result['success']:
+            self._count('failures')
+        result['seconds'] = round(time.monotonic() - start, 3)
+        return result
+
+    def convert(self, source_format, target_format, input_path, output_path, options=None, timeout=None):
+        """Run a FILE_CONVERSIONS entry in a worker (options are passed as keyword arguments)"""
+        return self.call(__name__, 'run_file_conversion', source_format, target_format,
+                         input_path, output_path, options, timeout=timeout)
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats['idle_workers'] = len(self._idle)
+        return stats
+
+    def shutdown(self):
+        with self._cond:
+            self._closed = True
+            workers, self._idle = self._idle, []
+            self._cond.notify_all()
+        for worker in workers:
+            worker.stop()
+
+
+# ============ SHARED INSTANCE ============
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_conversion_pool():
+    """Return the shared ConversionPool, or None when disabled/unavailable"""
+    global _pool
+    if not CONVERSION_POOL_ENABLED:
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                try:
+                    _pool = ConversionPool()
+                    atexit.register(_pool.shutdown)
+                except Exception as e:
+                    print(f"Conversion pool unavailable: {e}")
+                    return None
+    return _pool
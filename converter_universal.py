@@ -181,14 +181,9 @@ def convert_pdf_to_docx(input_path, output_path):
 def convert_pdf_to_txt(input_path, output_path):
     """PDF to Text"""
     try:
-        PyPDF2 = get_PyPDF2()
-        with open(input_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text()
-            with open(output_path, 'w', encoding='utf-8') as txt_file:
-                txt_file.write(text)
+        # Pages are extracted in parallel and streamed to the file in order
+        from pdf_text import extract_to_file
+        extract_to_file(input_path, output_path)
         return True, "PDF to TXT conversion successful"
     except Exception as e:
         return False, str(e)
@@ -235,38 +230,39 @@ def convert_pdf_to_xlsx(input_path, output_path):
 # ============ EXCEL CONVERSIONS ============
 
 def convert_xlsx_to_csv(input_path, output_path):
-    """Excel to CSV"""
+    """Excel to CSV (first sheet, streamed row by row)"""
     try:
-        df = pd.read_excel(input_path)
-        df.to_csv(output_path, index=False, encoding='utf-8')
+        from excel_reader import first_sheet_frames
+        from tabular_stream import write_csv
+        write_csv(first_sheet_frames(input_path), output_path)
         return True, "XLSX to CSV conversion successful"
     except Exception as e:
         return False, str(e)
 
 def convert_xlsx_to_json(input_path, output_path):
-    """Excel to JSON"""
+    """Excel to JSON (records array; an object of arrays keyed by sheet name for multi-sheet workbooks)"""
     try:
-        df = pd.read_excel(input_path)
-        df.to_json(output_path, orient='records', indent=2, force_ascii=False)
+        from excel_reader import sheet_names, iter_sheet_frames, first_sheet_frames
+        from tabular_stream import write_json_records, write_json_sheets
+        if len(sheet_names(input_path)) > 1:
+            write_json_sheets(iter_sheet_frames(input_path), output_path, force_ascii=False)
+        else:
+            write_json_records(first_sheet_frames(input_path), output_path, force_ascii=False)
         return True, "XLSX to JSON conversion successful"
     except Exception as e:
         return False, str(e)
 
 def convert_xlsx_to_xml(input_path, output_path):
-    """Excel to XML"""
+    """Excel to XML (one <sheet> element per sheet for multi-sheet workbooks)"""
     try:
-        df = pd.read_excel(input_path)
-        
-        # Create XML structure
-        root = ET.Element("root")
-        for _, row in df.iterrows():
-            record = ET.SubElement(root, "record")
-            for col in df.columns:
-                field = ET.SubElement(record, col.replace(" ", "_").replace("/", "_"))
-                field.text = str(row[col]) if pd.notna(row[col]) else ""
+        from excel_reader import sheet_names, iter_sheet_frames, first_sheet_frames
+        from tabular_stream import write_xml_records, write_xml_sheets
         
-        tree = ET.ElementTree(root)
-        tree.write(output_path, encoding='utf-8', xml_declaration=True)
+        # Column-wise serialization, written chunk by chunk (no element tree)
+        if len(sheet_names(input_path)) > 1:
+            write_xml_sheets(iter_sheet_frames(input_path), output_path)
+        else:
+            write_xml_records(first_sheet_frames(input_path), output_path)
         return True, "XLSX to XML conversion successful"
     except Exception as e:
         return False, str(e)
@@ -286,21 +282,27 @@ def convert_xlsx_to_pdf(input_path, output_path):
         except:
             pass
             
-        # Method 2: Pandas + WeasyPrint (Basic fallback)
-        df = pd.read_excel(input_path)
-        html = df.to_html(index=False)
-        
-        HTML = get_weasyprint()
-        HTML(string=f"<html><body>{html}</body></html>").write_pdf(output_path)
+        # Method 2: Streamed HTML tables (all sheets) + WeasyPrint (Basic fallback)
+        from excel_reader import sheet_names, iter_sheet_frames
+        from tabular_stream import write_html_tables
+        temp_html = output_path + ".tables.html"
+        try:
+            write_html_tables(iter_sheet_frames(input_path), temp_html, titles=len(sheet_names(input_path)) > 1)
+            HTML = get_weasyprint()
+            HTML(filename=temp_html).write_pdf(output_path)
+        finally:
+            if os.path.exists(temp_html):
+                os.remove(temp_html)
         return True, "XLSX to PDF conversion successful (Basic Fallback)"
     except Exception as e:
         return False, str(e)
 
 def convert_xlsx_to_html(input_path, output_path):
-    """Excel to HTML"""
+    """Excel to HTML (one table per sheet)"""
     try:
-        df = pd.read_excel(input_path)
-        df.to_html(output_path, index=False)
+        from excel_reader import sheet_names, iter_sheet_frames
+        from tabular_stream import write_html_tables
+        write_html_tables(iter_sheet_frames(input_path), output_path, titles=len(sheet_names(input_path)) > 1)
         return True, "XLSX to HTML conversion successful"
     except Exception as e:
         return False, str(e)
@@ -308,38 +310,26 @@ def convert_xlsx_to_html(input_path, output_path):
 # ============ CSV CONVERSIONS ============
 
 def convert_csv_to_xlsx(input_path, output_path):
-    """CSV to Excel"""
+    """CSV to Excel (streamed in chunks through a write-only workbook)"""
     try:
-        df = pd.read_csv(input_path)
-        df.to_excel(output_path, index=False)
-        return True, "CSV to XLSX conversion successful"
+        from tabular_stream import convert_csv_to_xlsx_stream
+        return convert_csv_to_xlsx_stream(input_path, output_path)
     except Exception as e:
         return False, str(e)
 
 def convert_csv_to_json(input_path, output_path):
-    """CSV to JSON"""
+    """CSV to JSON (streamed in chunks)"""
     try:
-        df = pd.read_csv(input_path)
-        df.to_json(output_path, orient='records', indent=2)
-        return True, "CSV to JSON conversion successful"
+        from tabular_stream import convert_csv_to_json_stream
+        return convert_csv_to_json_stream(input_path, output_path)
     except Exception as e:
         return False, str(e)
 
 def convert_csv_to_xml(input_path, output_path):
-    """CSV to XML"""
+    """CSV to XML (streamed in chunks)"""
     try:
-        df = pd.read_csv(input_path)
-        
-        root = ET.Element("root")
-        for _, row in df.iterrows():
-            record = ET.SubElement(root, "record")
-            for col in df.columns:
-                field = ET.SubElement(record, col.replace(" ", "_").replace("/", "_"))
-                field.text = str(row[col]) if pd.notna(row[col]) else ""
-        
-        tree = ET.ElementTree(root)
-        tree.write(output_path, encoding='utf-8', xml_declaration=True)
-        return True, "CSV to XML conversion successful"
+        from tabular_stream import convert_csv_to_xml_stream
+        return convert_csv_to_xml_stream(input_path, output_path)
     except Exception as e:
         return False, str(e)
 
@@ -425,19 +415,24 @@ def convert_json_to_xml(input_path, output_path):
 
 # ============ IMAGE CONVERSIONS ============
 
-def convert_image_to_image(input_path, output_path, target_format, quality=90):
-    """Convert image from one format to another"""
+def convert_image_to_image(input_path, output_path, target_format, quality=90, max_dimension=None):
+    """Convert image from one format to another
+    
+    max_dimension optionally caps the longest side; JPEG sources are then
+    decoded at reduced resolution (draft mode) instead of full size.
+    """
     try:
-        Image = get_PIL()
-        image = Image.open(input_path)
+        from image_loader import open_image, fit_within, flatten_to_rgb
+        image = open_image(input_path, max_dimension=max_dimension)
+        
+        if max_dimension:
+            new_size = fit_within(image.info['original_size'], max_dimension)
+            if image.size != new_size:
+                image = image.resize(new_size, get_PIL().Resampling.LANCZOS)
         
-        # Handle transparency for JPEG
+        # Handle transparency for JPEG (composited in strips, no full RGBA copy)
         if target_format.upper() in ['JPG', 'JPEG'] and image.mode in ('RGBA', 'LA', 'P'):
-            rgb_image = Image.new('RGB', image.size, (255, 255, 255))
-            if image.mode == 'P':
-                image = image.convert('RGBA')
-            rgb_image.paste(image, mask=image.split()[-1] if image.mode == 'RGBA' else None)
-            image = rgb_image
+            image = flatten_to_rgb(image)
         
         save_format = 'JPEG' if target_format.upper() in ['JPG', 'JPEG'] else target_format.upper()
         image.save(output_path, save_format, quality=quality, optimize=True)
@@ -448,25 +443,30 @@ def convert_image_to_image(input_path, output_path, target_format, quality=90):
 def convert_image_to_pdf(input_path, output_path):
     """Image to PDF"""
     try:
-        Image = get_PIL()
-        image = Image.open(input_path)
+        from image_loader import open_image, flatten_to_rgb, jpeg_passthrough_info
+        
+        # Method 1: embed JPEG bytes directly (no decode, constant memory)
+        passthrough = jpeg_passthrough_info(input_path)
+        if passthrough:
+            from pdf_writer import write_jpeg_pdf
+            size, mode = passthrough
+            write_jpeg_pdf([(input_path, size, mode)], output_path)
+            return True, "Image to PDF conversion successful"
+        
+        # Method 2: decode and re-encode with PIL
+        image = open_image(input_path)
         if image.mode != 'RGB':
-            image = image.convert('RGB')
+            image = flatten_to_rgb(image)
         image.save(output_path, 'PDF')
         return True, "Image to PDF conversion successful"
     except Exception as e:
         return False, str(e)
 
-def convert_pdf_to_image(input_path, output_path, target_format='png'):
-    """PDF to Image (multi-page support or first page)"""
+def convert_pdf_to_image(input_path, output_path, target_format='png', dpi=None, pages=None):
+    """PDF to Image: first selected page as an image, or every selected page as a ZIP"""
     try:
-        from pdf2image import convert_from_path
-        # On Windows, poppler must be in PATH. On Render, it's usually pre-installed in common images.
-        images = convert_from_path(input_path, first_page=1, last_page=1)
-        if images:
-            images[0].save(output_path, target_format.upper())
-            return True, f"PDF to {target_format.upper()} conversion successful"
-        return False, "No pages found in PDF"
+        from pdf_render import convert_pdf_to_images
+        return convert_pdf_to_images(input_path, output_path, target_format, dpi=dpi, pages=pages)
     except Exception as e:
         return False, f"PDF to Image error: {str(e)}"
 
@@ -769,6 +769,10 @@ FILE_CONVERSIONS = {
         'docx': convert_pdf_to_docx,
         'txt': convert_pdf_to_txt,
         'xlsx': convert_pdf_to_xlsx,
+        # Page rendering takes optional dpi/pages options
+        'png': lambda i, o, **options: convert_pdf_to_image(i, o, 'png', **options),
+        'jpg': lambda i, o, **options: convert_pdf_to_image(i, o, 'jpg', **options),
+        'zip': lambda i, o, **options: convert_pdf_to_image(i, o, options.pop('image_format', 'png'), **options),
     },
     # Excel Conversions
     'xlsx': {
@@ -0,0 +1,274 @@
+"""
+OOXML DOCX Translator
+Translates Word documents at the text-run level instead of through
+python-docx: word/document.xml, headers, footers, footnotes and endnotes are
+streamed with lxml iterparse, one top-level block (paragraph, table, ...) at
+a time.
+
+- scan pass: the text of every paragraph, table cells and text boxes
+  included, is collected document-wide, split at tabs and line breaks
+- the caller translates the unique texts in one batched call
+- write pass: each translation replaces the text of its runs. Tabs, breaks,
+  hyperlinks, fields and images stay in place; when a segment mixes
+  formats, the translated words are spread over its runs in proportion to
+  their original lengths, so formatting is approximate there
+
+All other parts of the package are copied through unchanged.
+"""
+
+import re
+import shutil
+import zipfile
+
+from progress import report_progress
+
+# ============ CONFIGURATION ============
+DOCX_STREAM_CHUNK = 1024 * 1024
+
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+W_P = f'{{{W_NS}}}p'
+W_R = f'{{{W_NS}}}r'
+W_T = f'{{{W_NS}}}t'
+# In-run elements that separate text: translated around, never across
+SEPARATORS = {f'{{{W_NS}}}tab': '\t', f'{{{W_NS}}}br': '\n', f'{{{W_NS}}}cr': '\n'}
+XML_SPACE = '{http://www.w3.org/XML/1998/namespace}space'
+
+# Elements whose children are written one at a time (the part's root is always one)
+WRAPPERS = {f'{{{W_NS}}}{name}' for name in ('body', 'footnote', 'endnote')}
+
+CONTENT_TYPES = '[Content_Types].xml'
+TEXT_PART_TYPES = {
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.header+xml',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.footer+xml',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.footnotes+xml',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.endnotes+xml',
+}
+
+# ============ LAZY LOADING HELPERS ============
+
+_etree = None
+def get_etree():
+    global _etree
+    if _etree is None:
+        from lxml import etree  # Installed with python-docx
+        _etree = etree
+    return _etree
+
+# ============ PART DISCOVERY ============
+
+def text_parts(archive):
+    """Main document, header, footer, footnote and endnote parts from [Content_Types].xml"""
+    etree = get_etree()
+    parts = []
+    for override in etree.fromstring(archive.read(CONTENT_TYPES)):
+        if not isinstance(override.tag, str) or not override.tag.endswith('Override'):
+            continue
+        content_type = override.get('ContentType', '')
+        # document.main+xml, plus the macro-enabled and template variants
+        if content_type.endswith('.main+xml') or content_type in TEXT_PART_TYPES:
+            parts.append(override.get('PartName', '').lstrip('/'))
+    return parts
+
+# ============ PARAGRAPH TEXT ============
+# A paragraph's text is split into segments at tabs and line breaks (which
+# python-docx renders as \t and \n); each segment is translated on its own,
+# so the separators stay where they were.
+
+def _own_runs(paragraph):
+    """<w:t> and in-run <w:tab>/<w:br>/<w:cr> elements of this paragraph, in
+    document order, excluding paragraphs nested in text boxes"""
+    runs = []
+    for item in paragraph.iter(W_T, *SEPARATORS):
+        if item.tag != W_T and item.getparent().tag != W_R:
+            continue  # e.g. tab stop definitions in <w:pPr><w:tabs>
+        owner = item.getparent()
+        while owner is not None and owner.tag != W_P:
+            owner = owner.getparent()
+        if owner is paragraph:
+            runs.append(item)
+    return runs
+
+def segments(paragraph):
+    """Lists of <w:t> elements between the paragraph's tabs and breaks"""
+    groups = [[]]
+    for item in _own_runs(paragraph):
+        if item.tag == W_T:
+            groups[-1].append(item)
+        else:
+            groups.append([])
+    return groups
+
+def segment_text(runs):
+    return ''.join(run.text or '' for run in runs)
+
+_WORD = re.compile(r'\s+|\S+\s*')
+
+def split_like(text, lengths):
+    """Split text at word boundaries into len(lengths) pieces, sized in
+    proportion to lengths (each word goes to the piece its start falls in)"""
+    total = sum(lengths)
+    pieces = [''] * len(lengths)
+    if not total or not text:
+        pieces[0] = text
+        return pieces
+    ends, acc = [], 0
+    for length in lengths:
+        acc += length
+        ends.append(acc / total)
+    for match in _WORD.finditer(text):
+        position = match.start() / len(text)
+        index = next(i for i, end in enumerate(ends) if position < end)
+        pieces[index] += match.group()
+    return pieces
+
+def apply_translation(paragraph, translations):
+    """Replace the text of each segment with its translation; True if changed
+
+    A single-run segment keeps its formatting exactly. Across several runs
+    (e.g. "Bold *italic*") the translated words are spread over the runs in
+    proportion to the original run lengths, which only approximates where
+    the formatting belonged, as word order may differ between languages.
+    """
+    changed = False
+    for runs in segments(paragraph):
+        text = segment_text(runs)
+        stripped = text.strip()
+        translation = translations.get(stripped) if stripped else None
+        if not translation or translation == stripped:
+            continue
+
+        lead = text[:len(text) - len(text.lstrip())]
+        trail = text[len(text.rstrip()):]
+        pieces = split_like(lead + translation + trail, [len(run.text or '') for run in runs])
+        for run, piece in zip(runs, pieces):
+            run.text = piece
+            if piece != piece.strip():
+                run.set(XML_SPACE, 'preserve')
+        changed = True
+    return changed
+
+# ============ STREAMING ============
+
+_XMLNS = re.compile(rb'\sxmlns(?::([\w.-]+))?="([^"]*)"')
+
+def _start_tag(element, inherited):
+    """Serialized start tag, declaring only namespaces not already in scope"""
+    etree = get_etree()
+    shallow = etree.Element(element.tag, dict(element.attrib), nsmap=element.nsmap)
+    data = etree.tostring(shallow)
+    return _strip_inherited(data[:-2] + b'>', inherited)
+
+def _end_tag(element):
+    local = get_etree().QName(element).localname
+    name = f'{element.prefix}:{local}' if element.prefix else local
+    return f'</{name}>'.encode('utf-8')
+
+def _strip_inherited(data, inherited):
+    """Drop namespace declarations of the first start tag that the enclosing element already made"""
+    end = data.index(b'>')
+    def keep(match):
+        prefix = match.group(1).decode() if match.group(1) else None
+        return b'' if inherited.get(prefix) == match.group(2).decode() else match.group()
+    return _XMLNS.sub(keep, data[:end]) + data[end:]
+
+def walk_part(src, visit, dst=None):
+    """Stream one part, calling visit(paragraph) for every paragraph in document order
+
+    With dst, the (possibly modified) part is written there one top-level
+    block at a time; processed blocks are dropped from the tree, so memory
+    stays at one block (e.g. one table) regardless of document length.
+    """
+    etree = get_etree()
+    wrappers = []
+
+    if dst is not None:
+        dst.write(b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\r\n')
+
+    for event, element in etree.iterparse(src, events=('start', 'end'), huge_tree=True):
+        parent = element.getparent()
+        if event == 'start':
+            if parent is None or (element.tag in WRAPPERS and wrappers and parent is wrappers[-1]):
+                wrappers.append(element)
+                if dst is not None:
+                    inherited = parent.nsmap if parent is not None else {}
+                    dst.write(_start_tag(element, inherited))
+            continue
+
+        if wrappers and element is wrappers[-1]:
+            wrappers.pop()
+            if dst is not None:
+                dst.write(_end_tag(element))
+        elif wrappers and parent is wrappers[-1]:
+            # A complete top-level block: paragraphs come out outer-first
+            for paragraph in element.iter(W_P):
+                visit(paragraph)
+            if dst is not None:
+                dst.write(_strip_inherited(etree.tostring(element, with_tail=False), parent.nsmap))
+            element.clear()
+            parent.remove(element)
+
+def _copy_info(item):
+    info = zipfile.ZipInfo(item.filename, item.date_time)
+    info.compress_type = item.compress_type
+    info.external_attr = item.external_attr
+    info.file_size = item.file_size  # Lets zipfile decide on ZIP64 up front
+    return info
+
+# ============ MAIN ENTRY POINT ============
+
+def scan_texts(input_path):
+    """Unique stripped segment texts of all text parts, in first-seen order"""
+    texts = {}
+
+    def collect(paragraph):
+        for runs in segments(paragraph):
+            text = segment_text(runs).strip()
+            if text:
+                texts[text] = None
+
+    with zipfile.ZipFile(input_path) as archive:
+        parts = text_parts(archive)
+        for index, part in enumerate(parts, 1):
+            with archive.open(part) as src:
+                walk_part(src, collect)
+            report_progress(index, len(parts), 'Reading document')
+    return list(texts)
+
+def rewrite_docx(input_path, output_path, translations):
+    """Write input_path to output_path with paragraph texts translated
+
+    translations maps stripped segment text to its translation. Returns the
+    number of paragraphs changed.
+    """
+    changed = 0
+
+    def apply(paragraph):
+        nonlocal changed
+        changed += apply_translation(paragraph, translations)
+
+    with zipfile.ZipFile(input_path) as zin, \
+         zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED, allowZip64=True) as zout:
+        parts = set(text_parts(zin))
+        items = zin.infolist()
+        for index, item in enumerate(items, 1):
+            info = _copy_info(item)
+            with zin.open(item) as src:
+                if item.filename in parts:
+                    info.file_size = item.file_size * 3  # Translations may be longer
+                    with zout.open(info, 'w') as dst:
+                        walk_part(src, apply, dst)
+                else:
+                    with zout.open(info, 'w') as dst:
+                        shutil.copyfileobj(src, dst, DOCX_STREAM_CHUNK)
+            report_progress(index, len(items), 'Writing document')
+    return changed
+
+def translate_docx_runs(input_path, output_path, translate):
+    """Scan, translate and rewrite a .docx
+
+    translate(texts) returns the translations of a list of unique texts in the
+    same order. Returns (unique texts, paragraphs changed).
+    """
+    texts = scan_texts(input_path)
+    translations = dict(zip(texts, translate(texts))) if texts else {}
+    return len(texts), rewrite_docx(input_path, output_path, translations)
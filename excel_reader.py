@@ -0,0 +1,201 @@
+"""
+Streaming Excel Reader
+Row-by-row workbook ingestion for the XLSX-sourced conversions, replacing
+pd.read_excel (which materializes the whole first sheet as a DataFrame):
+
+- openpyxl (read_only=True, iter_rows(values_only=True)): rows are parsed
+  from the sheet XML as they are consumed
+- calamine (optional `python-calamine` package): Rust reader, several times
+  faster, also handles legacy .xls
+- xlrd: legacy .xls when calamine is not installed
+
+Every sheet is exposed, and rows are grouped into DataFrame chunks with the
+same header handling as read_excel, so the streaming writers in
+tabular_stream can consume them directly.
+"""
+
+import os
+
+from progress import report_progress
+
+# ============ CONFIGURATION ============
+EXCEL_READER = os.environ.get('EXCEL_READER', 'auto').lower()  # auto | openpyxl | calamine
+EXCEL_CHUNK_ROWS = int(os.environ.get('EXCEL_CHUNK_ROWS', 20000))
+
+# ============ LAZY LOADING HELPERS ============
+
+_calamine = None
+def get_calamine():
+    """CalamineWorkbook class, or None when python-calamine isn't installed"""
+    global _calamine
+    if _calamine is None:
+        try:
+            from python_calamine import CalamineWorkbook
+            _calamine = CalamineWorkbook
+        except ImportError:
+            _calamine = False
+    return _calamine or None
+
+def resolve_backend(path, backend=None):
+    backend = (backend or EXCEL_READER).lower()
+    legacy = path.lower().endswith('.xls')
+    if backend in ('auto', 'calamine') and get_calamine():
+        return 'calamine'
+    if backend == 'calamine':
+        print("python-calamine not installed, using openpyxl")
+    return 'xlrd' if legacy else 'openpyxl'
+
+# ============ BACKENDS ============
+# Each yields (sheet_name, row_iterator) with rows as tuples of Python values.
+
+def _sheets_openpyxl(path):
+    from openpyxl import load_workbook
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            yield sheet.title, sheet.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+def _sheets_calamine(path):
+    workbook = get_calamine().from_path(path)
+    for name in workbook.sheet_names:
+        sheet = workbook.get_sheet_by_name(name)
+        rows = sheet.iter_rows() if hasattr(sheet, 'iter_rows') else iter(sheet.to_python())
+        yield name, (tuple(None if value == '' else value for value in row) for row in rows)
+
+def _sheets_xlrd(path):
+    import xlrd
+    workbook = xlrd.open_workbook(path, on_demand=True)
+    try:
+        for index in range(workbook.nsheets):
+            sheet = workbook.sheet_by_index(index)
+            yield sheet.name, _xlrd_rows(sheet, workbook.datemode)
+            workbook.unload_sheet(index)
+    finally:
+        workbook.release_resources()
+
+def _xlrd_rows(sheet, datemode):
+    import xlrd
+    for row in sheet.get_rows():
+        values = []
+        for cell in row:
+            if cell.ctype == xlrd.XL_CELL_DATE:
+                values.append(xlrd.xldate_as_datetime(cell.value, datemode))
+            elif cell.ctype in (xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_BLANK):
+                values.append(None)
+            elif cell.ctype == xlrd.XL_CELL_BOOLEAN:
+                values.append(bool(cell.value))
+            elif cell.ctype == xlrd.XL_CELL_NUMBER and cell.value == int(cell.value):
+                values.append(int(cell.value))
+            else:
+                values.append(cell.value)
+        yield tuple(values)
+
+BACKENDS = {
+    'openpyxl': _sheets_openpyxl,
+    'calamine': _sheets_calamine,
+    'xlrd': _sheets_xlrd,
+}
+
+def sheet_names(path, backend=None):
+    """Sheet names in workbook order, without reading any rows"""
+    backend = resolve_backend(path, backend)
+    if backend == 'calamine':
+        return list(get_calamine().from_path(path).sheet_names)
+    if backend == 'xlrd':
+        import xlrd
+        workbook = xlrd.open_workbook(path, on_demand=True)
+        try:
+            return workbook.sheet_names()
+        finally:
+            workbook.release_resources()
+    from openpyxl import load_workbook
+    workbook = load_workbook(path, read_only=True)
+    try:
+        return list(workbook.sheetnames)
+    finally:
+        workbook.close()
+
+def iter_sheets(path, backend=None):
+    """Yield (sheet_name, rows) for every sheet; consume rows before advancing"""
+    return BACKENDS[resolve_backend(path, backend)](path)
+
+# ============ DATAFRAME CHUNKS ============
+
+def _header_names(row):
+    """read_excel-style column names: blanks become "Unnamed: i", duplicates get ".1", ".2"..."""
+    names, seen = [], {}
+    for index, value in enumerate(row):
+        if value is None or value == '':
+            name = f"Unnamed: {index}"
+        elif isinstance(value, float) and value.is_integer():
+            name = str(int(value))
+        else:
+            name = str(value)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+def _is_empty(row):
+    return all(value is None or value == '' for value in row)
+
+def iter_frames(rows, chunk_rows=None):
+    """Group rows (first non-empty row = header) into DataFrames of chunk_rows rows
+
+    Trailing empty rows and trailing blank header columns are dropped, as
+    read_excel does; blank rows in the middle are kept as all-NaN rows.
+    """
+    import pandas as pd
+
+    chunk_rows = chunk_rows or EXCEL_CHUNK_ROWS
+    rows = iter(rows)
+    header = next((row for row in rows if not _is_empty(row)), None)
+    if header is None:
+        yield pd.DataFrame()
+        return
+
+    header = list(header)
+    while header and (header[-1] is None or header[-1] == ''):
+        header.pop()
+    columns = _header_names(header)
+    width = len(columns)
+
+    def frame(batch):
+        # from_records infers int/float/datetime64 columns like read_excel
+        return pd.DataFrame.from_records(batch, columns=columns)
+
+    empty_row = (None,) * width
+    batch, blanks, emitted = [], 0, False
+    rows_read = 0
+    for row in rows:
+        row = tuple(row[:width]) + (None,) * (width - len(row))
+        if _is_empty(row):
+            blanks += 1  # Only counted: a sheet can end in a huge empty range
+            continue
+        if blanks:
+            batch.extend([empty_row] * blanks)
+            blanks = 0
+        batch.append(row)
+        if len(batch) >= chunk_rows:
+            yield frame(batch)
+            rows_read += len(batch)
+            report_progress(rows_read, None, 'Converting rows')
+            batch, emitted = [], True
+    if batch or not emitted:
+        yield frame(batch)
+
+def iter_sheet_frames(path, backend=None, chunk_rows=None):
+    """Yield (sheet_name, frames) for every sheet, frames being a generator of DataFrame chunks"""
+    for name, rows in iter_sheets(path, backend):
+        yield name, iter_frames(rows, chunk_rows)
+
+def first_sheet_frames(path, backend=None, chunk_rows=None):
+    """DataFrame chunks of the first sheet only"""
+    for _, frames in iter_sheet_frames(path, backend, chunk_rows):
+        yield from frames
+        return
@@ -0,0 +1,169 @@
+"""
+Background IP Geolocation
+Keeps geolocation off the request path: log_visit records the visitor
+immediately and queues the IP; a worker thread resolves it and calls back
+with the location.
+
+Resolution order:
+1. bounded in-memory LRU of IP -> location
+2. local MaxMind-style .mmdb file (GEOIP_DB, needs the optional `maxminddb`
+   package) - no outbound call at all
+3. ip-api.com (unless GEOIP_API=off)
+"""
+
+import os
+import queue
+import ipaddress
+import threading
+from collections import OrderedDict
+
+# ============ CONFIGURATION ============
+GEOIP_DB = os.environ.get('GEOIP_DB', '')
+GEOIP_API_ENABLED = os.environ.get('GEOIP_API', 'on').lower() not in ('0', 'off', 'false')
+GEOIP_CACHE_SIZE = int(os.environ.get('GEOIP_CACHE_SIZE', 10000))
+GEOIP_QUEUE_SIZE = int(os.environ.get('GEOIP_QUEUE_SIZE', 1000))
+GEOIP_API_TIMEOUT = 3
+
+UNKNOWN = "Unknown"
+
+
+class GeoLocator:
+    """Queue-fed geolocation worker with an LRU cache and optional local database"""
+
+    def __init__(self, db_path=GEOIP_DB, use_api=GEOIP_API_ENABLED, cache_size=GEOIP_CACHE_SIZE,
+                 queue_size=GEOIP_QUEUE_SIZE):
+        self.use_api = use_api
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stats = {'queued': 0, 'dropped': 0, 'cache_hits': 0, 'db_lookups': 0, 'api_lookups': 0}
+        self._reader = self._open_db(db_path)
+        self._worker = threading.Thread(target=self._run, daemon=True, name='geoip')
+        self._worker.start()
+
+    @staticmethod
+    def _open_db(db_path):
+        if not db_path:
+            return None
+        try:
+            import maxminddb
+            return maxminddb.open_database(db_path)
+        except Exception as e:
+            print(f"GeoIP database unavailable ({db_path}): {e}")
+            return None
+
+    # --- Cache ---
+
+    def cached(self, ip):
+        """Return the cached location or None (never blocks on I/O)"""
+        with self._cache_lock:
+            location = self._cache.get(ip)
+            if location is not None:
+                self._cache.move_to_end(ip)
+                self._stats['cache_hits'] += 1
+            return location
+
+    def _remember(self, ip, location):
+        with self._cache_lock:
+            self._cache[ip] = location
+            self._cache.move_to_end(ip)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    # --- Resolution ---
+
+    def _lookup_db(self, ip):
+        record = self._reader.get(ip) or {}
+        self._stats['db_lookups'] += 1
+        city = record.get('city', {}).get('names', {}).get('en')
+        country = record.get('country', {}).get('names', {}).get('en')
+        if city and country:
+            return f"{city}, {country}"
+        return country or None
+
+    def _lookup_api(self, ip):
+        import requests
+        self._stats['api_lookups'] += 1
+        # Using ip-api.com (no key needed for bulk/simple calls)
+        res = requests.get(f"http://ip-api.com/json/{ip}", timeout=GEOIP_API_TIMEOUT).json()
+        if res.get('status') == 'success':
+            return f"{res.get('city')}, {res.get('country')}"
+        return None
+
+    def resolve(self, ip):
+        """Blocking lookup (worker thread only): cache -> local db -> API"""
+        location = self.cached(ip)
+        if location is not None:
+            return location
+
+        # X-Forwarded-For may hold a proxy chain; the client is the first hop
+        address = ip.split(',')[0].strip()
+        try:
+            parsed = ipaddress.ip_address(address)
+        except ValueError:
+            return UNKNOWN
+        if parsed.is_private or parsed.is_loopback:
+            self._remember(ip, UNKNOWN)
+            return UNKNOWN
+
+        location = None
+        try:
+            if self._reader is not None:
+                location = self._lookup_db(address)
+            if location is None and self.use_api:
+                location = self._lookup_api(address)
+        except Exception as e:
+            print(f"GeoIP lookup failed for {address}: {e}")
+            # Not cached, so a later visit can retry
+            return UNKNOWN
+        location = location or UNKNOWN
+        self._remember(ip, location)
+        return location
+
+    # --- Background queue ---
+
+    def enqueue(self, ip, callback):
+        """Schedule callback(ip, location) from the worker; drops the job when the queue is full"""
+        try:
+            self._queue.put_nowait((ip, callback))
+            queued = True
+        except queue.Full:
+            queued = False
+        with self._cache_lock:
+            self._stats['queued' if queued else 'dropped'] += 1
+        return queued
+
+    def _run(self):
+        while True:
+            ip, callback = self._queue.get()
+            try:
+                location = self.resolve(ip)
+                if location != UNKNOWN:
+                    callback(ip, location)
+            except Exception as e:
+                print(f"GeoIP worker error: {e}")
+            finally:
+                self._queue.task_done()
+
+    def stats(self):
+        with self._cache_lock:
+            stats = dict(self._stats)
+            stats['cached'] = len(self._cache)
+        stats['pending'] = self._queue.qsize()
+        return stats
+
+
+# ============ SHARED INSTANCE ============
+
+_locator = None
+_locator_lock = threading.Lock()
+
+def get_geolocator():
+    """Return the shared GeoLocator (starts its worker thread on first use)"""
+    global _locator
+    if _locator is None:
+        with _locator_lock:
+            if _locator is None:
+                _locator = GeoLocator()
+    return _locator
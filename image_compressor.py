@@ -0,0 +1,405 @@
+"""
+Target-Size Image Compressor
+Predicts the quality/scale needed to hit a byte budget from a cheap size
+model instead of searching with full-resolution encodes:
+
+1. Encode a downsampled proxy at a handful of qualities -> bytes-vs-quality curve
+2. Encode a second, smaller proxy -> bytes-vs-area exponent
+3. Jump straight to the predicted quality/scale and only run 1-2 full
+   resolution encodes to correct the model
+
+The previous search (7 quality encodes + up to 10 LANCZOS resize/encode
+passes) is kept as compress_image_legacy for the benchmark.
+"""
+
+import io
+import os
+import math
+import time
+
+# ============ CONFIGURATION ============
+COMPRESS_TOLERANCE = 0.02       # Accept full-res results within 2% under the target (padding closes the gap)
+PROXY_PIXELS = 500_000          # Size-model proxy resolution
+PROBE_QUALITIES = (5, 25, 50, 75, 90, 100)
+MAX_FULL_ENCODES = 4            # Full-resolution checks before falling back to shrinking
+FALLBACK_QUALITY = 75           # Quality used when no quality fits at full size (matches the old search)
+MIN_SCALE, MAX_SCALE = 0.01, 32.0
+
+# ============ LAZY LOADING HELPERS ============
+
+_PIL = None
+def get_PIL():
+    global _PIL
+    if _PIL is None:
+        from PIL import Image
+        _PIL = Image
+    return _PIL
+
+# ============ ENCODING ============
+
+def image_format(ext):
+    return 'JPEG' if ext in ['jpg', 'jpeg'] else ext.upper()
+
+def encode_params(fmt, quality):
+    """Save parameters for a quality level (PNG maps it onto compress_level)"""
+    params = {'format': fmt, 'optimize': True}
+    if fmt in ['JPEG', 'WEBP']:
+        params['quality'] = quality
+    elif fmt == 'PNG':
+        params['compress_level'] = quality // 11
+    return params
+
+def encode(image, fmt, quality):
+    buf = io.BytesIO()
+    image.save(buf, **encode_params(fmt, quality))
+    return buf.getvalue()
+
+def prepare(image, fmt):
+    """Convert once up front instead of on every encode
+
+    Palette, 1-bit and 16-bit images are converted, since Image.reduce (used
+    for the size model's proxies) rejects those modes and LANCZOS resizing
+    falls back to nearest neighbour on them.
+    """
+    if fmt == 'JPEG':
+        return image.convert('RGB') if image.mode != 'RGB' else image
+    if image.mode in ('P', 'PA'):
+        has_alpha = image.mode == 'PA' or 'transparency' in image.info
+        return image.convert('RGBA' if has_alpha else 'RGB')
+    if image.mode == '1':
+        return image.convert('L')
+    if image.mode.startswith('I;16'):
+        # To 8-bit: PIL only writes 16-bit PNGs through the deprecated I mode
+        return image.convert('I').point(lambda value: value / 256).convert('L')
+    return image
+
+# ============ SIZE MODEL ============
+
+class SizeModel:
+    """bytes(quality, scale) ~ proxy_bytes(quality) * (full_area * scale^2 / proxy_area) ** gamma
+
+    `image` may already be a reduced decode; full_size is then the stored size.
+    """
+
+    def __init__(self, image, fmt, full_size=None):
+        self.fmt = fmt
+        full_width, full_height = full_size or image.size
+        self.area = full_width * full_height
+
+        factor = int((image.width * image.height / PROXY_PIXELS) ** 0.5)
+        proxy = image.reduce(factor) if factor >= 2 else image
+        self.proxy_area = proxy.width * proxy.height
+
+        if fmt == 'PNG':
+            # Lossless and optimize=True picks its own level: one probe covers every "quality"
+            proxy_bytes = len(encode(proxy, fmt, 100))
+            self.probes = [(q, proxy_bytes) for q in PROBE_QUALITIES]
+        else:
+            self.probes = [(q, len(encode(proxy, fmt, q))) for q in PROBE_QUALITIES]
+
+        # Bytes-vs-area exponent from a half-resolution proxy at a mid quality
+        self.gamma = 1.0
+        if min(proxy.size) >= 64:
+            small = proxy.reduce(2)
+            mid_q = PROBE_QUALITIES[len(PROBE_QUALITIES) // 2]
+            big_bytes = dict(self.probes)[mid_q]
+            small_bytes = len(encode(small, fmt, mid_q))
+            ratio = self.proxy_area / (small.width * small.height)
+            if small_bytes > 0 and big_bytes > small_bytes:
+                self.gamma = min(1.2, max(0.3, math.log(big_bytes / small_bytes) / math.log(ratio)))
+
+    def proxy_bytes(self, quality):
+        """Log-linear interpolation of the probe curve"""
+        probes = self.probes
+        if quality <= probes[0][0]:
+            return probes[0][1]
+        for (q0, b0), (q1, b1) in zip(probes, probes[1:]):
+            if quality <= q1:
+                t = (quality - q0) / (q1 - q0)
+                return math.exp(math.log(b0) + t * (math.log(b1) - math.log(b0)))
+        return probes[-1][1]
+
+    def predict(self, quality, scale=1.0):
+        return self.proxy_bytes(quality) * (self.area * scale * scale / self.proxy_area) ** self.gamma
+
+    def best_quality(self, target, correction=1.0):
+        """Highest quality predicted to fit at full size, or None"""
+        for quality in range(100, 0, -1):
+            if self.predict(quality) * correction <= target:
+                return quality
+        return None
+
+    def scale_for(self, target, quality, correction=1.0):
+        predicted = self.predict(quality) * correction
+        scale = (target / predicted) ** (1 / (2 * self.gamma))
+        return max(MIN_SCALE, min(MAX_SCALE, scale))
+
+# ============ MAIN ENTRY POINT ============
+
+def compress_image_to_target(input_path, output_path, target_bytes, ext, unit='KB'):
+    """Compress (or expand) an image to exactly target_bytes
+
+    Returns (success, message, dimensions) where dimensions holds the
+    original_dim/new_dim strings shown by the compressor page.
+    """
+    from image_loader import open_image, reduced_size
+
+    Image = get_PIL()
+    fmt = image_format(ext)
+    orig_img = open_image(input_path)  # Header only until pixels are needed
+    width, height = orig_img.size
+
+    # Size model from a reduced decode (JPEG draft mode skips most of the IDCT work)
+    factor = (width * height / PROXY_PIXELS) ** 0.5
+    proxy_src = open_image(input_path, (width / factor, height / factor)) if factor >= 2 else orig_img
+    model = SizeModel(prepare(proxy_src, fmt), fmt, (width, height))
+    aim = target_bytes * (1 - COMPRESS_TOLERANCE / 2)
+
+    # --- Predict the starting point ---
+    quality = model.best_quality(target_bytes)
+    if quality is None:
+        quality = FALLBACK_QUALITY
+        scale = model.scale_for(aim, quality)
+    elif quality == 100:
+        # Even maximum quality is under budget: enlarge (expansion mode)
+        scale = model.scale_for(aim, quality)
+    else:
+        scale = 1.0
+    scaling = scale != 1.0
+
+    # Decode only as much resolution as the predicted output needs (with
+    # headroom for the correction steps); reload at full size if it grows
+    base = prepare(open_image(input_path, reduced_size((width, height), scale, margin=1.25)), fmt)
+
+    # --- Full-resolution checks, correcting the model after each ---
+    best = None  # (size, data, image) - largest result that fits
+    fits_at, overshoots_at = 0.0, float('inf')  # Scales known to fit / overshoot
+    working_img = base
+    passes = 0
+    while passes < MAX_FULL_ENCODES * 2:
+        passes += 1
+        size_wh = (max(1, int(width * scale)), max(1, int(height * scale)))
+        if (size_wh[0] > base.width or size_wh[1] > base.height) and base.size != (width, height):
+            base = prepare(open_image(input_path), fmt)
+        working_img = base if size_wh == base.size else base.resize(size_wh, Image.Resampling.LANCZOS)
+        data = encode(working_img, fmt, quality)
+        size = len(data)
+        if size <= target_bytes and (best is None or size > best[0]):
+            best = (size, data, working_img)
+
+        if not scaling:
+            if size >= target_bytes * (1 - COMPRESS_TOLERANCE) and size <= target_bytes:
+                break
+            if size < target_bytes:
+                # Fits, but the quality steps are coarse: use the rest of the budget on resolution
+                scaling = True
+                scale = (aim / size) ** (1 / (2 * model.gamma))
+                continue
+            # Model under-predicted: correct it and pick a lower quality
+            correction = size / model.predict(quality)
+            lower = model.best_quality(target_bytes, correction)
+            if lower is None or quality <= 1:
+                scaling, quality = True, FALLBACK_QUALITY if lower is None else quality
+                scale = model.scale_for(aim, quality, size / model.predict(quality))
+            else:
+                quality = min(lower, quality - 1)
+            continue
+
+        if target_bytes * (1 - COMPRESS_TOLERANCE) <= size <= target_bytes:
+            break
+        if passes >= MAX_FULL_ENCODES and best is not None:
+            break
+        # Secant step on the area curve; keep shrinking if nothing fits yet
+        if size <= target_bytes:
+            fits_at = max(fits_at, scale)
+        else:
+            overshoots_at = min(overshoots_at, scale)
+        step = (aim / size) ** (1 / (2 * model.gamma))
+        if best is None and passes >= MAX_FULL_ENCODES:
+            step = min(step, 0.95)
+        scale = max(MIN_SCALE, min(MAX_SCALE, scale * step))
+        if 0 < fits_at and overshoots_at < float('inf') and not fits_at < scale < overshoots_at:
+            # Resampling can make size jump with scale (e.g. 1-bit art gains grey
+            # levels); don't let the secant leave the known bracket
+            scale = (fits_at * overshoots_at) ** 0.5
+
+    if best is None:
+        best = (size, data, working_img)
+    current_size, data, working_img = best
+
+    # Upgrade quality for expansion cases
+    if current_size > os.path.getsize(input_path) * 0.9 and fmt in ['JPEG', 'WEBP']:
+        from PIL import ImageFilter
+        # Multi-stage enhancement:
+        # 1. Subtle Gaussian Blur to smooth original artifacts/noise
+        # 2. Strong UnsharpMask to restore edges at NEW resolution
+        enhanced = working_img.filter(ImageFilter.GaussianBlur(radius=0.5))
+        enhanced = enhanced.filter(ImageFilter.UnsharpMask(radius=2, percent=180, threshold=2))
+        enhanced_data = encode(enhanced, fmt, 98)  # Near lossless for expansion
+        if len(enhanced_data) <= target_bytes:
+            data = enhanced_data
+
+    with open(output_path, 'wb') as f:
+        f.write(data)
+
+    # --- Exact Byte Padding ---
+    # Appending safe NULL bytes to the end of the image container
+    # Most image decoders ignore extra data at the end of the file.
+    final_size = len(data)
+    if final_size < target_bytes:
+        with open(output_path, 'ab') as f:
+            f.write(b'\0' * int(target_bytes - final_size))
+        final_size = os.path.getsize(output_path)
+        message = f"Exact size matched: {final_size} bytes (with precision padding)"
+    else:
+        message = f"Precision calibrated ({unit}) after {passes} passes"
+
+    dimensions = {
+        'original_dim': f"{orig_img.width}x{orig_img.height}",
+        'new_dim': f"{working_img.width}x{working_img.height}"
+    }
+    return True, message, dimensions
+
+# ============ REFERENCE IMPLEMENTATION ============
+
+def compress_image_legacy(input_path, output_path, target_bytes, ext, unit='KB'):
+    """The original full-resolution search, kept as the benchmark baseline"""
+    Image = get_PIL()
+    orig_img = Image.open(input_path)
+    orig_format = image_format(ext)
+
+    # --- Lever 1: Quality Tuning ---
+    low_q, high_q = 1, 100
+    best_q = 75
+    for _ in range(7):
+        mid_q = (low_q + high_q) // 2
+        temp_img = prepare(orig_img, orig_format)
+        if len(encode(temp_img, orig_format, mid_q)) <= target_bytes:
+            best_q = mid_q
+            low_q = mid_q + 1
+        else:
+            high_q = mid_q - 1
+
+    # --- Lever 2: Precision Convergence Loop ---
+    current_scale = 1.0
+    working_img = orig_img
+    for attempt in range(10):
+        temp_w = max(1, int(orig_img.width * current_scale))
+        temp_h = max(1, int(orig_img.height * current_scale))
+        working_img = prepare(orig_img.resize((temp_w, temp_h), Image.Resampling.LANCZOS), orig_format)
+        current_size = len(encode(working_img, orig_format, best_q))
+        if abs(current_size - target_bytes) / target_bytes <= 0.001:
+            break
+        size_ratio = target_bytes / current_size
+        scale_adjustment = size_ratio ** 0.5
+        if (size_ratio < 1 and current_scale > 1) or (size_ratio > 1 and current_scale < 1):
+            scale_adjustment *= 0.98
+        current_scale = max(MIN_SCALE, min(MAX_SCALE, current_scale * scale_adjustment))
+
+    quality = best_q
+    if current_size > os.path.getsize(input_path) * 0.9:
+        from PIL import ImageFilter
+        working_img = working_img.filter(ImageFilter.GaussianBlur(radius=0.5))
+        working_img = working_img.filter(ImageFilter.UnsharpMask(radius=2, percent=180, threshold=2))
+        quality = 98
+
+    data = encode(working_img, orig_format, quality)
+    with open(output_path, 'wb') as f:
+        f.write(data)
+    if len(data) < target_bytes:
+        with open(output_path, 'ab') as f:
+            f.write(b'\0' * int(target_bytes - len(data)))
+    return True, f"Precision calibrated ({unit}) after {attempt+1} passes", {
+        'original_dim': f"{orig_img.width}x{orig_img.height}",
+        'new_dim': f"{working_img.width}x{working_img.height}"
+    }
+
+# ============ BENCHMARK ============
+
+def benchmark_compression(input_paths, target_ratios=(0.1, 0.3, 0.7, 1.5), output_dir=None):
+    """Compare the model-driven compressor against the legacy search over a corpus
+
+    For each image and each target (as a fraction of the input size) records
+    CPU time and how far the encoded payload (before padding) lands from the
+    target. Returns a list of result dicts and prints a summary table.
+    """
+    import tempfile
+    output_dir = output_dir or tempfile.mkdtemp(prefix='compress_bench_')
+    engines = {'legacy': compress_image_legacy, 'model': compress_image_to_target}
+    results = []
+
+    for path in input_paths:
+        ext = os.path.splitext(path)[1].lower().replace('.', '')
+        if ext not in ['jpg', 'jpeg', 'png', 'webp']:
+            continue
+        input_size = os.path.getsize(path)
+        for ratio in target_ratios:
+            target = max(5 * 1024, int(input_size * ratio))
+            row = {'file': os.path.basename(path), 'target': target}
+            for name, engine in engines.items():
+                out = os.path.join(output_dir, f"{name}_{ratio}_{os.path.basename(path)}")
+                start = time.process_time()
+                engine(path, out, target, ext)
+                row[f'{name}_cpu'] = round(time.process_time() - start, 3)
+                # Padding makes every file exactly `target`; measure the real payload
+                with open(out, 'rb') as f:
+                    payload = len(f.read().rstrip(b'\0'))
+                row[f'{name}_error'] = round((payload - target) / target, 4)
+                os.remove(out)
+            results.append(row)
+
+    print(f"{'file':30} {'target':>10} {'legacy cpu':>11} {'model cpu':>10} {'legacy err':>11} {'model err':>10}")
+    for r in results:
+        print(f"{r['file'][:30]:30} {r['target']:>10} {r['legacy_cpu']:>11} {r['model_cpu']:>10} "
+              f"{r['legacy_error']:>11} {r['model_error']:>10}")
+    if results:
+        legacy = sum(r['legacy_cpu'] for r in results)
+        model = sum(r['model_cpu'] for r in results)
+        print(f"Total CPU: legacy {legacy:.2f}s, model {model:.2f}s ({legacy / max(model, 1e-9):.1f}x)")
+    return results
+
+def check_image_modes(target_bytes=50 * 1024):
+    """Compress generated palette, 1-bit and 16-bit PNGs; raises if any mode fails
+
+    Run with: python image_compressor.py --check
+    """
+    import shutil
+    import tempfile
+    Image = get_PIL()
+    noise = Image.effect_noise((800, 600), 64)
+    samples = {
+        'palette': noise.convert('RGB').convert('P', palette=Image.Palette.ADAPTIVE),
+        'palette_transparent': noise.convert('P'),
+        '1bit': noise.convert('1'),
+        '16bit': noise.convert('I').point(lambda value: value * 256).convert('I;16'),
+    }
+    samples['palette_transparent'].info['transparency'] = 0
+
+    temp_dir = tempfile.mkdtemp(prefix='compress_check_')
+    try:
+        for name, image in samples.items():
+            path = os.path.join(temp_dir, f"{name}.png")
+            image.save(path, **({'transparency': 0} if name == 'palette_transparent' else {}))
+            output = os.path.join(temp_dir, f"out_{name}.png")
+            success, message, dimensions = compress_image_to_target(path, output, target_bytes, 'png')
+            assert success and os.path.getsize(output) == target_bytes, (name, message)
+            print(f"{name:20} {image.mode:6} ok: {dimensions['original_dim']} -> {dimensions['new_dim']}")
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == '__main__':
+    import sys
+    if sys.argv[1:] == ['--check']:
+        check_image_modes()
+        sys.exit(0)
+    paths = []
+    for arg in sys.argv[1:]:
+        if os.path.isdir(arg):
+            paths.extend(os.path.join(arg, name) for name in sorted(os.listdir(arg)))
+        else:
+            paths.append(arg)
+    if not paths:
+        print("Usage: python image_compressor.py <image or folder> [...] | --check")
+        sys.exit(1)
+    benchmark_compression(paths)
@@ -0,0 +1,108 @@
+"""
+Reduced-Decode Image Loading
+Helpers that avoid decoding images at full resolution when the output is
+going to be much smaller, and keep per-pixel work on huge images in strips:
+
+- open_image: JPEG draft mode (DCT scaling by 1/2, 1/4 or 1/8 inside the
+  decoder) when a smaller target size is known
+- flatten_to_rgb: alpha-composite onto white one strip at a time instead of
+  allocating a full RGBA copy first
+- jpeg_passthrough_info: detect JPEGs that can be embedded into a PDF as-is
+  (no decode at all)
+"""
+
+import math
+
+# ============ CONFIGURATION ============
+TILE_ROWS = 512  # Strip height for per-pixel work on large images
+
+# ============ LAZY LOADING HELPERS ============
+
+_PIL = None
+def get_PIL():
+    global _PIL
+    if _PIL is None:
+        from PIL import Image
+        _PIL = Image
+    return _PIL
+
+# ============ LOADING ============
+
+def open_image(path, target_size=None, max_dimension=None):
+    """Open an image, letting the JPEG decoder downscale when target_size allows it
+
+    target_size is the smallest (width, height) the caller needs. The image is
+    decoded at the smallest DCT scale that still covers it; other formats (and
+    JPEGs that are not at least 2x larger than the target) decode normally.
+    max_dimension derives target_size from the stored size (longest side).
+    image.info['original_size'] always holds the size stored in the file.
+    """
+    Image = get_PIL()
+    image = Image.open(path)
+    original_size = image.size
+    if max_dimension and not target_size:
+        target_size = fit_within(original_size, max_dimension)
+    if target_size and image.format == 'JPEG':
+        need_w, need_h = max(1, int(math.ceil(target_size[0]))), max(1, int(math.ceil(target_size[1])))
+        if need_w * 2 <= image.width and need_h * 2 <= image.height:
+            image.draft(image.mode, (need_w, need_h))
+    image.info['original_size'] = original_size
+    return image
+
+def reduced_size(size, scale, margin=1.0):
+    """Smallest decode size that still covers `size` scaled by `scale` (plus margin)"""
+    return (size[0] * min(1.0, scale * margin), size[1] * min(1.0, scale * margin))
+
+def fit_within(size, max_dimension):
+    """Size scaled down (never up) so the longer side is at most max_dimension"""
+    width, height = size
+    if not max_dimension or max(width, height) <= max_dimension:
+        return size
+    ratio = max_dimension / max(width, height)
+    return max(1, int(width * ratio)), max(1, int(height * ratio))
+
+# ============ STRIP PROCESSING ============
+
+def iter_strips(size, rows=TILE_ROWS):
+    """Yield (left, top, right, bottom) boxes covering the image in horizontal strips"""
+    width, height = size
+    for top in range(0, height, rows):
+        yield (0, top, width, min(height, top + rows))
+
+def flatten_to_rgb(image, background=(255, 255, 255), rows=TILE_ROWS):
+    """RGBA/LA/P -> RGB on a solid background, composited strip by strip
+
+    Equivalent to converting the whole image to RGBA and pasting it with its
+    alpha mask, without materialising the full-size RGBA copy.
+    """
+    Image = get_PIL()
+    if image.mode == 'RGB':
+        return image
+    if image.mode not in ('RGBA', 'LA', 'P', 'PA') and 'transparency' not in image.info:
+        return image.convert('RGB')
+
+    result = Image.new('RGB', image.size, background)
+    for box in iter_strips(image.size, rows):
+        strip = image.crop(box).convert('RGBA')
+        result.paste(strip, box[:2], mask=strip.getchannel('A'))
+    return result
+
+# ============ PASSTHROUGH ============
+
+def jpeg_passthrough_info(path):
+    """Return ((width, height), mode) if the file is a JPEG a PDF can embed verbatim, else None
+
+    PDF's DCTDecode handles baseline and progressive RGB/grayscale JPEGs; CMYK
+    (Adobe inverted) and EXIF-rotated files are left to the decode path.
+    """
+    Image = get_PIL()
+    try:
+        with Image.open(path) as image:
+            if image.format != 'JPEG' or image.mode not in ('RGB', 'L'):
+                return None
+            orientation = image.getexif().get(0x0112, 1)
+            if orientation not in (None, 1):
+                return None
+            return image.size, image.mode
+    except Exception:
+        return None
@@ -0,0 +1,318 @@
+"""
+Background Job Queue
+Runs conversions, translations, compressions and merges outside the request
+thread so uploads return immediately and clients poll /jobs/<id> for status,
+or follow /jobs/<id>/events (server-sent events) for live progress reported
+by the engines (see progress.py).
+
+Backends:
+- LocalJobBackend: in-process registry + bounded thread pool (default)
+- KeyValueJobBackend: same worker pool, job records kept in a Redis-like
+  key/value client (anything with get/set(ex=...)) so state can be shared;
+  with Redis, updates are compare-and-set (WATCH/MULTI) across processes
+"""
+
+import os
+import json
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from progress import progress_scope
+
+# ============ CONFIGURATION ============
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+JOB_MAX_PENDING = int(os.environ.get('JOB_MAX_PENDING', 50))
+JOB_TTL = int(os.environ.get('JOB_TTL', 30 * 60))  # Keep finished jobs for 30 minutes
+JOB_WAIT_POLL = 1.0  # Re-check interval while waiting for changes made by other processes
+
+# Job states
+QUEUED = 'queued'
+RUNNING = 'running'
+FINISHED = 'finished'
+FAILED = 'failed'
+
+
+class QueueFullError(Exception):
+    """Raised when the backend refuses new work because too many jobs are pending"""
+    pass
+
+
+def _merge_fields(job, fields):
+    """Merge fields into a job record in place; False (unchanged) for late
+    updates to a finished job that don't change its state"""
+    if job['state'] in (FINISHED, FAILED) and 'state' not in fields:
+        return False
+    job.update(fields)
+    job['updated'] = time.time()
+    return True
+
+
+# ============ BACKEND INTERFACE ============
+
+class JobBackend:
+    """Interface every job backend implements"""
+
+    def submit(self, kind, func, *args, **kwargs):
+        """Queue func(*args, **kwargs) and return the new job id"""
+        raise NotImplementedError
+
+    def get(self, job_id):
+        """Return the job record (dict) or None"""
+        raise NotImplementedError
+
+    def update(self, job_id, **fields):
+        """Merge fields into the job record"""
+        raise NotImplementedError
+
+    def wait(self, job_id, since=0, timeout=15):
+        """Return the job record once it changed after `since` (its 'updated'
+        stamp), or as it is after timeout seconds; None if the job is unknown"""
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            if job is None or job['updated'] > since or time.monotonic() >= deadline:
+                return job
+            time.sleep(min(JOB_WAIT_POLL, max(0, deadline - time.monotonic())))
+
+
+class LocalJobBackend(JobBackend):
+    """In-process job registry backed by a bounded thread pool"""
+
+    def __init__(self, max_workers=JOB_WORKERS, max_pending=JOB_MAX_PENDING, ttl=JOB_TTL):
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._lock = threading.Lock()
+        self._changed = threading.Condition()  # Wakes wait() on every update
+        self._jobs = {}
+        self._pending = 0
+
+    # --- Storage hooks (overridden by KeyValueJobBackend) ---
+
+    def _save(self, job):
+        with self._lock:
+            self._jobs[job['id']] = job
+
+    def _load(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _prune(self):
+        """Forget finished jobs older than the TTL"""
+        threshold = time.time() - self.ttl
+        with self._lock:
+            expired = [jid for jid, j in self._jobs.items()
+                       if j['state'] in (FINISHED, FAILED) and j['updated'] < threshold]
+            for jid in expired:
+                del self._jobs[jid]
+
+    # --- Public API ---
+
+    def submit(self, kind, func, *args, **kwargs):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise QueueFullError("Server is busy, please try again in a moment")
+            self._pending += 1
+
+        self._prune()
+        now = time.time()
+        job = {
+            'id': uuid.uuid4().hex,
+            'kind': kind,
+            'state': QUEUED,
+            'progress': 0,
+            'message': 'Waiting in queue',
+            'stage': None,   # Engine-reported progress (see progress.py)
+            'done': None,
+            'total': None,
+            'rate': None,
+            'result': None,
+            'error': None,
+            'created': now,
+            'updated': now,
+        }
+        self._save(job)
+
+        try:
+            self._executor.submit(self._run, job['id'], func, args, kwargs)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+        return job['id']
+
+    def get(self, job_id):
+        return self._load(job_id)
+
+    def update(self, job_id, **fields):
+        job = self._merge(job_id, fields)
+        if job is not None:
+            with self._changed:
+                self._changed.notify_all()
+        return job
+
+    def _merge(self, job_id, fields):
+        """Apply fields to the stored record atomically; returns the record (None if unknown)
+
+        Progress reports come from several threads (e.g. translation batches)
+        and must not write back a stale copy over the final state.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            _merge_fields(job, fields)
+            return dict(job)
+
+    def wait(self, job_id, since=0, timeout=15):
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self._load(job_id)
+            remaining = deadline - time.monotonic()
+            if job is None or job['updated'] > since or remaining <= 0:
+                return job
+            # Bounded wait: updates made by other processes (shared key/value
+            # store) don't notify this condition
+            with self._changed:
+                self._changed.wait(min(JOB_WAIT_POLL, remaining))
+
+    def _report_progress(self, job_id, report):
+        """Turn an engine progress report into job fields"""
+        done, total, stage = report['done'], report['total'], report['stage'] or 'Processing'
+        fields = dict(report)
+        if total:
+            fields['progress'] = min(99, int(done * 100 / total))  # 100 is reserved for "finished"
+            fields['message'] = f"{stage}: {done}/{total}"
+        else:
+            fields['message'] = f"{stage}: {done}"
+        self.update(job_id, **fields)
+
+    def _run(self, job_id, func, args, kwargs):
+        self.update(job_id, state=RUNNING, message='Processing')
+        try:
+            with progress_scope(lambda report: self._report_progress(job_id, report)):
+                result = func(*args, **kwargs)
+            if isinstance(result, dict) and not result.get('success', True):
+                self.update(job_id, state=FAILED, progress=100,
+                            error=result.get('error') or 'Processing failed', result=result)
+            else:
+                self.update(job_id, state=FINISHED, progress=100,
+                            message=(result or {}).get('message', 'Completed'), result=result)
+        except Exception as e:
+            print(f"Job {job_id} failed: {e}")
+            import traceback
+            traceback.print_exc()
+            self.update(job_id, state=FAILED, progress=100, error=str(e))
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+
+class KeyValueJobBackend(LocalJobBackend):
+    """Job records stored as JSON in a Redis-like client (get/set with ex=ttl)"""
+
+    def __init__(self, client, prefix='cmf:job:', **kwargs):
+        super().__init__(**kwargs)
+        self.client = client
+        self.prefix = prefix
+
+    def _save(self, job):
+        self.client.set(self.prefix + job['id'], json.dumps(job), ex=self.ttl)
+
+    def _load(self, job_id):
+        raw = self.client.get(self.prefix + job_id)
+        if raw is None:
+            return None
+        if isinstance(raw, bytes):
+            raw = raw.decode('utf-8')
+        return json.loads(raw)
+
+    def _merge(self, job_id, fields):
+        if not hasattr(self.client, 'pipeline'):
+            # Single-process stand-ins (MemoryKeyValueClient): the local lock is enough
+            with self._lock:
+                job = self._load(job_id)
+                if job is not None and _merge_fields(job, fields):
+                    self._save(job)
+                return job
+
+        # Redis: optimistic compare-and-set, retried when another process wrote in between
+        from redis.exceptions import WatchError
+        key = self.prefix + job_id
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(key)
+                    raw = pipe.get(key)
+                    if raw is None:
+                        return None
+                    job = json.loads(raw.decode('utf-8') if isinstance(raw, bytes) else raw)
+                    if not _merge_fields(job, fields):
+                        return job
+                    pipe.multi()
+                    pipe.set(key, json.dumps(job), ex=self.ttl)
+                    pipe.execute()
+                    return job
+                except WatchError:
+                    continue
+
+    def _prune(self):
+        # Expiry is handled by the key/value store itself
+        pass
+
+
+class MemoryKeyValueClient:
+    """Minimal Redis stand-in (get/set with expiry) for development and load tests"""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def set(self, key, value, ex=None):
+        expires = time.time() + ex if ex else None
+        with self._lock:
+            self._data[key] = (value, expires)
+        return True
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires is not None and expires < time.time():
+                del self._data[key]
+                return None
+            return value
+
+
+# ============ BACKEND SELECTION ============
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def get_job_backend():
+    """Return the process-wide job backend (chosen by JOB_BACKEND env var)"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                kind = os.environ.get('JOB_BACKEND', 'local').lower()
+                if kind == 'redis':
+                    import redis
+                    client = redis.Redis.from_url(os.environ.get('REDIS_URL', 'redis://localhost:6379/0'))
+                    _backend = KeyValueJobBackend(client)
+                elif kind == 'memory-kv':
+                    _backend = KeyValueJobBackend(MemoryKeyValueClient())
+                else:
+                    _backend = LocalJobBackend()
+    return _backend
+
+def set_job_backend(backend):
+    """Plug in a custom backend (e.g. for load tests)"""
+    global _backend
+    with _backend_lock:
+        _backend = backend
@@ -0,0 +1,212 @@
+"""
+Target-Size PDF Compressor
+Shrinks a PDF towards a byte budget the same way the image compressor does
+for photos - by trying progressively stronger settings and keeping the
+mildest one that fits:
+
+1. Lossless pass: drop unused objects, merge duplicate streams (identical
+   images/fonts embedded more than once), subset fonts, deflate everything
+2. Lossy levels: downsample embedded raster images above the level's DPI
+   (based on how large they are actually drawn) and recompress as JPEG
+
+Images are processed one XObject at a time through PyMuPDF, so memory stays
+bounded by the largest single image rather than the whole document.
+"""
+
+import io
+import os
+import shutil
+import tempfile
+
+# ============ CONFIGURATION ============
+# (max effective DPI, JPEG quality), mildest first
+PDF_COMPRESSION_LEVELS = [(300, 85), (200, 80), (150, 75), (120, 65), (96, 55), (72, 45), (60, 35), (48, 25)]
+MIN_IMAGE_BYTES = 8 * 1024  # Smaller images aren't worth re-encoding
+MIN_IMAGE_SIDE = 32
+
+# ============ LAZY LOADING HELPERS ============
+
+_pymupdf = None
+def get_pymupdf():
+    global _pymupdf
+    if _pymupdf is None:
+        try:
+            import pymupdf
+        except ImportError:
+            import fitz as pymupdf  # PyMuPDF < 1.24
+        _pymupdf = pymupdf
+    return _pymupdf
+
+# ============ IMAGE RECOMPRESSION ============
+
+def _image_placements(doc):
+    """Largest drawn width/height (points) of every image XObject, plus its size in pixels"""
+    placements = {}
+    for page in doc:
+        for info in page.get_images(full=True):
+            xref, width, height = info[0], info[2], info[3]
+            drawn_w = drawn_h = 0
+            try:
+                for rect in page.get_image_rects(xref):
+                    drawn_w, drawn_h = max(drawn_w, rect.width), max(drawn_h, rect.height)
+            except Exception:
+                pass
+            prev = placements.get(xref)
+            if prev:
+                drawn_w, drawn_h = max(drawn_w, prev[2]), max(drawn_h, prev[3])
+            placements[xref] = (width, height, drawn_w, drawn_h)
+    return placements
+
+def _recompress_image(doc, xref, placement, max_dpi, quality):
+    """Downsample/re-encode one image XObject in place; returns bytes saved"""
+    from PIL import Image
+    pymupdf = get_pymupdf()
+
+    width, height, drawn_w, drawn_h = placement
+    if min(width, height) < MIN_IMAGE_SIDE:
+        return 0
+    # Colour-key masks don't survive lossy compression
+    if doc.xref_get_key(xref, "Mask")[0] == 'array':
+        return 0
+    # Stencil masks and 1-bit images (scans, line art) have no colour space of
+    # their own and compress better as they are (CCITT/JBIG2/Flate) than as JPEG
+    if doc.xref_get_key(xref, "ImageMask")[1] == 'true' or doc.xref_get_key(xref, "BitsPerComponent")[1] == '1':
+        return 0
+    old_size = len(doc.xref_stream_raw(xref) or b'')
+    if old_size < MIN_IMAGE_BYTES:
+        return 0
+
+    pix = pymupdf.Pixmap(doc, xref)
+    try:
+        if pix.alpha:
+            pix = pymupdf.Pixmap(pix, 0)  # Alpha lives in the separate /SMask, which is kept
+        if pix.colorspace is None or pix.colorspace.n not in (1, 3):
+            pix = pymupdf.Pixmap(pymupdf.csRGB, pix)
+        mode = 'L' if pix.n == 1 else 'RGB'
+        image = Image.frombytes(mode, (pix.width, pix.height), pix.samples)
+    finally:
+        pix = None
+
+    # Effective resolution: pixels per inch at the largest size it is drawn
+    if drawn_w > 0 and drawn_h > 0:
+        dpi = min(width / (drawn_w / 72), height / (drawn_h / 72))
+        if dpi > max_dpi:
+            ratio = max_dpi / dpi
+            image = image.resize((max(1, int(width * ratio)), max(1, int(height * ratio))),
+                                 Image.Resampling.LANCZOS)
+
+    buf = io.BytesIO()
+    image.save(buf, 'JPEG', quality=quality, optimize=True)
+    data = buf.getvalue()
+    if len(data) >= old_size:
+        return 0
+
+    doc.update_stream(xref, data, compress=False)
+    doc.xref_set_key(xref, "Filter", "/DCTDecode")
+    doc.xref_set_key(xref, "DecodeParms", "null")
+    doc.xref_set_key(xref, "Decode", "null")
+    doc.xref_set_key(xref, "Width", str(image.width))
+    doc.xref_set_key(xref, "Height", str(image.height))
+    doc.xref_set_key(xref, "ColorSpace", "/DeviceGray" if mode == 'L' else "/DeviceRGB")
+    doc.xref_set_key(xref, "BitsPerComponent", "8")
+    return old_size - len(data)
+
+# ============ PASSES ============
+
+def _save(doc, output_path):
+    options = dict(garbage=4, deflate=True, deflate_images=True, deflate_fonts=True)
+    try:
+        doc.save(output_path, use_objstms=1, **options)
+    except TypeError:
+        doc.save(output_path, **options)  # PyMuPDF without object-stream support
+
+def compress_pdf_pass(input_path, output_path, level=None):
+    """One compression attempt; level=None is the lossless pass. Returns output size."""
+    pymupdf = get_pymupdf()
+    doc = pymupdf.open(input_path)
+    try:
+        try:
+            doc.subset_fonts()
+        except Exception as e:
+            print(f"Font subsetting skipped: {e}")
+
+        if level is not None:
+            max_dpi, quality = level
+            for xref, placement in _image_placements(doc).items():
+                try:
+                    _recompress_image(doc, xref, placement, max_dpi, quality)
+                except Exception as e:
+                    print(f"Image {xref} left unchanged: {e}")
+        _save(doc, output_path)
+    finally:
+        doc.close()
+    return os.path.getsize(output_path)
+
+# ============ MAIN ENTRY POINT ============
+
+def compress_pdf_to_target(input_path, output_path, target_bytes, unit='KB'):
+    """Compress a PDF to at most target_bytes using the mildest settings that fit
+
+    Returns (success, message).
+    """
+    try:
+        get_pymupdf()
+    except ImportError:
+        return compress_pdf_basic(input_path, output_path)
+
+    original_size = os.path.getsize(input_path)
+    temp_dir = tempfile.mkdtemp(prefix='pdf_compress_')
+    try:
+        def attempt(index):
+            path = os.path.join(temp_dir, f"level_{index}.pdf")
+            level = None if index < 0 else PDF_COMPRESSION_LEVELS[index]
+            return path, compress_pdf_pass(input_path, path, level)
+
+        # Lossless first: duplicate streams, unused objects and fonts often suffice
+        best_path, best_size = attempt(-1)
+        passes = 1
+        if best_size > target_bytes:
+            # Binary search for the mildest lossy level that fits
+            smallest = (best_path, best_size)
+            fitting = None
+            low, high = 0, len(PDF_COMPRESSION_LEVELS) - 1
+            while low <= high:
+                mid = (low + high) // 2
+                path, size = attempt(mid)
+                passes += 1
+                if size < smallest[1]:
+                    smallest = (path, size)
+                if size <= target_bytes:
+                    fitting = (path, size)
+                    high = mid - 1
+                else:
+                    low = mid + 1
+            best_path, best_size = fitting or smallest
+
+        if best_size >= original_size:
+            # Nothing helped: keep the original bytes
+            best_path, best_size = input_path, original_size
+
+        shutil.copyfile(best_path, output_path)
+
+        saved = 100 * (1 - best_size / original_size) if original_size else 0
+        if best_size <= target_bytes:
+            return True, f"PDF compressed to {best_size} bytes ({saved:.0f}% smaller) after {passes} passes"
+        target = target_bytes / (1024 * 1024 if unit == 'MB' else 1024)
+        return True, (f"Target of {target:g} {unit} not reachable without destroying the document; "
+                      f"smallest version is {best_size} bytes ({saved:.0f}% smaller)")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+def compress_pdf_basic(input_path, output_path):
+    """PyPDF2 fallback: content-stream compression only"""
+    from PyPDF2 import PdfReader, PdfWriter
+    reader = PdfReader(input_path)
+    writer = PdfWriter()
+    for page in reader.pages:
+        page.compress_content_streams()
+        writer.add_page(page)
+
+    with open(output_path, 'wb') as f:
+        writer.write(f)
+    return True, "PDF processed with standard compression"
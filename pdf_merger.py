@@ -0,0 +1,234 @@
+"""
+Streaming PDF Merger
+Merges PDFs and images into one PDF through the incremental StreamingPDFWriter,
+producing output chunks as each page is finished instead of building the whole
+document in memory first:
+
+- JPEG images are embedded verbatim (DCTDecode) - no decode, no re-encode
+- Other images are decoded once and embedded as a page XObject
+  (FlateDecode, compressed one strip at a time)
+- PDF pages are copied object by object from one input at a time, so memory
+  is bounded by the largest single input rather than the merged result
+
+Inputs are checked by plan_merge() before anything is written, so a broken
+upload is reported as an error instead of a truncated download.
+"""
+
+import io
+import os
+import zlib
+from collections import deque
+
+from image_loader import open_image, flatten_to_rgb, iter_strips, jpeg_passthrough_info
+from pdf_writer import StreamingPDFWriter
+
+# ============ CONFIGURATION ============
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.bmp', '.tif', '.tiff', '.gif')
+LOSSY_FORMATS = ('JPEG', 'WEBP')  # Re-encoded as JPEG when they can't be passed through
+LOSSY_QUALITY = 90
+FLATE_LEVEL = 6
+INHERITABLE_PAGE_KEYS = ('/Resources', '/MediaBox', '/CropBox', '/Rotate')
+
+
+class _ChunkSink:
+    """File-like target for StreamingPDFWriter that buffers writes until drained"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        chunks, self.chunks = self.chunks, []
+        return chunks
+
+# ============ PLANNING ============
+
+def plan_merge(paths, names=None):
+    """Classify and validate every input; returns [(kind, path, info)]
+
+    Raises ValueError naming the first file that can't be merged (by its
+    entry in `names` when given, e.g. the original upload filename).
+    """
+    from PyPDF2 import PdfReader
+
+    plan = []
+    for index, path in enumerate(paths):
+        name = names[index] if names else os.path.basename(path)
+        ext = os.path.splitext(path)[1].lower()
+        if ext in IMAGE_EXTENSIONS:
+            info = jpeg_passthrough_info(path)
+            if info:
+                plan.append(('jpeg', path, info))
+                continue
+            try:
+                with open_image(path) as image:
+                    image.verify()
+            except Exception as e:
+                raise ValueError(f"{name} is not a readable image ({e})")
+            plan.append(('image', path, None))
+        else:
+            try:
+                reader = PdfReader(path)
+                if reader.is_encrypted and not reader.decrypt(''):
+                    raise ValueError("password protected")
+                page_count = len(reader.pages)
+            except Exception as e:
+                raise ValueError(f"{name} is not a readable PDF ({e})")
+            plan.append(('pdf', path, page_count))
+    return plan
+
+# ============ IMAGE PAGES ============
+
+def _append_image(writer, path):
+    """Decode an image once and embed it as a single page"""
+    from PIL import ImageOps
+
+    with open_image(path) as source:
+        image = ImageOps.exif_transpose(source)
+        if image.mode in ('1', 'L', 'I;16', 'I'):
+            image, color_space = image.convert('L'), 'DeviceGray'
+        else:
+            image, color_space = flatten_to_rgb(image), 'DeviceRGB'
+
+        if source.format in LOSSY_FORMATS:
+            buf = io.BytesIO()
+            image.save(buf, 'JPEG', quality=LOSSY_QUALITY)
+            chunks, filter_name = [buf.getvalue()], 'DCTDecode'
+        else:
+            chunks, filter_name = _flate_strips(image), 'FlateDecode'
+        writer.add_image_page(image.width, image.height, color_space, filter_name, chunks)
+    yield
+
+def _flate_strips(image):
+    """Raw samples deflated strip by strip"""
+    compressor = zlib.compressobj(FLATE_LEVEL)
+    for box in iter_strips(image.size):
+        yield compressor.compress(image.crop(box).tobytes())
+    yield compressor.flush()
+
+# ============ PDF PAGES ============
+
+def _serialize(obj, out, ref):
+    """Write a PyPDF2 object as PDF syntax, renumbering indirect references through ref()"""
+    from PyPDF2.generic import IndirectObject, DictionaryObject, ArrayObject
+
+    if isinstance(obj, IndirectObject):
+        out.write(f"{ref(obj)} 0 R".encode('ascii'))
+    elif isinstance(obj, DictionaryObject):
+        out.write(b"<<")
+        for key, value in obj.items():
+            out.write(b" ")
+            key.write_to_stream(out, None)
+            out.write(b" ")
+            _serialize(value, out, ref)
+        out.write(b" >>")
+    elif isinstance(obj, ArrayObject):
+        out.write(b"[")
+        for item in obj:
+            out.write(b" ")
+            _serialize(item, out, ref)
+        out.write(b" ]")
+    else:
+        obj.write_to_stream(out, None)
+
+def _serialize_object(obj, ref):
+    """Body of a top-level object; streams keep their encoded bytes unchanged"""
+    from PyPDF2.generic import StreamObject, DictionaryObject, NameObject, NumberObject
+
+    out = io.BytesIO()
+    if isinstance(obj, StreamObject):
+        data = obj._data
+        header = DictionaryObject({k: v for k, v in obj.items() if k != '/Length'})
+        header[NameObject('/Length')] = NumberObject(len(data))
+        _serialize(header, out, ref)
+        out.write(b"\nstream\n")
+        out.write(data)
+        out.write(b"\nendstream")
+    else:
+        _serialize(obj, out, ref)
+    return out.getvalue()
+
+def _inherited(page, key):
+    """Look up an inheritable page attribute through the /Parent chain"""
+    node = page
+    while node is not None:
+        if key in node:
+            return node.raw_get(key)
+        parent = node.get('/Parent')
+        node = parent.get_object() if parent is not None else None
+    return None
+
+def _append_pdf(writer, path):
+    """Copy every page of a PDF, yielding after each one
+
+    Objects are renumbered into the output as they are first referenced and
+    written straight away; the id map is dropped once the input is done.
+    """
+    from PyPDF2 import PdfReader
+    from PyPDF2.generic import DictionaryObject, NameObject
+
+    reader = PdfReader(path)
+    if reader.is_encrypted:
+        reader.decrypt('')
+
+    # Pages get their numbers upfront so links and annotations pointing at
+    # other pages resolve to the copies instead of dragging in the old page tree
+    pages = list(reader.pages)
+    id_map = {}
+    for page in pages:
+        id_map[(page.indirect_reference.idnum, page.indirect_reference.generation)] = writer.reserve()
+
+    pending = deque()
+    def ref(indirect):
+        key = (indirect.idnum, indirect.generation)
+        if key not in id_map:
+            id_map[key] = writer.reserve()
+            pending.append(indirect)
+        return id_map[key]
+
+    for page in pages:
+        body = DictionaryObject({k: v for k, v in page.items() if k != '/Parent'})
+        for key in INHERITABLE_PAGE_KEYS:
+            if key not in body:
+                value = _inherited(page, key)
+                if value is not None:
+                    body[NameObject(key)] = value
+
+        page_key = (page.indirect_reference.idnum, page.indirect_reference.generation)
+        writer.write_page(id_map[page_key], b"<< /Parent 2 0 R" + _serialize_object(body, ref)[2:])
+
+        while pending:
+            indirect = pending.popleft()
+            writer.write_object(id_map[(indirect.idnum, indirect.generation)],
+                                _serialize_object(indirect.get_object(), ref))
+        yield
+
+# ============ MAIN ENTRY POINT ============
+
+def iter_merged_pdf(plan):
+    """Generate the merged PDF as byte chunks, page by page (plan from plan_merge)"""
+    sink = _ChunkSink()
+    writer = StreamingPDFWriter(sink)
+    yield from sink.drain()
+
+    for kind, path, info in plan:
+        if kind == 'jpeg':
+            (width, height), mode = info
+            writer.add_jpeg_page(path, width, height, 'DeviceGray' if mode == 'L' else 'DeviceRGB')
+            yield from sink.drain()
+            continue
+
+        pages = _append_pdf(writer, path) if kind == 'pdf' else _append_image(writer, path)
+        for _ in pages:
+            yield from sink.drain()
+
+    writer.close()
+    yield from sink.drain()
@@ -0,0 +1,198 @@
+"""
+PDF Page Rendering
+Rasterizes selected pages of a PDF at a chosen DPI straight to disk:
+
+- poppler (pdf2image) renders with output_folder/paths_only, so page images
+  are never held in memory, and thread_count splits each page run across
+  several pdftoppm processes
+- without poppler, PyMuPDF renders page ranges in a process pool
+
+Several pages are bundled into a ZIP (stored, not re-compressed: PNG and JPEG
+are already compressed), written one file at a time.
+"""
+
+import os
+import shutil
+import zipfile
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from progress import report_progress
+
+# ============ CONFIGURATION ============
+PDF_RENDER_DPI = int(os.environ.get('PDF_RENDER_DPI', 150))
+PDF_RENDER_MIN_DPI = 36
+PDF_RENDER_MAX_DPI = int(os.environ.get('PDF_RENDER_MAX_DPI', 300))
+PDF_RENDER_MAX_PAGES = int(os.environ.get('PDF_RENDER_MAX_PAGES', 500))
+PDF_RENDER_WORKERS = int(os.environ.get('PDF_RENDER_WORKERS', min(4, os.cpu_count() or 1)))
+PDF_RENDER_MIN_PAGES = 4  # Pages per worker below which extra processes don't pay off
+
+IMAGE_FORMATS = {'png': ('png', 'png'), 'jpg': ('jpeg', 'jpg'), 'jpeg': ('jpeg', 'jpg')}  # -> (renderer fmt, extension)
+JPEG_QUALITY = 90
+
+# ============ LAZY LOADING HELPERS ============
+
+_pymupdf = None
+def get_pymupdf():
+    global _pymupdf
+    if _pymupdf is None:
+        try:
+            import pymupdf
+        except ImportError:
+            import fitz as pymupdf  # PyMuPDF < 1.24
+        _pymupdf = pymupdf
+    return _pymupdf
+
+# ============ PAGE SELECTION ============
+
+def parse_page_range(spec, page_count):
+    """'1-3,5,8-' -> [1, 2, 3, 5, 8, 9, ...] (1-based, sorted, clipped to the document)
+
+    An empty spec selects every page.
+    """
+    if not spec or not str(spec).strip():
+        return list(range(1, page_count + 1))
+
+    pages = set()
+    for part in str(spec).replace(' ', '').split(','):
+        if not part:
+            continue
+        if '-' in part:
+            start, _, end = part.partition('-')
+            start = int(start) if start else 1
+            end = int(end) if end else page_count
+        else:
+            start = end = int(part)
+        if start > end:
+            raise ValueError(f"Invalid page range: {part}")
+        pages.update(range(max(1, start), min(end, page_count) + 1))
+    if not pages:
+        raise ValueError(f"No pages selected (document has {page_count})")
+    return sorted(pages)
+
+def _runs(pages):
+    """Group sorted page numbers into contiguous (first, last) runs"""
+    runs = []
+    for page in pages:
+        if runs and page == runs[-1][1] + 1:
+            runs[-1][1] = page
+        else:
+            runs.append([page, page])
+    return [tuple(run) for run in runs]
+
+def clamp_dpi(dpi):
+    return max(PDF_RENDER_MIN_DPI, min(PDF_RENDER_MAX_DPI, int(dpi or PDF_RENDER_DPI)))
+
+# ============ RENDERERS ============
+# Both return the rendered file paths in page order.
+
+def _render_poppler(input_path, pages, output_folder, dpi, fmt, workers):
+    from pdf2image import convert_from_path
+
+    renderer_fmt, _ = IMAGE_FORMATS[fmt]
+    paths = []
+    for index, (first, last) in enumerate(_runs(pages)):
+        threads = max(1, min(workers, (last - first + 1) // PDF_RENDER_MIN_PAGES))
+        paths.extend(convert_from_path(
+            input_path, dpi=dpi, first_page=first, last_page=last, fmt=renderer_fmt,
+            jpegopt={'quality': JPEG_QUALITY} if renderer_fmt == 'jpeg' else None,
+            output_folder=output_folder, output_file=f"run{index:04d}_", paths_only=True,
+            thread_count=threads
+        ))
+        report_progress(len(paths), len(pages), 'Rendering pages')
+    return paths
+
+def _render_pymupdf_range(input_path, pages, output_folder, dpi, fmt):
+    """Worker entry point: render some pages with PyMuPDF, one pixmap at a time"""
+    pymupdf = get_pymupdf()
+
+    _, ext = IMAGE_FORMATS[fmt]
+    paths = []
+    with pymupdf.open(input_path) as doc:
+        for page_no in pages:
+            path = os.path.join(output_folder, f"page_{page_no:05d}.{ext}")
+            pix = doc[page_no - 1].get_pixmap(dpi=dpi, alpha=False)
+            if ext == 'jpg':
+                pix.save(path, jpg_quality=JPEG_QUALITY)
+            else:
+                pix.save(path)
+            pix = None
+            paths.append(path)
+            report_progress(len(paths), len(pages), 'Rendering pages')  # No-op in worker processes
+    return paths
+
+def _render_pymupdf(input_path, pages, output_folder, dpi, fmt, workers):
+    workers = min(workers, len(pages) // PDF_RENDER_MIN_PAGES)
+    if workers <= 1:
+        return _render_pymupdf_range(input_path, pages, output_folder, dpi, fmt)
+
+    step = -(-len(pages) // workers)
+    chunks = [pages[i:i + step] for i in range(0, len(pages), step)]
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        futures = [pool.submit(_render_pymupdf_range, input_path, chunk, output_folder, dpi, fmt)
+                   for chunk in chunks]
+        paths = []
+        for future in futures:
+            paths.extend(future.result())
+            report_progress(len(paths), len(pages), 'Rendering pages')
+        return paths
+
+def poppler_available():
+    return shutil.which('pdftoppm') is not None
+
+def render_pages(input_path, output_folder, pages=None, dpi=None, fmt='png', workers=None):
+    """Render pages (spec string or list of 1-based numbers) into output_folder
+
+    Returns [(page_number, path)] in page order.
+    """
+    from pdf_text import page_count
+
+    fmt = fmt.lower()
+    if fmt not in IMAGE_FORMATS:
+        raise ValueError(f"Unsupported image format: {fmt}")
+    total = page_count(input_path)
+    if not isinstance(pages, (list, tuple)):
+        pages = parse_page_range(pages, total)
+    if len(pages) > PDF_RENDER_MAX_PAGES:
+        raise ValueError(f"Too many pages selected ({len(pages)}, limit {PDF_RENDER_MAX_PAGES})")
+
+    dpi = clamp_dpi(dpi)
+    workers = workers or PDF_RENDER_WORKERS
+    renderer = _render_poppler if poppler_available() else _render_pymupdf
+    paths = renderer(input_path, list(pages), output_folder, dpi, fmt, workers)
+    if len(paths) != len(pages):
+        raise RuntimeError(f"Rendered {len(paths)} of {len(pages)} pages")
+    return list(zip(pages, paths))
+
+# ============ MAIN ENTRY POINT ============
+
+def convert_pdf_to_images(input_path, output_path, image_format='png', dpi=None, pages=None):
+    """Render PDF pages to output_path: a single image, or a ZIP of page images
+
+    A ZIP is written when output_path ends in .zip; otherwise only the first
+    selected page is rendered. Returns (success, message).
+    """
+    as_zip = output_path.lower().endswith('.zip')
+    temp_dir = tempfile.mkdtemp(prefix='pdf_render_')
+    try:
+        if not as_zip:
+            from pdf_text import page_count
+            pages = parse_page_range(pages, page_count(input_path))[:1]
+        rendered = render_pages(input_path, temp_dir, pages, dpi, image_format)
+        _, ext = IMAGE_FORMATS[image_format.lower()]
+
+        if not as_zip:
+            shutil.move(rendered[0][1], output_path)
+            return True, f"Page {rendered[0][0]} rendered to {ext.upper()} at {clamp_dpi(dpi)} DPI"
+
+        with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_STORED, allowZip64=True) as archive:
+            for index, (page_no, path) in enumerate(rendered, 1):
+                archive.write(path, f"page_{page_no:04d}.{ext}")
+                os.remove(path)
+                report_progress(index, len(rendered), 'Packing pages')
+        return True, f"{len(rendered)} pages rendered to {ext.upper()} at {clamp_dpi(dpi)} DPI (ZIP)"
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
@@ -0,0 +1,197 @@
+"""
+PDF Text Extraction Service
+Page-level text extraction shared by PDF -> TXT conversion, the PDF
+translation fallback and previews. Large PDFs are split into page ranges that
+are extracted in parallel; page texts are yielded strictly in page order so
+callers can stream them straight to a file.
+
+Backends (selectable per call, default from PDF_TEXT_BACKEND):
+- pypdf2:     pure Python, fastest to start
+- pdfplumber: better reading order for non-Latin scripts
+- pdftotext:  poppler's CLI in a subprocess, by far the fastest when installed
+
+Run `python pdf_text.py file.pdf [...]` to benchmark the available backends.
+"""
+
+import os
+import time
+import shutil
+import subprocess
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from progress import report_progress
+
+# ============ CONFIGURATION ============
+PDF_TEXT_BACKEND = os.environ.get('PDF_TEXT_BACKEND', 'pypdf2')
+PDF_TEXT_WORKERS = int(os.environ.get('PDF_TEXT_WORKERS', os.cpu_count() or 1))
+PDF_TEXT_MIN_PAGES = 16       # Pages per worker below which forking doesn't pay off
+PDF_TEXT_CHUNKS_PER_WORKER = 4  # Smaller ranges even out pages of uneven cost
+PDFTOTEXT_TIMEOUT = 120
+
+# ============ BACKENDS ============
+# Each backend yields the text of pages [first, last) in order.
+
+def _open_pypdf2(path):
+    from PyPDF2 import PdfReader
+    reader = PdfReader(path)
+    if reader.is_encrypted:
+        reader.decrypt('')
+    return reader
+
+def _extract_pypdf2(path, first, last):
+    reader = _open_pypdf2(path)
+    for index in range(first, last):
+        yield reader.pages[index].extract_text() or ''
+
+def _extract_pdfplumber(path, first, last):
+    import pdfplumber
+    with pdfplumber.open(path, pages=list(range(first + 1, last + 1))) as pdf:
+        for page in pdf.pages:
+            yield page.extract_text() or ''
+            page.flush_cache()
+
+def _extract_pdftotext(path, first, last):
+    result = subprocess.run(
+        ['pdftotext', '-enc', 'UTF-8', '-f', str(first + 1), '-l', str(last), path, '-'],
+        capture_output=True, timeout=PDFTOTEXT_TIMEOUT, check=True
+    )
+    # Every page ends with a form feed
+    pages = result.stdout.decode('utf-8', errors='replace').split('\f')
+    for index in range(last - first):
+        yield pages[index] if index < len(pages) else ''
+
+BACKENDS = {
+    'pypdf2': _extract_pypdf2,
+    'pdfplumber': _extract_pdfplumber,
+    'pdftotext': _extract_pdftotext,
+}
+
+def available_backends():
+    """Backends that can run in this environment"""
+    names = ['pypdf2', 'pdfplumber']
+    if shutil.which('pdftotext'):
+        names.append('pdftotext')
+    return names
+
+def resolve_backend(backend=None):
+    """Requested backend, or pypdf2 when it isn't available"""
+    backend = (backend or PDF_TEXT_BACKEND).lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown PDF text backend: {backend}")
+    if backend not in available_backends():
+        print(f"PDF text backend '{backend}' unavailable, using pypdf2")
+        return 'pypdf2'
+    return backend
+
+def _extract_range(backend, path, first, last):
+    """Worker entry point: one page range as a list"""
+    return list(BACKENDS[backend](path, first, last))
+
+# ============ EXTRACTION ============
+
+def page_count(path):
+    return len(_open_pypdf2(path).pages)
+
+def _executor(backend, workers):
+    # pdftotext does its work in a subprocess, so threads are enough
+    if backend == 'pdftotext':
+        return ThreadPoolExecutor(max_workers=workers)
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context)
+
+def iter_page_texts(path, backend=None, first=0, last=None, workers=None):
+    """Yield the text of each page in [first, last), in order
+
+    Ranges are extracted in parallel once there are at least
+    2 * PDF_TEXT_MIN_PAGES pages; at most 2 ranges per worker are in flight,
+    so results waiting to be consumed stay bounded.
+    """
+    backend = resolve_backend(backend)
+    if last is None:
+        last = page_count(path)
+    total = max(0, last - first)
+
+    workers = min(workers or PDF_TEXT_WORKERS, total // PDF_TEXT_MIN_PAGES)
+    # Daemonic processes (e.g. pool workers) can't start children of their own
+    if backend != 'pdftotext' and multiprocessing.current_process().daemon:
+        workers = 1
+    if workers <= 1:
+        yield from BACKENDS[backend](path, first, last)
+        return
+
+    step = max(PDF_TEXT_MIN_PAGES // 2, -(-total // (workers * PDF_TEXT_CHUNKS_PER_WORKER)))
+    ranges = deque((start, min(start + step, last)) for start in range(first, last, step))
+    with _executor(backend, workers) as pool:
+        in_flight = deque()
+        while ranges or in_flight:
+            while ranges and len(in_flight) < workers * 2:
+                start, end = ranges.popleft()
+                in_flight.append(pool.submit(_extract_range, backend, path, start, end))
+            yield from in_flight.popleft().result()
+
+def extract_text(path, backend=None, max_pages=None, workers=None):
+    """List of page texts (first max_pages pages when given)"""
+    last = page_count(path)
+    if max_pages is not None:
+        last = min(last, max_pages)
+    return list(iter_page_texts(path, backend, 0, last, workers))
+
+def extract_to_file(path, output_path, backend=None, separator='\n', workers=None):
+    """Stream page texts into a UTF-8 text file; returns the number of pages"""
+    pages, total = 0, page_count(path)
+    with open(output_path, 'w', encoding='utf-8') as out:
+        for text in iter_page_texts(path, backend, 0, total, workers):
+            if pages:
+                out.write(separator)
+            out.write(text)
+            pages += 1
+            report_progress(pages, total, 'Extracting pages')
+    return pages
+
+# ============ BENCHMARK ============
+
+def benchmark_backends(input_paths, backends=None, workers=None):
+    """Time every available backend on each PDF, single-process and parallel
+
+    Returns a list of result dicts and prints a summary table.
+    """
+    backends = backends or available_backends()
+    workers = workers or PDF_TEXT_WORKERS
+    results = []
+
+    for path in input_paths:
+        if not path.lower().endswith('.pdf'):
+            continue
+        pages = page_count(path)
+        for backend in backends:
+            row = {'file': os.path.basename(path), 'pages': pages, 'backend': backend}
+            for label, count in (('serial', 1), ('parallel', workers)):
+                start = time.perf_counter()
+                chars = sum(len(text) for text in iter_page_texts(path, backend, workers=count))
+                row[label] = round(time.perf_counter() - start, 3)
+            row['chars'] = chars
+            row['speedup'] = round(row['serial'] / max(row['parallel'], 1e-9), 2)
+            results.append(row)
+
+    print(f"{'file':30} {'pages':>6} {'backend':>10} {'serial s':>9} {'parallel s':>11} {'speedup':>8} {'chars':>9}")
+    for r in results:
+        print(f"{r['file'][:30]:30} {r['pages']:>6} {r['backend']:>10} {r['serial']:>9} "
+              f"{r['parallel']:>11} {r['speedup']:>8} {r['chars']:>9}")
+    return results
+
+
+if __name__ == '__main__':
+    import sys
+    paths = []
+    for arg in sys.argv[1:]:
+        if os.path.isdir(arg):
+            paths.extend(os.path.join(arg, name) for name in sorted(os.listdir(arg)))
+        else:
+            paths.append(arg)
+    if not paths:
+        print("Usage: python pdf_text.py <pdf or folder> [...]")
+        sys.exit(1)
+    benchmark_backends(paths)
@@ -0,0 +1,209 @@
+"""
+Layout-Aware PDF Translator
+Translates PDFs in place with PyMuPDF instead of the PDF -> DOCX -> PDF round
+trip: positioned text blocks are extracted per page, batch-translated
+document-wide, redacted from the original page and re-inserted into the same
+boxes. Images, vector graphics, links, forms and the outline are left
+untouched: all edits go into one copy of the document.
+"""
+
+import os
+import html
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from progress import report_progress
+
+# ============ CONFIGURATION ============
+PDF_TRANSLATE_WORKERS = int(os.environ.get('PDF_TRANSLATE_WORKERS', min(4, os.cpu_count() or 1)))
+PDF_PARALLEL_MIN_PAGES = 8  # Translated pages per worker below which laying out in-process is cheaper
+
+# ============ LAZY LOADING HELPERS ============
+
+_pymupdf = None
+def get_pymupdf():
+    global _pymupdf
+    if _pymupdf is None:
+        try:
+            import pymupdf
+        except ImportError:
+            import fitz as pymupdf  # PyMuPDF < 1.24
+        _pymupdf = pymupdf
+    return _pymupdf
+
+# ============ EXTRACTION ============
+
+def extract_page_blocks(page):
+    """Return positioned, horizontal text blocks: [{'bbox', 'text', 'size', 'color', 'bold'}]"""
+    blocks = []
+    for block in page.get_text("dict")["blocks"]:
+        if block.get("type") != 0:
+            continue
+        lines = []
+        style = None
+        for line in block["lines"]:
+            if abs(line["dir"][1]) > 0.01:
+                # Rotated/vertical text: leave as drawn
+                lines = []
+                break
+            line_text = "".join(span["text"] for span in line["spans"])
+            if line_text.strip():
+                lines.append(line_text.strip())
+                if style is None:
+                    span = next(s for s in line["spans"] if s["text"].strip())
+                    style = {
+                        'size': round(span["size"], 1),
+                        'color': f"#{span['color']:06x}",
+                        'bold': bool(span["flags"] & 16),
+                    }
+        if lines and style:
+            blocks.append({'bbox': tuple(block["bbox"]), 'text': " ".join(lines), **style})
+    return blocks
+
+# ============ REWRITE ============
+
+def _block_html(text, block):
+    weight = 'bold' if block['bold'] else 'normal'
+    css = (f"* {{font-family: sans-serif; font-size: {block['size']}px; "
+           f"color: {block['color']}; font-weight: {weight}; margin: 0; padding: 0;}}")
+    return html.escape(text), css
+
+def insert_blocks(page, replacements):
+    """Lay out the translated text of each block in the block's box"""
+    pymupdf = get_pymupdf()
+    for block, translated in replacements:
+        rect = pymupdf.Rect(block['bbox'])
+        text, css = _block_html(translated, block)
+        if hasattr(page, 'insert_htmlbox'):
+            # Story-based layout: shrinks to fit and falls back to
+            # bundled Noto fonts for scripts the base font lacks
+            page.insert_htmlbox(rect, text, css=css, scale_low=0)
+        else:
+            size = block['size']
+            while size >= 4 and page.insert_textbox(rect, translated, fontsize=size, fontname='helv') < 0:
+                size -= 1
+
+def redact_blocks(page, replacements):
+    """Remove the original text of the blocks, keeping images, graphics and links"""
+    pymupdf = get_pymupdf()
+    redact_options = {'images': pymupdf.PDF_REDACT_IMAGE_NONE}
+    if hasattr(pymupdf, 'PDF_REDACT_LINE_ART_NONE'):
+        redact_options['graphics'] = pymupdf.PDF_REDACT_LINE_ART_NONE
+
+    links = page.get_links()
+    for block, _ in replacements:
+        page.add_redact_annot(pymupdf.Rect(block['bbox']), fill=False)
+    page.apply_redactions(**redact_options)
+    if len(page.get_links()) < len(links):
+        # Redaction drops links overlapping the text; put them all back
+        for link in page.get_links():
+            page.delete_link(link)
+        for link in links:
+            page.insert_link(link)
+
+def render_overlays(input_path, output_path, page_numbers, page_blocks):
+    """Lay out translated text on blank pages shaped like the given source pages
+
+    Runs in a worker process for large documents: text layout is the slow
+    part of the rewrite. Page i of the output is the overlay for
+    page_numbers[i]; the parent stamps it onto its page of the one source
+    copy, so the outline, links, forms and shared resources stay intact.
+    """
+    pymupdf = get_pymupdf()
+    with pymupdf.open(input_path) as source, pymupdf.open() as overlays:
+        for page_no in page_numbers:
+            page = source[page_no]
+            overlay = overlays.new_page(width=page.mediabox.width, height=page.mediabox.height)
+            overlay.set_mediabox(page.mediabox)
+            overlay.set_cropbox(page.cropbox)
+            overlay.set_rotation(page.rotation)
+            insert_blocks(overlay, page_blocks[page_no])
+        overlays.save(output_path, garbage=3, deflate=True)
+    return output_path
+
+def _executor(workers):
+    # Not forked from the (threaded) web worker that has MuPDF state loaded
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context)
+
+# ============ MAIN ENTRY POINT ============
+
+def translate_pdf_inplace(input_path, output_path, target_lang, source_lang='auto', provider=None):
+    """Translate a PDF by editing its text blocks in place
+
+    Returns (success, message, output_path) like the other translators.
+    """
+    from translator_engine import translate_segments, should_preserve
+
+    pymupdf = get_pymupdf()
+
+    # 1. Extract positioned blocks for every page
+    page_blocks = {}
+    with pymupdf.open(input_path) as doc:
+        if doc.needs_pass:
+            return False, "PDF is password protected", None
+        page_count = doc.page_count
+        for page_no in range(page_count):
+            blocks = [b for b in extract_page_blocks(doc[page_no]) if not should_preserve(b['text'])]
+            if blocks:
+                page_blocks[page_no] = blocks
+            report_progress(page_no + 1, page_count, 'Reading pages')
+
+    if not page_blocks:
+        return False, "No extractable text (scanned PDF?)", None
+
+    # 2. Translate all blocks document-wide (deduped, packed, concurrent)
+    texts = [b['text'] for blocks in page_blocks.values() for b in blocks]
+    translations = iter(translate_segments(texts, target_lang, source_lang, provider))
+    replacements = {page_no: [(b, next(translations)) for b in blocks]
+                    for page_no, blocks in page_blocks.items()}
+
+    # 3. Rewrite the pages of one copy of the document; for large documents
+    #    the text layout is done in parallel and stamped on as overlays
+    pages = sorted(replacements)
+    workers = min(PDF_TRANSLATE_WORKERS, max(1, len(pages) // PDF_PARALLEL_MIN_PAGES))
+    if multiprocessing.current_process().daemon:
+        workers = 1  # Daemonic processes can't start children of their own
+
+    doc = pymupdf.open(input_path)
+    temp_dir, parts = None, []
+    try:
+        if workers <= 1:
+            for done, page_no in enumerate(pages, 1):
+                redact_blocks(doc[page_no], replacements[page_no])
+                insert_blocks(doc[page_no], replacements[page_no])
+                report_progress(done, len(pages), 'Rewriting pages')
+        else:
+            step = -(-len(pages) // workers)
+            chunks = [pages[i:i + step] for i in range(0, len(pages), step)]
+            temp_dir = tempfile.mkdtemp(prefix='pdf_translate_')
+            parts = [os.path.join(temp_dir, f"overlay_{i}.pdf") for i in range(len(chunks))]
+            with _executor(workers) as pool:
+                futures = [
+                    pool.submit(render_overlays, input_path, part, chunk, {p: replacements[p] for p in chunk})
+                    for part, chunk in zip(parts, chunks)
+                ]
+                done = 0
+                for future, chunk in zip(futures, chunks):
+                    with pymupdf.open(future.result()) as overlays:
+                        for index, page_no in enumerate(chunk):
+                            page = doc[page_no]
+                            redact_blocks(page, replacements[page_no])
+                            page.show_pdf_page(page.rect, overlays, index)
+                    done += len(chunk)
+                    report_progress(done, len(pages), 'Rewriting pages')
+
+        doc.save(output_path, garbage=4, deflate=True)  # 4: also merges the font copies each text box embeds
+    finally:
+        doc.close()
+        for part in parts:
+            if os.path.exists(part):
+                os.remove(part)
+        if temp_dir:
+            os.rmdir(temp_dir)
+
+    if workers <= 1:
+        return True, "PDF translated in place (layout preserved)", output_path
+    return True, f"PDF translated in place across {workers} workers (layout preserved)", output_path
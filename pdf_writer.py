@@ -0,0 +1,141 @@
+"""
+Streaming PDF Writer
+Minimal incremental PDF writer: objects are written to the output file as
+soon as they are added, and only byte offsets are kept for the xref table,
+so memory does not grow with the document.
+
+JPEG pages are embedded verbatim (DCTDecode) - the image is never decoded.
+"""
+
+import os
+import shutil
+
+PDF_HEADER = b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n"
+_COPY_CHUNK = 1024 * 1024
+
+
+class StreamingPDFWriter:
+    """Write a PDF page by page to an open binary file object"""
+
+    def __init__(self, fileobj):
+        self.out = fileobj
+        self.offsets = {}
+        self.page_refs = []
+        self._next_id = 3  # 1 = Catalog, 2 = Pages (written on close)
+        self._pos = 0
+        self._write(PDF_HEADER)
+
+    def _write(self, data):
+        self.out.write(data)
+        self._pos += len(data)
+
+    def reserve(self):
+        """Allocate an object number"""
+        obj_id = self._next_id
+        self._next_id += 1
+        return obj_id
+
+    def write_object(self, obj_id, body):
+        """Write `obj_id 0 obj <body> endobj` (body is bytes or str)"""
+        if isinstance(body, str):
+            body = body.encode('latin-1')
+        self.offsets[obj_id] = self._pos
+        self._write(f"{obj_id} 0 obj\n".encode('ascii'))
+        self._write(body)
+        self._write(b"\nendobj\n")
+
+    def write_stream(self, obj_id, dictionary, data=None, source=None, length=None):
+        """Write a stream object from bytes (`data`) or copy it from a file object (`source`)"""
+        if data is not None:
+            length = len(data)
+        self.offsets[obj_id] = self._pos
+        self._write(f"{obj_id} 0 obj\n<< {dictionary} /Length {length} >>\nstream\n".encode('latin-1'))
+        if data is not None:
+            self._write(data)
+        else:
+            start = self.out.tell()
+            shutil.copyfileobj(source, self.out, _COPY_CHUNK)
+            self._pos += self.out.tell() - start
+        self._write(b"\nendstream\nendobj\n")
+
+    def write_stream_chunks(self, obj_id, dictionary, chunks):
+        """Write a stream object from an iterable of byte chunks whose total length isn't known upfront
+
+        /Length is an indirect object written after the data.
+        """
+        length_id = self.reserve()
+        self.offsets[obj_id] = self._pos
+        self._write(f"{obj_id} 0 obj\n<< {dictionary} /Length {length_id} 0 R >>\nstream\n".encode('latin-1'))
+        length = 0
+        for chunk in chunks:
+            if chunk:
+                self._write(chunk)
+                length += len(chunk)
+        self._write(b"\nendstream\nendobj\n")
+        self.write_object(length_id, str(length))
+
+    def write_page(self, page_id, body):
+        """Write a complete page dictionary (must contain /Parent 2 0 R) and append it to the page tree"""
+        self.write_object(page_id, body)
+        self.page_refs.append(page_id)
+
+    def add_page(self, width, height, resources, content):
+        """Add a page with the given /Resources dictionary and content stream"""
+        page_id, content_id = self.reserve(), self.reserve()
+        self.write_stream(content_id, '', data=content.encode('latin-1'))
+        self.write_object(page_id, f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {width} {height}] "
+                                   f"/Resources {resources} /Contents {content_id} 0 R >>")
+        self.page_refs.append(page_id)
+        return page_id
+
+    def add_jpeg_page(self, path, width, height, color_space='DeviceRGB'):
+        """Add a page showing a JPEG file at 1px = 1pt, copying its bytes unchanged"""
+        image_id = self.reserve()
+        with open(path, 'rb') as f:
+            self.write_stream(image_id,
+                              f"/Type /XObject /Subtype /Image /Width {width} /Height {height} "
+                              f"/ColorSpace /{color_space} /BitsPerComponent 8 /Filter /DCTDecode",
+                              source=f, length=os.path.getsize(path))
+        return self.add_page(width, height, f"<< /XObject << /Im0 {image_id} 0 R >> >>",
+                             f"q {width} 0 0 {height} 0 0 cm /Im0 Do Q")
+
+    def add_image_page(self, width, height, color_space, filter_name, chunks):
+        """Add a page showing an already-encoded image stream (DCTDecode/FlateDecode) at 1px = 1pt"""
+        image_id = self.reserve()
+        self.write_stream_chunks(image_id,
+                                 f"/Type /XObject /Subtype /Image /Width {width} /Height {height} "
+                                 f"/ColorSpace /{color_space} /BitsPerComponent 8 /Filter /{filter_name}",
+                                 chunks)
+        return self.add_page(width, height, f"<< /XObject << /Im0 {image_id} 0 R >> >>",
+                             f"q {width} 0 0 {height} 0 0 cm /Im0 Do Q")
+
+    def close(self):
+        """Write the page tree, catalog, xref table and trailer"""
+        kids = ' '.join(f"{ref} 0 R" for ref in self.page_refs)
+        self.write_object(2, f"<< /Type /Pages /Kids [{kids}] /Count {len(self.page_refs)} >>")
+        self.write_object(1, "<< /Type /Catalog /Pages 2 0 R >>")
+
+        xref_pos = self._pos
+        size = self._next_id
+        self._write(f"xref\n0 {size}\n".encode('ascii'))
+        self._write(b"0000000000 65535 f \n")
+        for obj_id in range(1, size):
+            offset = self.offsets.get(obj_id)
+            if offset is None:
+                self._write(b"0000000000 00000 f \n")
+            else:
+                self._write(f"{offset:010d} 00000 n \n".encode('ascii'))
+        self._write(f"trailer\n<< /Size {size} /Root 1 0 R >>\nstartxref\n{xref_pos}\n%%EOF\n".encode('ascii'))
+
+
+def write_jpeg_pdf(jpeg_paths, output_path):
+    """Single- or multi-page PDF from JPEG files without decoding them
+
+    jpeg_paths: list of (path, (width, height), mode) with mode 'RGB' or 'L'
+    """
+    with open(output_path, 'wb') as f:
+        writer = StreamingPDFWriter(f)
+        for path, (width, height), mode in jpeg_paths:
+            writer.add_jpeg_page(path, width, height, 'DeviceGray' if mode == 'L' else 'DeviceRGB')
+        writer.close()
+    return output_path
@@ -0,0 +1,103 @@
+"""
+Progress Reporting
+Long-running engines report how far along they are, e.g.
+
+    report_progress(done, total, 'Translating segments')
+
+The job running them (job_queue) binds a reporter to its thread, which turns
+each report into the job record's progress fields; /jobs/<id>/events streams
+those to the browser. Outside a job report_progress does nothing, so engines
+call it unconditionally.
+
+Reports are throttled, and the throughput of every stage is logged when it
+completes, so stuck jobs and slow stages show up in the server logs.
+"""
+
+import time
+import threading
+
+# ============ CONFIGURATION ============
+PROGRESS_MIN_INTERVAL = 0.5  # Seconds between forwarded reports (stage changes and completion always pass)
+
+
+class ProgressReporter:
+    """Throttles done/total reports for one job and forwards them to callback(dict)
+
+    log=False skips the per-stage throughput line (e.g. in conversion workers,
+    whose reports are forwarded to, and logged by, the job's own reporter).
+    """
+
+    def __init__(self, callback, min_interval=PROGRESS_MIN_INTERVAL, log=True):
+        self.callback = callback
+        self.min_interval = min_interval
+        self.log = log
+        self._lock = threading.Lock()
+        self._stage = None
+        self._stage_started = time.monotonic()
+        self._last = 0.0
+        self._done = 0
+        self._finished_stage = None
+
+    def report(self, done, total=None, stage=None):
+        """Record that `done` of `total` units (None = unknown) of `stage` are complete
+
+        Safe to call from any thread, e.g. translation batches finishing in
+        executor threads.
+        """
+        if self.callback is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if stage is not None and (stage != self._stage or done < self._done):
+                # New stage, or the same stage starting over (e.g. a second document part)
+                self._stage, self._stage_started, self._last = stage, now, 0.0
+                self._finished_stage = None
+            self._done = done
+            finished = total is not None and done >= total
+            if not finished and now - self._last < self.min_interval:
+                return
+            if finished and self._finished_stage == self._stage:
+                return  # Already reported and logged
+            self._last = now
+            elapsed = now - self._stage_started
+            if finished:
+                self._finished_stage = self._stage
+            stage = self._stage
+
+        rate = round(done / elapsed, 1) if elapsed > 0 else None
+        if finished and self.log:
+            print(f"Progress: {stage or 'work'} done, {done} in {elapsed:.1f}s ({rate or '-'}/s)")
+        try:
+            self.callback({'stage': stage, 'done': done, 'total': total, 'rate': rate})
+        except Exception as e:
+            print(f"Progress callback failed: {e}")
+
+
+_NULL_REPORTER = ProgressReporter(None)
+_local = threading.local()
+
+def current_reporter():
+    """The reporter bound to this thread (a no-op one outside jobs)
+
+    Capture it before handing work to other threads; the binding is per thread.
+    """
+    return getattr(_local, 'reporter', None) or _NULL_REPORTER
+
+def report_progress(done, total=None, stage=None):
+    current_reporter().report(done, total, stage)
+
+
+class progress_scope:
+    """Bind a reporter for callback to the current thread for the duration of a with block"""
+
+    def __init__(self, callback, min_interval=PROGRESS_MIN_INTERVAL, log=True):
+        self.reporter = ProgressReporter(callback, min_interval, log)
+
+    def __enter__(self):
+        self._previous = getattr(_local, 'reporter', None)
+        _local.reporter = self.reporter
+        return self.reporter
+
+    def __exit__(self, *exc):
+        _local.reporter = self._previous
+        return False
@@ -0,0 +1,377 @@
+"""
+Streaming Tabular Conversions
+Constant-memory CSV -> XLSX / JSON / XML: the CSV is read in chunks of
+CSV_CHUNK_ROWS rows and every chunk is written out before the next is read,
+so memory stays flat no matter how large the input is. The same writers
+take DataFrame chunks from excel_reader for the XLSX-sourced conversions.
+
+- XLSX: openpyxl write-only workbook (rows are spooled to disk as they are
+  appended); rows past Excel's sheet limit continue on a new sheet
+- JSON: one array written record by record
+- XML:  column-wise vectorized serialization, no element tree
+
+Run `python tabular_stream.py <csv or folder> [...]` to benchmark against
+the in-memory pandas conversions.
+"""
+
+import os
+import re
+import json
+import time
+import tracemalloc
+
+from progress import report_progress
+
+# ============ CONFIGURATION ============
+CSV_CHUNK_ROWS = int(os.environ.get('CSV_CHUNK_ROWS', 50000))
+XML_WRITE_BUFFER = 1024 * 1024
+XLSX_MAX_ROWS = 1048576  # Excel's per-sheet limit, header included
+
+_INVALID_TAG_CHARS = re.compile(r'[^\w.-]')
+
+# ============ LAZY LOADING HELPERS ============
+
+_pd = None
+def get_pandas():
+    global _pd
+    if _pd is None:
+        import pandas as pd
+        _pd = pd
+    return _pd
+
+# ============ READING ============
+
+def _common_dtype(dtypes):
+    """The dtype pandas gives a column whose chunks were read as `dtypes` when it reads the whole file"""
+    pd = get_pandas()
+    if all(pd.api.types.is_numeric_dtype(d) and not pd.api.types.is_bool_dtype(d) for d in dtypes):
+        return 'float64'  # e.g. an integer column with a blank in some chunk
+    return object
+
+def read_csv_chunks(input_path, chunk_rows=None):
+    """DataFrames of at most chunk_rows rows (a header-only CSV yields one empty chunk)
+
+    pandas infers dtypes per chunk, so an integer column with a blank in a
+    later chunk would be written as 3 in one chunk and 3.0 in the next. A
+    first pass collects every chunk's dtypes; columns whose chunks disagree
+    are then read with the dtype the whole file would have given them, so
+    the output does not depend on chunk_rows. A CSV that fits in one chunk
+    is read only once.
+    """
+    pd = get_pandas()
+    chunk_rows = chunk_rows or CSV_CHUNK_ROWS
+    seen = {}
+    first, chunks, total = None, 0, 0
+    with pd.read_csv(input_path, chunksize=chunk_rows) as reader:
+        for chunk in reader:
+            for name, dtype in chunk.dtypes.items():
+                seen.setdefault(name, set()).add(dtype)
+            if first is None:
+                first = chunk
+            chunks += 1
+            total += len(chunk)
+            report_progress(total, None, 'Checking column types')
+    if chunks == 1:
+        yield first
+        report_progress(total, total, 'Converting rows')
+        return
+    first = None
+    dtypes = {name: _common_dtype(kinds) for name, kinds in seen.items() if len(kinds) > 1}
+
+    rows = 0
+    with pd.read_csv(input_path, chunksize=chunk_rows, dtype=dtypes or None) as reader:
+        for chunk in reader:
+            yield chunk
+            rows += len(chunk)
+            report_progress(rows, total, 'Converting rows')
+
+def iter_chunk_rows(chunk):
+    """Row tuples of plain Python values, with missing values as None"""
+    values = chunk.astype(object).where(chunk.notna(), None)
+    return values.itertuples(index=False, name=None)
+
+def xml_tag(name):
+    """Column name -> valid XML element name ("Unit price/kg" -> "Unit_price_kg", "2024" -> "_2024")"""
+    tag = _INVALID_TAG_CHARS.sub('_', str(name).strip())
+    if not tag:
+        return 'field'
+    if not (tag[0].isalpha() or tag[0] == '_') or tag.lower().startswith('xml'):
+        tag = '_' + tag
+    return tag
+
+# ============ WRITERS ============
+# Each takes an iterable of DataFrames and returns the number of rows written.
+
+def write_xlsx(chunks, output_path, sheet_title='Sheet1'):
+    """Stream rows into a write-only openpyxl workbook"""
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+
+    workbook = Workbook(write_only=True)
+    sheet = None
+    header = None
+    sheet_rows = 0
+    sheets = 0
+    total = 0
+
+    def new_sheet():
+        nonlocal sheet, sheet_rows, sheets
+        sheets += 1
+        sheet = workbook.create_sheet(sheet_title if sheets == 1 else f"{sheet_title} ({sheets})")
+        cells = []
+        for name in header or []:
+            cell = WriteOnlyCell(sheet, value=name)
+            cell.font = Font(bold=True)
+            cells.append(cell)
+        sheet.append(cells)
+        sheet_rows = 1
+
+    for chunk in chunks:
+        if header is None:
+            header = [str(name) for name in chunk.columns]
+        for row in iter_chunk_rows(chunk):
+            if sheet is None or sheet_rows >= XLSX_MAX_ROWS:
+                new_sheet()
+            sheet.append(row)
+            sheet_rows += 1
+            total += 1
+
+    if sheet is None:
+        new_sheet()
+    workbook.save(output_path)
+    return total
+
+def _write_json_array(out, chunks, indent=2, force_ascii=True, level=0):
+    pad = ' ' * (indent * level)
+    total = 0
+    out.write('[')
+    for chunk in chunks:
+        if chunk.empty:
+            continue
+        # Each chunk is serialized by pandas; only its enclosing brackets are dropped
+        body = chunk.to_json(orient='records', indent=indent, force_ascii=force_ascii)
+        body = body.strip()[1:-1].strip('\n')
+        if pad:
+            body = pad + body.replace('\n', '\n' + pad)  # Newlines inside values are escaped
+        out.write(',\n' if total else '\n')
+        out.write(body)
+        total += len(chunk)
+    out.write(f'\n{pad}]' if total else ']')
+    return total
+
+def write_json_records(chunks, output_path, indent=2, force_ascii=True):
+    """Stream a JSON array of records, formatted like DataFrame.to_json(orient='records')"""
+    with open(output_path, 'w', encoding='utf-8') as out:
+        return _write_json_array(out, chunks, indent, force_ascii)
+
+def write_json_sheets(sheets, output_path, indent=2, force_ascii=True):
+    """Stream {"sheet name": [records...], ...} from (name, chunks) pairs"""
+    total = 0
+    with open(output_path, 'w', encoding='utf-8') as out:
+        out.write('{')
+        for index, (name, chunks) in enumerate(sheets):
+            out.write(',\n' if index else '\n')
+            out.write(' ' * indent + json.dumps(str(name), ensure_ascii=force_ascii) + ': ')
+            total += _write_json_array(out, chunks, indent, force_ascii, level=1)
+        out.write('\n}')
+    return total
+
+def write_csv(chunks, output_path):
+    """Append chunks to one CSV, header written once"""
+    total = 0
+    with open(output_path, 'w', encoding='utf-8', newline='') as out:
+        for chunk in chunks:
+            chunk.to_csv(out, index=False, header=(total == 0))
+            total += len(chunk)
+    return total
+
+def _escape_column(text):
+    """XML-escape a string Series in three vectorized passes"""
+    return (text.str.replace('&', '&amp;', regex=False)
+                .str.replace('<', '&lt;', regex=False)
+                .str.replace('>', '&gt;', regex=False))
+
+def _column_elements(column, open_tag, close_tag, empty_tag):
+    """Series of complete '<tag>value</tag>' strings for one column"""
+    pd = get_pandas()
+    missing = column.isna()
+    if pd.api.types.is_datetime64_any_dtype(column):
+        text = column.dt.strftime('%Y-%m-%d %H:%M:%S')  # Same as str(Timestamp)
+    else:
+        text = column.astype(str)
+        # Numbers never contain markup characters
+        if not pd.api.types.is_numeric_dtype(column):
+            text = _escape_column(text)
+    elements = open_tag + text + close_tag
+    if missing.any():
+        elements = elements.mask(missing, empty_tag)
+    return elements
+
+def _chunk_records(chunk, tags, open_record, close_record):
+    """One markup string per row: open_record + column elements + close_record"""
+    records = open_record
+    for (_, column), (open_tag, close_tag, empty_tag) in zip(chunk.items(), tags):
+        records = records + _column_elements(column, open_tag, close_tag, empty_tag)
+    if not tags:
+        records = get_pandas().Series(records, index=chunk.index)
+    return records + close_record
+
+def _write_xml_records(out, chunks, record_tag):
+    total = 0
+    tags = None
+    for chunk in chunks:
+        if tags is None:
+            tags = [(f"<{tag}>", f"</{tag}>", f"<{tag} />") for tag in map(xml_tag, chunk.columns)]
+        if chunk.empty:
+            continue
+        records = _chunk_records(chunk, tags, f"<{record_tag}>", f"</{record_tag}>")
+        out.write(''.join(records.tolist()))
+        total += len(chunk)
+    return total
+
+def write_xml_records(chunks, output_path, root_tag='root', record_tag='record'):
+    """Stream <root><record><column>value</column>...</record>...</root>
+
+    Serialization is column-wise: every column of a chunk is escaped and
+    wrapped in its (precomputed) tags with vectorized string operations,
+    the columns are concatenated into record strings and the chunk is
+    written in one call - no element objects are created at all.
+    """
+    with open(output_path, 'w', encoding='utf-8', buffering=XML_WRITE_BUFFER) as out:
+        out.write('<?xml version="1.0" encoding="utf-8"?>\n')
+        out.write(f"<{root_tag}>")
+        total = _write_xml_records(out, chunks, record_tag)
+        out.write(f"</{root_tag}>")
+    return total
+
+def write_xml_sheets(sheets, output_path, root_tag='root', sheet_tag='sheet', record_tag='record'):
+    """Stream <root><sheet name="..."><record>...</record></sheet>...</root> from (name, chunks) pairs"""
+    from xml.sax.saxutils import quoteattr
+
+    total = 0
+    with open(output_path, 'w', encoding='utf-8', buffering=XML_WRITE_BUFFER) as out:
+        out.write('<?xml version="1.0" encoding="utf-8"?>\n')
+        out.write(f"<{root_tag}>")
+        for name, chunks in sheets:
+            out.write(f"<{sheet_tag} name={quoteattr(str(name))}>")
+            total += _write_xml_records(out, chunks, record_tag)
+            out.write(f"</{sheet_tag}>")
+        out.write(f"</{root_tag}>")
+    return total
+
+def write_html_tables(sheets, output_path, titles=True):
+    """Stream an HTML page with one table per (name, chunks) pair (markup like DataFrame.to_html)"""
+    import html
+
+    total = 0
+    with open(output_path, 'w', encoding='utf-8', buffering=XML_WRITE_BUFFER) as out:
+        out.write('<html><head><meta charset="utf-8"></head><body>\n')
+        for name, chunks in sheets:
+            if titles:
+                out.write(f"<h2>{html.escape(str(name))}</h2>\n")
+            out.write('<table border="1" class="dataframe">\n')
+            tags = None
+            for chunk in chunks:
+                if tags is None:
+                    out.write('  <thead>\n    <tr style="text-align: right;">\n')
+                    out.write(''.join(f"      <th>{html.escape(str(col))}</th>\n" for col in chunk.columns))
+                    out.write('    </tr>\n  </thead>\n  <tbody>\n')
+                    tags = [("      <td>", "</td>\n", "      <td></td>\n")] * len(chunk.columns)
+                if not chunk.empty:
+                    out.write(''.join(_chunk_records(chunk, tags, "    <tr>\n", "    </tr>\n").tolist()))
+                    total += len(chunk)
+            if tags is not None:
+                out.write('  </tbody>\n')
+            out.write('</table>\n')
+        out.write('</body></html>\n')
+    return total
+
+# ============ MAIN ENTRY POINTS ============
+
+def convert_csv_to_xlsx_stream(input_path, output_path, chunk_rows=None):
+    rows = write_xlsx(read_csv_chunks(input_path, chunk_rows), output_path)
+    return True, f"CSV to XLSX conversion successful ({rows} rows)"
+
+def convert_csv_to_json_stream(input_path, output_path, chunk_rows=None):
+    rows = write_json_records(read_csv_chunks(input_path, chunk_rows), output_path)
+    return True, f"CSV to JSON conversion successful ({rows} rows)"
+
+def convert_csv_to_xml_stream(input_path, output_path, chunk_rows=None):
+    rows = write_xml_records(read_csv_chunks(input_path, chunk_rows), output_path)
+    return True, f"CSV to XML conversion successful ({rows} rows)"
+
+# ============ BENCHMARK ============
+
+def _legacy_csv_to_xlsx(input_path, output_path):
+    get_pandas().read_csv(input_path).to_excel(output_path, index=False)
+
+def _legacy_csv_to_json(input_path, output_path):
+    get_pandas().read_csv(input_path).to_json(output_path, orient='records', indent=2)
+
+def _legacy_csv_to_xml(input_path, output_path):
+    import xml.etree.ElementTree as ET
+    pd = get_pandas()
+    df = pd.read_csv(input_path)
+    root = ET.Element("root")
+    for _, row in df.iterrows():
+        record = ET.SubElement(root, "record")
+        for col in df.columns:
+            field = ET.SubElement(record, col.replace(" ", "_").replace("/", "_"))
+            field.text = str(row[col]) if pd.notna(row[col]) else ""
+    ET.ElementTree(root).write(output_path, encoding='utf-8', xml_declaration=True)
+
+def benchmark_csv_conversions(input_paths, targets=('xlsx', 'json', 'xml'), output_dir=None, trace_memory=True):
+    """Time and peak traced memory of the pandas path vs the streaming path
+
+    Returns a list of result dicts and prints a summary table.
+    """
+    import tempfile
+    output_dir = output_dir or tempfile.mkdtemp(prefix='csv_bench_')
+    engines = {
+        'xlsx': (_legacy_csv_to_xlsx, convert_csv_to_xlsx_stream),
+        'json': (_legacy_csv_to_json, convert_csv_to_json_stream),
+        'xml': (_legacy_csv_to_xml, convert_csv_to_xml_stream),
+    }
+    results = []
+
+    for path in input_paths:
+        if not path.lower().endswith('.csv'):
+            continue
+        for target in targets:
+            row = {'file': os.path.basename(path), 'mb': round(os.path.getsize(path) / 1e6, 1), 'target': target}
+            for name, engine in zip(('pandas', 'stream'), engines[target]):
+                out = os.path.join(output_dir, f"{name}.{target}")
+                start = time.perf_counter()
+                engine(path, out)
+                row[f'{name}_s'] = round(time.perf_counter() - start, 2)
+                # Separate run: tracing slows allocation-heavy code down too much to time it
+                if trace_memory:
+                    tracemalloc.start()
+                    engine(path, out)
+                    row[f'{name}_mb'] = round(tracemalloc.get_traced_memory()[1] / 1e6, 1)
+                    tracemalloc.stop()
+                else:
+                    row[f'{name}_mb'] = '-'
+                os.remove(out)
+            results.append(row)
+
+    print(f"{'file':24} {'MB':>6} {'target':>6} {'pandas s':>9} {'stream s':>9} {'pandas MB':>10} {'stream MB':>10}")
+    for r in results:
+        print(f"{r['file'][:24]:24} {r['mb']:>6} {r['target']:>6} {r['pandas_s']:>9} {r['stream_s']:>9} "
+              f"{r['pandas_mb']:>10} {r['stream_mb']:>10}")
+    return results
+
+
+if __name__ == '__main__':
+    import sys
+    paths = []
+    for arg in sys.argv[1:]:
+        if os.path.isdir(arg):
+            paths.extend(os.path.join(arg, name) for name in sorted(os.listdir(arg)))
+        else:
+            paths.append(arg)
+    if not paths:
+        print("Usage: python tabular_stream.py <csv or folder> [...]")
+        sys.exit(1)
+    benchmark_csv_conversions(paths)
@@ -0,0 +1,211 @@
+"""
+Translation Backends
+Provider abstraction for the translator engine. Every backend translates a
+list of segments into a list of the same length and order (no separator
+tricks), and can be selected per request through the registry.
+
+Providers:
+- google: deep_translator.GoogleTranslator (default)
+- local:  deterministic offline stub with configurable latency and
+          failure injection, for benchmarks and load tests (not selectable
+          by anonymous requests, see is_public_provider)
+"""
+
+import os
+import re
+import time
+import random
+import threading
+
+DEFAULT_PROVIDER = os.environ.get('TRANSLATION_PROVIDER', 'google')
+# Comma-separated providers anyone may select per request (default: backends marked public)
+PUBLIC_PROVIDERS = os.environ.get('TRANSLATION_PUBLIC_PROVIDERS', '')
+
+
+class TranslationBackendError(Exception):
+    """Raised by a backend when a provider call fails"""
+    pass
+
+
+class TranslationBackend:
+    """Base class: list of segments in, list of translations out"""
+
+    name = 'base'
+    host = 'local'        # Key for the executor's per-host concurrency cap
+    cacheable = True      # Whether results may be stored in the translation memory
+    public = True         # Whether anonymous /translate requests may select it
+    native_batch = False  # True when translate_batch is a single provider call
+
+    def __init__(self):
+        self._stats_lock = threading.Lock()
+        self._stats = {'calls': 0, 'segments': 0, 'characters': 0, 'failures': 0, 'seconds': 0.0}
+
+    def translate(self, text, target, source='auto'):
+        """Translate one segment"""
+        raise NotImplementedError
+
+    def translate_batch(self, segments, target, source='auto'):
+        """Translate many segments; result has the same length and order"""
+        return [self.translate(segment, target, source) for segment in segments]
+
+    def _record(self, segments, characters, seconds, failed=False):
+        with self._stats_lock:
+            self._stats['calls'] += 1
+            self._stats['segments'] += segments
+            self._stats['characters'] += characters
+            self._stats['seconds'] += seconds
+            if failed:
+                self._stats['failures'] += 1
+
+    def stats(self):
+        """Call/segment/character counters for cost and latency comparisons"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['avg_latency'] = round(stats['seconds'] / stats['calls'], 4) if stats['calls'] else 0.0
+        return stats
+
+
+class GoogleBackend(TranslationBackend):
+    """Google Translate via deep_translator (one HTTP call per segment)"""
+
+    name = 'google'
+    host = 'translate.google.com'
+
+    def __init__(self):
+        super().__init__()
+        self._local = threading.local()
+
+    def _translator(self, source, target):
+        """Reuse one GoogleTranslator per thread and language pair"""
+        from deep_translator import GoogleTranslator
+        translators = getattr(self._local, 'translators', None)
+        if translators is None:
+            translators = self._local.translators = {}
+        translator = translators.get((source, target))
+        if translator is None:
+            translator = translators[(source, target)] = GoogleTranslator(source=source, target=target)
+        return translator
+
+    def translate(self, text, target, source='auto'):
+        start = time.monotonic()
+        try:
+            result = self._translator(source, target).translate(text)
+            if not result:
+                raise TranslationBackendError("Empty translation returned")
+        except Exception:
+            self._record(1, len(text), time.monotonic() - start, failed=True)
+            raise
+        self._record(1, len(text), time.monotonic() - start)
+        return result
+
+    def translate_batch(self, segments, target, source='auto'):
+        # Google has no batch endpoint here; fan segments out through the executor
+        from translation_executor import get_translation_executor
+        executor = get_translation_executor()
+        return executor.map(lambda segment: executor.call(self.host, self.translate, segment, target, source),
+                            segments)
+
+
+class LocalBackend(TranslationBackend):
+    """Deterministic offline provider: '[target] text' after a simulated delay
+
+    failure_rate injects provider errors; mangle_rate drops a segment tag from
+    packed payloads to exercise the batching layer's recovery path.
+    """
+
+    name = 'local'
+    cacheable = False  # Never let stub output leak into the translation memory
+    public = False     # Benchmark stub: admins (or TRANSLATION_PUBLIC_PROVIDERS) only
+
+    def __init__(self, latency=None, per_char_latency=None, failure_rate=None, mangle_rate=None,
+                 native_batch=None, seed=0):
+        super().__init__()
+        env = os.environ.get
+        self.latency = float(latency if latency is not None else env('LOCAL_TRANSLATOR_LATENCY', 0.05))
+        self.per_char_latency = float(per_char_latency if per_char_latency is not None
+                                      else env('LOCAL_TRANSLATOR_PER_CHAR_LATENCY', 0.0))
+        self.failure_rate = float(failure_rate if failure_rate is not None
+                                  else env('LOCAL_TRANSLATOR_FAILURE_RATE', 0.0))
+        self.mangle_rate = float(mangle_rate if mangle_rate is not None
+                                 else env('LOCAL_TRANSLATOR_MANGLE_RATE', 0.0))
+        if native_batch is None:
+            native_batch = env('LOCAL_TRANSLATOR_NATIVE_BATCH', 'on').lower() not in ('0', 'off', 'false')
+        self.native_batch = native_batch
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+
+    def _roll(self, rate):
+        with self._random_lock:
+            return self._random.random() < rate
+
+    def _simulate_call(self, segments, characters):
+        delay = self.latency + self.per_char_latency * characters
+        if delay > 0:
+            time.sleep(delay)
+        failed = self._roll(self.failure_rate)
+        self._record(segments, characters, delay, failed=failed)
+        if failed:
+            raise TranslationBackendError("Injected failure")
+
+    @staticmethod
+    def _fake_translate(text, target):
+        if re.search(r'<s\d+>', text):
+            # Packed payload: "translate" inside each segment tag
+            return re.sub(r'(<s\d+>)(.*?)(</s\d+>)',
+                          lambda m: f"{m.group(1)}[{target}] {m.group(2)}{m.group(3)}", text, flags=re.DOTALL)
+        return f"[{target}] {text}"
+
+    def translate(self, text, target, source='auto'):
+        self._simulate_call(1, len(text))
+        result = self._fake_translate(text, target)
+        if self.mangle_rate and self._roll(self.mangle_rate):
+            result = re.sub(r'</s\d+>', '', result, count=1)
+        return result
+
+    def translate_batch(self, segments, target, source='auto'):
+        if not self.native_batch:
+            return super().translate_batch(segments, target, source)
+        self._simulate_call(len(segments), sum(len(s) for s in segments))
+        return [self._fake_translate(segment, target) for segment in segments]
+
+
+# ============ REGISTRY ============
+
+BACKENDS = {
+    'google': GoogleBackend,
+    'local': LocalBackend,
+}
+
+_instances = {}
+_instances_lock = threading.Lock()
+
+def register_backend(name, factory):
+    """Register a provider factory (class or zero-argument callable)"""
+    with _instances_lock:
+        BACKENDS[name] = factory
+        _instances.pop(name, None)
+
+def normalize_provider(name):
+    """Canonical registry key for a provider name ('' and None -> None)"""
+    name = (name or '').strip().lower()
+    return name or None
+
+def is_public_provider(name):
+    """Whether a request without an admin session may select provider `name`"""
+    name = normalize_provider(name)
+    if PUBLIC_PROVIDERS.strip():
+        return name in {normalize_provider(p) for p in PUBLIC_PROVIDERS.split(',')}
+    return name in BACKENDS and getattr(BACKENDS[name], 'public', True)
+
+def get_backend(name=None):
+    """Return the shared backend instance for `name` (default: TRANSLATION_PROVIDER)"""
+    name = normalize_provider(name) or normalize_provider(DEFAULT_PROVIDER)
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown translation provider: {name}")
+    backend = _instances.get(name)
+    if backend is None:
+        with _instances_lock:
+            backend = _instances.get(name)
+            if backend is None:
+                backend = _instances[name] = BACKENDS[name]()
+    return backend
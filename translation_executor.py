@@ -0,0 +1,122 @@
+"""
+Translation Executor
+Runs translation calls in parallel while staying under provider throttling:
+- token-bucket rate limiter shared by all calls
+- per-host concurrency caps
+- jittered exponential backoff on failures
+- order-preserving map over chunks/batches
+"""
+
+import os
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# ============ CONFIGURATION ============
+TRANSLATE_WORKERS = int(os.environ.get('TRANSLATE_WORKERS', 6))
+TRANSLATE_RATE = float(os.environ.get('TRANSLATE_RATE', 5))      # Requests per second (sustained)
+TRANSLATE_BURST = int(os.environ.get('TRANSLATE_BURST', 10))     # Bucket capacity
+TRANSLATE_PER_HOST = int(os.environ.get('TRANSLATE_PER_HOST', 4))  # Concurrent requests per host
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens/second, at most `capacity` banked"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """Block until `tokens` are available"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+                self._stamp = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class TranslationExecutor:
+    """Thread pool + rate limiter + retry policy for outbound translation calls"""
+
+    def __init__(self, max_workers=TRANSLATE_WORKERS, rate=TRANSLATE_RATE, burst=TRANSLATE_BURST,
+                 per_host=TRANSLATE_PER_HOST, max_retries=3, base_delay=1.0, max_delay=20.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.per_host = per_host
+        self._bucket = TokenBucket(rate, burst)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='translate')
+        self._host_slots = {}
+        self._host_lock = threading.Lock()
+        self._local = threading.local()
+
+    def _slot(self, host):
+        with self._host_lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.per_host)
+            return self._host_slots[host]
+
+    def backoff_delay(self, attempt):
+        """Full-jitter exponential backoff"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def call(self, host, func, *args, max_retries=None, **kwargs):
+        """Run func under the rate limit and host cap, retrying with backoff.
+
+        Re-raises the last exception once all attempts fail.
+        """
+        attempts = max_retries if max_retries is not None else self.max_retries
+        last_error = None
+        for attempt in range(attempts):
+            self._bucket.acquire()
+            try:
+                with self._slot(host):
+                    return func(*args, **kwargs)
+            except Exception as e:
+                last_error = e
+                print(f"Attempt {attempt+1} failed for {host}: {e}")
+                if attempt < attempts - 1:
+                    time.sleep(self.backoff_delay(attempt))
+        raise last_error
+
+    def map(self, func, items):
+        """Apply func to every item in parallel, returning results in input order.
+
+        Calls made from inside a pool thread run inline so nested maps (batches
+        of chunks) cannot deadlock the pool.
+        """
+        items = list(items)
+        if len(items) <= 1 or getattr(self._local, 'inside', False):
+            return [func(item) for item in items]
+        return list(self._pool.map(self._run_inside, [func] * len(items), items))
+
+    def _run_inside(self, func, item):
+        self._local.inside = True
+        try:
+            return func(item)
+        finally:
+            self._local.inside = False
+
+
+# ============ SHARED INSTANCE ============
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_translation_executor():
+    """Return the process-wide TranslationExecutor"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = TranslationExecutor()
+    return _executor
@@ -0,0 +1,200 @@
+"""
+Translation Memory
+Persistent SQLite cache of translated segments keyed by
+(source_lang, target_lang, normalized segment) so repeated headers, footers
+and table labels never hit the network twice.
+"""
+
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+
+# ============ CONFIGURATION ============
+TM_PATH = os.environ.get('TRANSLATION_MEMORY_PATH', 'translation_memory.db')
+TM_MAX_ENTRIES = int(os.environ.get('TRANSLATION_MEMORY_MAX_ENTRIES', 200000))
+TM_TTL = int(os.environ.get('TRANSLATION_MEMORY_TTL', 30 * 24 * 3600))  # 30 days
+TM_MAX_SEGMENT = 5000  # Longer segments are not worth caching
+TM_ENABLED = os.environ.get('TRANSLATION_MEMORY', 'on').lower() not in ('0', 'off', 'false')
+
+_SQL_BATCH = 500  # Stay well below SQLite's bound-parameter limit
+
+
+def normalize_segment(text):
+    """Canonical form used for memory keys (collapsed whitespace, trimmed)"""
+    return re.sub(r'\s+', ' ', text or '').strip()
+
+
+class TranslationMemory:
+    """SQLite-backed segment store with LRU/TTL eviction and hit/miss counters"""
+
+    def __init__(self, path=TM_PATH, max_entries=TM_MAX_ENTRIES, ttl=TM_TTL):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._writes_since_evict = 0
+
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS segments (
+                key TEXT PRIMARY KEY,
+                source TEXT NOT NULL,
+                target TEXT NOT NULL,
+                segment TEXT NOT NULL,
+                translation TEXT NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_segments_last_used ON segments(last_used)")
+        conn.commit()
+
+    def _conn(self):
+        """One connection per thread (sqlite3 connections are not thread-safe)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def make_key(segment, source_lang, target_lang):
+        raw = f"{source_lang}\x00{target_lang}\x00{normalize_segment(segment)}"
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    # --- Lookups ---
+
+    def get(self, segment, source_lang, target_lang):
+        """Return the cached translation or None"""
+        return self.get_many([segment], source_lang, target_lang).get(segment)
+
+    def get_many(self, segments, source_lang, target_lang):
+        """Bulk lookup: returns {segment: translation} for every hit"""
+        keyed = {}
+        for seg in segments:
+            if seg and len(seg) <= TM_MAX_SEGMENT:
+                keyed.setdefault(self.make_key(seg, source_lang, target_lang), []).append(seg)
+        if not keyed:
+            return {}
+
+        now = time.time()
+        found = {}
+        conn = self._conn()
+        keys = list(keyed)
+        for i in range(0, len(keys), _SQL_BATCH):
+            chunk = keys[i:i + _SQL_BATCH]
+            marks = ','.join('?' * len(chunk))
+            rows = conn.execute(
+                f"SELECT key, translation FROM segments WHERE key IN ({marks}) AND created >= ?",
+                chunk + [now - self.ttl]
+            ).fetchall()
+            for key, translation in rows:
+                found[key] = translation
+
+        if found:
+            # Touch for LRU ordering
+            conn.executemany("UPDATE segments SET last_used = ? WHERE key = ?",
+                             [(now, k) for k in found])
+            conn.commit()
+
+        result = {}
+        for key, segs in keyed.items():
+            if key in found:
+                for seg in segs:
+                    result[seg] = found[key]
+
+        with self._lock:
+            self._hits += len(result)
+            self._misses += len(set(segments)) - len(result)
+        return result
+
+    # --- Writes ---
+
+    def put(self, segment, translation, source_lang, target_lang):
+        self.put_many({segment: translation}, source_lang, target_lang)
+
+    def put_many(self, pairs, source_lang, target_lang):
+        """Store {segment: translation} pairs"""
+        now = time.time()
+        rows = []
+        for seg, trans in pairs.items():
+            if not seg or not trans or len(seg) > TM_MAX_SEGMENT:
+                continue
+            rows.append((self.make_key(seg, source_lang, target_lang), source_lang, target_lang,
+                         normalize_segment(seg), trans, now, now))
+        if not rows:
+            return
+
+        conn = self._conn()
+        conn.executemany("INSERT OR REPLACE INTO segments VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        conn.commit()
+
+        with self._lock:
+            self._writes_since_evict += len(rows)
+            should_evict = self._writes_since_evict >= 1000
+            if should_evict:
+                self._writes_since_evict = 0
+        if should_evict:
+            self.evict()
+
+    def evict(self):
+        """Drop expired rows, then least-recently-used rows above max_entries"""
+        conn = self._conn()
+        removed = conn.execute("DELETE FROM segments WHERE created < ?",
+                               (time.time() - self.ttl,)).rowcount
+        count = conn.execute("SELECT COUNT(*) FROM segments").fetchone()[0]
+        if count > self.max_entries:
+            # Trim to 90% so we don't evict on every write
+            excess = count - int(self.max_entries * 0.9)
+            removed += conn.execute(
+                "DELETE FROM segments WHERE key IN "
+                "(SELECT key FROM segments ORDER BY last_used ASC LIMIT ?)", (excess,)
+            ).rowcount
+        conn.commit()
+        with self._lock:
+            self._evictions += removed
+        return removed
+
+    # --- Stats ---
+
+    def stats(self):
+        count = self._conn().execute("SELECT COUNT(*) FROM segments").fetchone()[0]
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'entries': count,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / lookups, 3) if lookups else 0.0,
+                'evictions': self._evictions,
+            }
+
+
+# ============ SHARED INSTANCE ============
+
+_memory = None
+_memory_lock = threading.Lock()
+
+def get_translation_memory():
+    """Return the shared TranslationMemory, or None when disabled/unavailable"""
+    global _memory
+    if not TM_ENABLED:
+        return None
+    if _memory is None:
+        with _memory_lock:
+            if _memory is None:
+                try:
+                    _memory = TranslationMemory()
+                except Exception as e:
+                    print(f"Translation memory unavailable: {e}")
+                    return None
+    return _memory
@@ -3,6 +3,8 @@ import os
 import re
 import time
 import csv
+import html
+import threading
 # All other imports moved inside functions
 
 # ===== GLOBAL LANGUAGES CONSTANT =====
@@ -80,18 +82,11 @@ def should_preserve(text):
         return True
     return False
 
-# ===== TRANSLATE FUNCTION USING TRANSLATORS LIBRARY =====
-def translate_text(text, target_lang, source_lang='auto', max_retries=3):
-    """Translate text with proper language handling"""
-    from deep_translator import GoogleTranslator
-    
-    if should_preserve(text):
-        return text
-    
-    # Normalize language code
+def normalize_lang_code(lang):
+    """Normalize a language code the way GoogleTranslator expects it"""
     # GoogleTranslator handles 'zh-CN', 'zh-TW', etc.
     # But for others, 2-letter is usually safer
-    target = target_lang.lower()
+    target = lang.lower()
     if '-' in target:
         parts = target.split('-')
         # Keep variants for Chinese, but for others (like pt-BR) sometimes 2-letter is enough
@@ -99,39 +94,278 @@ def translate_text(text, target_lang, source_lang='auto', max_retries=3):
             target = f"{parts[0]}-{parts[1].upper()}"
         else:
             target = parts[0]
+    return target
+
+# ===== TRANSLATION MEMORY HELPERS =====
+def memory_lookup(texts, target_lang, source_lang='auto', provider=None):
+    """Bulk-check the translation memory; returns {text: translation} for hits"""
+    from translation_memory import get_translation_memory
+    from translation_backends import get_backend
+    tm = get_translation_memory()
+    if tm is None or not texts or not get_backend(provider).cacheable:
+        return {}
+    try:
+        return tm.get_many(texts, source_lang, normalize_lang_code(target_lang))
+    except Exception as e:
+        print(f"Translation memory lookup failed: {e}")
+        return {}
+
+def memory_store(pairs, target_lang, source_lang='auto', provider=None):
+    """Remember {text: translation} pairs for future uploads"""
+    from translation_memory import get_translation_memory
+    from translation_backends import get_backend
+    tm = get_translation_memory()
+    if tm is None or not pairs or not get_backend(provider).cacheable:
+        return
+    try:
+        tm.put_many(pairs, source_lang, normalize_lang_code(target_lang))
+    except Exception as e:
+        print(f"Translation memory store failed: {e}")
+
+# ===== UNTRANSLATED SEGMENT TALLY =====
+# Failed or throttled segments come back as their source text, so a document
+# can "succeed" half-untranslated. Callers that must not keep such a result
+# (the result cache) count the failures of everything run in a with block:
+#
+#     with count_untranslated() as tally:
+#         translate_document(...)
+#     if not tally.failed: ...
+
+_tally = threading.local()
+
+class count_untranslated:
+    """Count segments translate_text/translate_segments leave untranslated in this thread"""
+    
+    def __init__(self):
+        self.failed = 0
+    
+    def __enter__(self):
+        self._previous = getattr(_tally, 'counter', None)
+        _tally.counter = self
+        return self
+    
+    def __exit__(self, *exc):
+        _tally.counter = self._previous
+        return False
+
+def _record_untranslated(count):
+    counter = getattr(_tally, 'counter', None)
+    if counter is not None and count:
+        counter.failed += count
+
+# ===== TRANSLATE FUNCTION USING TRANSLATORS LIBRARY =====
+def translate_text(text, target_lang, source_lang='auto', max_retries=3, remember=True, provider=None):
+    """Translate text with proper language handling
+    
+    remember=False skips the translation memory (used when the caller caches
+    segments itself, e.g. translate_segments).
+    provider selects a registered translation backend (default: TRANSLATION_PROVIDER).
+    """
+    result, ok = _translate_text(text, target_lang, source_lang, max_retries, remember, provider)
+    if not ok:
+        _record_untranslated(1)
+    return result
+
+def _translate_text(text, target_lang, source_lang='auto', max_retries=3, remember=True, provider=None):
+    """translate_text returning (result, whether every chunk was translated)"""
+    from translation_executor import get_translation_executor
+    from translation_backends import get_backend
+    
+    if should_preserve(text):
+        return text, True
+    
+    target = normalize_lang_code(target_lang)
+    
+    if remember:
+        cached = memory_lookup([text], target, source_lang, provider).get(text)
+        if cached:
+            return cached, True
             
     print(f"Translating to: {target}, Text length: {len(text)}")
     
     chunk_size = 4000
     chunks = [text[i:i+chunk_size] for i in range(0, len(text), chunk_size)]
-    translated_chunks = []
+    executor = get_translation_executor()
+    backend = get_backend(provider)
     
-    for chunk in chunks:
+    def translate_chunk(chunk):
         if not chunk.strip():
-            translated_chunks.append(chunk)
-            continue
-            
-        success = False
-        for attempt in range(max_retries):
-            try:
-                translator = GoogleTranslator(source=source_lang, target=target)
-                result = translator.translate(chunk)
-                if result:
-                    translated_chunks.append(result)
-                    success = True
-                    break
-                time.sleep(1.5) # Increased delay
-            except Exception as e:
-                print(f"Attempt {attempt+1} failed for '{target}': {e}")
-                time.sleep(2 * (attempt + 1))
-        
-        if not success:
+            return chunk, True
+        try:
+            return executor.call(backend.host, backend.translate, chunk, target, source_lang,
+                                 max_retries=max_retries), True
+        except Exception as e:
+            print(f"All attempts failed for '{target}': {e}")
             # Fallback to chunk if all retries fail
-            translated_chunks.append(chunk)
+            return chunk, False
+    
+    # Chunks run in parallel; map keeps them in document order
+    results = executor.map(translate_chunk, chunks)
+    translated_chunks = [chunk for chunk, _ in results]
+    all_translated = all(ok for _, ok in results)
+    
+    result = ' '.join(translated_chunks)
+    if remember and all_translated:
+        memory_store({text: result}, target, source_lang, provider)
+    return result, all_translated
+
+# ===== SEGMENT BATCHING =====
+# Many short segments are packed into one provider call as numbered tags:
+#   <s1>Total</s1>
+#   <s2>Description</s2>
+# Tags survive translation far more reliably than ad hoc separators. When some
+# tags come back mangled, only the broken segments are re-batched (bisected);
+# a segment that still fails on its own is translated individually.
+BATCH_MAX_CHARS = 3000
+BATCH_MAX_SEGMENTS = 25
+
+_SEGMENT_TAG = re.compile(r'<\s*s\s*(\d+)\s*>(.*?)<\s*/\s*s\s*\1\s*>', re.DOTALL)
+_batch_stats_lock = threading.Lock()
+_batch_stats = {
+    'segments': 0,          # Segments requested (after dedupe)
+    'memory_hits': 0,       # Served from translation memory
+    'batches': 0,           # Top-level packed batches sent
+    'provider_calls': 0,    # Calls made for batches, including retries of sub-batches
+    'bisections': 0,        # Batches split because some tags were lost
+    'single_fallbacks': 0,  # Segments translated on their own after bisection
+    'failed_segments': 0,   # Segments left untranslated
+}
+
+def _count_batch(**deltas):
+    with _batch_stats_lock:
+        for key, value in deltas.items():
+            _batch_stats[key] += value
+
+def get_batch_stats():
+    """Counters for tuning BATCH_MAX_CHARS / BATCH_MAX_SEGMENTS"""
+    with _batch_stats_lock:
+        stats = dict(_batch_stats)
+    stats['fallback_rate'] = round(stats['bisections'] / stats['batches'], 3) if stats['batches'] else 0.0
+    return stats
+
+def pack_segments(segments):
+    """Wrap segments in numbered tags (1-based) for a single provider call"""
+    return '\n'.join(f"<s{i}>{html.escape(seg, quote=False)}</s{i}>" for i, seg in enumerate(segments, 1))
+
+def unpack_segments(translated, count):
+    """Parse numbered tags back; returns a list with None for missing segments"""
+    found = {}
+    for match in _SEGMENT_TAG.finditer(translated or ''):
+        idx = int(match.group(1))
+        if 1 <= idx <= count and idx not in found:
+            found[idx] = html.unescape(match.group(2)).strip()
+    return [found.get(i) for i in range(1, count + 1)]
+
+def _make_batches(segments, max_chars=BATCH_MAX_CHARS, max_segments=BATCH_MAX_SEGMENTS):
+    batches, current, current_len = [], [], 0
+    for seg in segments:
+        if current and (current_len + len(seg) > max_chars or len(current) >= max_segments):
+            batches.append(current)
+            current, current_len = [], 0
+        current.append(seg)
+        current_len += len(seg)
+    if current:
+        batches.append(current)
+    return batches
+
+def translate_segments(segments, target_lang, source_lang='auto', provider=None,
+                       max_chars=BATCH_MAX_CHARS, max_segments=BATCH_MAX_SEGMENTS,
+                       progress_stage='Translating segments'):
+    """Translate a list of segments; returns translations in the same order.
+    
+    Segments are deduplicated, checked against the translation memory and the
+    misses are sent in packed batches concurrently. Preserved/untranslatable
+    segments come back unchanged; failed ones too, and are counted in the
+    caller's count_untranslated tally. Progress is reported per batch under
+    progress_stage (None for callers that report their own, e.g. per window).
+    """
+    from translation_executor import get_translation_executor
+    from translation_backends import get_backend
+    from progress import current_reporter
+    
+    backend = get_backend(provider)
+    executor = get_translation_executor()
+    target = normalize_lang_code(target_lang)
+    
+    unique = list(dict.fromkeys(seg for seg in segments if seg and not should_preserve(seg)))
+    translations = memory_lookup(unique, target, source_lang, provider)
+    pending = [seg for seg in unique if seg not in translations]
+    _count_batch(segments=len(unique), memory_hits=len(translations))
+    
+    def translate_one(seg):
+        _count_batch(single_fallbacks=1)
+        # Not counted in the tally here: translate_segments counts what is left over
+        # (a translation equal to its source, e.g. a name or code, is still a success)
+        result, ok = _translate_text(seg, target, source_lang, remember=False, provider=provider)
+        if not ok:
+            _count_batch(failed_segments=1)
+            return None
+        return result
+    
+    def translate_batch(batch):
+        """Returns {segment: translation} for every segment that succeeded"""
+        if len(batch) == 1 and len(batch[0]) > max_chars:
+            # Oversized segment: translate_text chunks it
+            result = translate_one(batch[0])
+            return {batch[0]: result} if result else {}
+        
+        _count_batch(provider_calls=1)
+        try:
+            if backend.native_batch:
+                results = executor.call(backend.host, backend.translate_batch, batch, target, source_lang)
+            else:
+                translated = executor.call(backend.host, backend.translate, pack_segments(batch), target, source_lang)
+                results = unpack_segments(translated, len(batch))
+        except Exception as e:
+            # Provider is failing outright (retries exhausted); splitting won't help
+            print(f"Batch of {len(batch)} failed: {e}")
+            _count_batch(failed_segments=len(batch))
+            return {}
+        
+        done = {seg: trans for seg, trans in zip(batch, results) if trans}
+        broken = [seg for seg, trans in zip(batch, results) if not trans]
+        if not broken:
+            return done
+        
+        if len(broken) == 1:
+            result = translate_one(broken[0])
+            if result:
+                done[broken[0]] = result
+            return done
+        
+        # Bisect: retry only the segments whose tags were lost
+        _count_batch(bisections=1)
+        mid = len(broken) // 2
+        for half in (broken[:mid], broken[mid:]):
+            done.update(translate_batch(half))
+        return done
     
-    return ' '.join(translated_chunks)
+    # Progress counts unique segments; memory hits are done up front
+    progress = current_reporter()
+    progress_lock = threading.Lock()
+    completed = len(translations)
+    if unique and progress_stage:
+        progress.report(completed, len(unique), progress_stage)
     
-    return ' '.join(translated_chunks)
+    def run_batch(batch):
+        nonlocal completed
+        result = translate_batch(batch)
+        if progress_stage:
+            with progress_lock:
+                completed += len(batch)
+                progress.report(completed, len(unique), progress_stage)
+        return result
+    
+    batches = _make_batches(pending, max_chars, max_segments)
+    _count_batch(batches=len(batches))
+    fresh = {}
+    for result in executor.map(run_batch, batches):
+        fresh.update(result)
+    
+    memory_store(fresh, target, source_lang, provider)
+    translations.update(fresh)
+    _record_untranslated(len(pending) - len(fresh))
+    return [translations.get(seg, seg) for seg in segments]
 
 def is_valid_translation(translated_text, target_lang, original_text=None):
     """
@@ -182,9 +416,28 @@ def is_valid_translation(translated_text, target_lang, original_text=None):
             
     return True
 
-# ===== PDF TRANSLATOR (Structural Bridge) =====
-def translate_pdf(input_path, output_path, target_lang, source_lang='auto'):
-    """Translate PDF while preserving structure using DOCX bridge"""
+# ===== PDF TRANSLATOR (In-place, then Structural Bridge) =====
+def translate_pdf(input_path, output_path, target_lang, source_lang='auto', provider=None):
+    """Translate PDF while preserving structure
+    
+    Method 1 edits the text runs in place (PyMuPDF); the DOCX bridge and the
+    plain-text fallback are kept for PDFs it cannot handle.
+    """
+    # Method 1: Layout-aware in-place translation
+    if output_path.lower().endswith('.pdf'):
+        try:
+            from pdf_translator import translate_pdf_inplace
+            
+            print(f"Starting in-place PDF translation: {input_path}")
+            success, message, res_path = translate_pdf_inplace(input_path, output_path, target_lang,
+                                                               source_lang, provider)
+            if success:
+                return success, message, res_path
+            print(f"In-place PDF translation unavailable: {message}")
+        except Exception as e:
+            print(f"In-place PDF translation failed: {e}")
+    
+    # Method 2: DOCX bridge
     try:
         from converter_universal import convert_pdf_to_docx, convert_docx_to_pdf
         
@@ -197,12 +450,12 @@ def translate_pdf(input_path, output_path, target_lang, source_lang='auto'):
         if not success_conv:
             print(f"PDF to DOCX bridge failed: {msg_conv}")
             # Fallback to simple text extraction if bridge fails
-            return translate_pdf_fallback(input_path, output_path, target_lang, source_lang)
+            return translate_pdf_fallback(input_path, output_path, target_lang, source_lang, provider)
             
         # 2. Translate the DOCX
         # We use a temporary path for the translated DOCX
         trans_docx = output_path.replace('.pdf', '.trans.docx')
-        success_trans, msg_trans, res_path = translate_docx(temp_docx, trans_docx, target_lang, source_lang)
+        success_trans, msg_trans, res_path = translate_docx(temp_docx, trans_docx, target_lang, source_lang, provider)
         
         if not success_trans:
             if os.path.exists(temp_docx): os.remove(temp_docx)
@@ -232,24 +485,24 @@ def translate_pdf(input_path, output_path, target_lang, source_lang='auto'):
         print(f"PDF bridge translation error: {e}")
         import traceback
         traceback.print_exc()
-        return translate_pdf_fallback(input_path, output_path, target_lang, source_lang)
+        return translate_pdf_fallback(input_path, output_path, target_lang, source_lang, provider)
 
-def translate_pdf_fallback(input_path, output_path, target_lang, source_lang='auto'):
+def translate_pdf_fallback(input_path, output_path, target_lang, source_lang='auto', provider=None):
     """Fallback PDF translator using simple text extraction"""
     try:
-        import pdfplumber
+        from pdf_text import iter_page_texts, page_count
         from converter_universal import convert_txt_to_pdf
+        from progress import report_progress
         
         print(f"Using fallback PDF translation: {input_path}")
         
         text_content = []
-        with pdfplumber.open(input_path) as pdf:
-            total_pages = len(pdf.pages)
-            for i, page in enumerate(pdf.pages):
-                text = page.extract_text()
-                if text and text.strip():
-                    translated = translate_text(text, target_lang, source_lang)
-                    text_content.append(translated)
+        total = page_count(input_path)
+        for page_no, text in enumerate(iter_page_texts(input_path, backend='pdfplumber'), 1):
+            if text and text.strip():
+                translated = translate_text(text, target_lang, source_lang, provider=provider)
+                text_content.append(translated)
+            report_progress(page_no, total, 'Translating pages')
         
         temp_txt = output_path.replace('.pdf', '.fallback.txt')
         with open(temp_txt, 'w', encoding='utf-8-sig') as f:
@@ -264,89 +517,67 @@ def translate_pdf_fallback(input_path, output_path, target_lang, source_lang='au
     except Exception as e:
         return False, f"Fallback translation failed: {str(e)}", None
 
-def translate_docx(input_path, output_path, target_lang, source_lang='auto'):
-    """Translate Word documents with batching to prevent timeouts/502s"""
+DOCX_TRANSLATE_MODE = os.environ.get('DOCX_TRANSLATE_MODE', 'ooxml')  # ooxml | python-docx
+
+def translate_docx(input_path, output_path, target_lang, source_lang='auto', provider=None):
+    """Translate Word documents with batching to prevent timeouts/502s
+    
+    Method 1 rewrites the text runs in the package XML (keeps tabs, breaks and
+    runs in place, covers headers, footers and footnotes); python-docx is kept
+    as fallback.
+    """
+    if DOCX_TRANSLATE_MODE == 'ooxml':
+        try:
+            from docx_translator import translate_docx_runs
+            
+            print(f"Starting run-level DOCX translation: {input_path}")
+            unique, changed = translate_docx_runs(
+                input_path, output_path,
+                lambda texts: translate_segments(texts, target_lang, source_lang, provider)
+            )
+            print(f"DOCX translation: {unique} unique texts, {changed} paragraphs updated")
+            return True, f"Word document translation completed: {changed} paragraphs translated", output_path
+        except Exception as e:
+            print(f"Run-level DOCX translation failed, using python-docx: {e}")
+    
     try:
         from docx import Document
         doc = Document(input_path)
         
-        def process_batch(paragraphs, current_batch_text, batch_indices):
-            if not current_batch_text:
-                return
-            
-            # Combine batch with a unique separator that's unlikely to be in text
-            separator = " [[[DSEP]]] "
-            combined_text = separator.join(current_batch_text)
-            
-            translated_combined = translate_text(combined_text, target_lang, source_lang)
-            # Robust split using regex to handle extra spaces added by translator
-            # Pattern matches [[[DSEP]]] with any number of surrounding spaces
-            parts = re.split(r'\s*\[\[\[DSEP\]\]\]\s*', translated_combined)
-            
-            # If split count matches, apply translations
-            if len(parts) == len(batch_indices):
-                for idx, trans in zip(batch_indices, parts):
-                    paragraphs[idx].text = trans.strip()
-            else:
-                # Fallback: translate individually if batching fails
-                for idx in batch_indices:
-                    try:
-                        paragraphs[idx].text = translate_text(paragraphs[idx].text, target_lang, source_lang).strip()
-                    except: pass
-            
-            # Anti-throttle breather
-            time.sleep(0.5)
-
-        # 1. Translate Main Paragraphs in Batches
-        all_paras = list(doc.paragraphs)
-        current_batch = []
-        current_indices = []
-        current_length = 0
+        # 1. Collect body and table-cell paragraph texts across the whole document
+        targets = []  # (paragraph, stripped text)
+        def collect_paragraphs(paragraphs):
+            for para in paragraphs:
+                text = para.text.strip()
+                if text and not should_preserve(text):
+                    targets.append((para, text))
         
-        for i, para in enumerate(all_paras):
-            text = para.text.strip()
-            if text and not should_preserve(text):
-                current_batch.append(text)
-                current_indices.append(i)
-                current_length += len(text)
-                
-                # Batch limit: ~3000 chars or 20 paragraphs
-                if current_length > 3000 or len(current_batch) >= 20:
-                    process_batch(all_paras, current_batch, current_indices)
-                    current_batch, current_indices, current_length = [], [], 0
+        seen_cells = set()  # Merged cells repeat across the grid; keyed by their XML element
+        def collect_tables(tables):
+            for table in tables:
+                for row in table.rows:
+                    for cell in row.cells:
+                        if cell._tc in seen_cells:
+                            continue
+                        seen_cells.add(cell._tc)
+                        # Paragraph by paragraph: setting cell.text would drop nested tables
+                        collect_paragraphs(cell.paragraphs)
+                        collect_tables(cell.tables)
         
-        # Process remaining
-        process_batch(all_paras, current_batch, current_indices)
+        collect_paragraphs(doc.paragraphs)
+        collect_tables(doc.tables)
         
-        # 2. Translate Tables (CRITICAL: Extract and translate while keeping structure)
-        for table in doc.tables:
-            for row in table.rows:
-                # Cells in a row can be merged; we only want to translate unique cell contents
-                cells_to_translate = []
-                seen_cells = set()
-                
-                for cell in row.cells:
-                    if cell not in seen_cells:
-                        text = cell.text.strip()
-                        if text and not should_preserve(text):
-                            cells_to_translate.append(cell)
-                        seen_cells.add(cell)
-                
-                if cells_to_translate:
-                    # Translate individually to be safest for table structure, 
-                    # but we can try small batches if there are many cells
-                    for cell in cells_to_translate:
-                        try:
-                            # Extract ALL text from cell (including multiple paragraphs)
-                            cell_text = cell.text.strip()
-                            if cell_text:
-                                cell.text = translate_text(cell_text, target_lang, source_lang).strip()
-                        except Exception as te:
-                            print(f"Cell translation error: {te}")
-                    
-                    time.sleep(0.2)
+        # 2. Translate each unique text once ("Total", "Qty"... repeat on every row),
+        # in packed batches, concurrently (rate-limited by the executor)
+        unique_texts = list(dict.fromkeys(text for _, text in targets))
+        translation_map = dict(zip(unique_texts, translate_segments(unique_texts, target_lang, source_lang, provider)))
+        print(f"DOCX translation: {len(targets)} paragraphs, {len(unique_texts)} unique texts")
         
-        doc.save(output_path)
+        # 3. Map results back; the document is only modified from this thread
+        for para, text in targets:
+            trans = translation_map.get(text)
+            if trans and trans != text:
+                para.text = trans
         
         doc.save(output_path)
         return True, "Word document translation completed", output_path
@@ -356,7 +587,9 @@ def translate_docx(input_path, output_path, target_lang, source_lang='auto'):
         traceback.print_exc()
         return False, str(e), None
 
-def translate_excel(input_path, output_path, target_lang, source_lang='auto'):
+XLSX_WRITE_MODE = os.environ.get('XLSX_WRITE_MODE', 'stream')  # stream | openpyxl
+
+def translate_excel(input_path, output_path, target_lang, source_lang='auto', provider=None):
     """Translate Excel files with Memory-Safe Global Batching (Render Free Tier optimized)"""
     import os
     import time
@@ -384,18 +617,26 @@ def translate_excel(input_path, output_path, target_lang, source_lang='auto'):
 
         print(f"Global Batching (Memory-Safe): Loading {current_input}")
         
-        # 2. SCAN PHASE: Collect all unique translatable strings using read_only mode (LIGHTWEIGHT)
-        unique_texts = set()
-        wb_scan = openpyxl.load_workbook(current_input, read_only=True)
-        for sheet in wb_scan.worksheets:
-            for row in sheet.iter_rows(values_only=True):
-                for val in row:
-                    if val and isinstance(val, str):
-                        val_clean = val.strip()
-                        if val_clean and len(val_clean) > 1 and not should_preserve(val_clean):
-                            unique_texts.add(val_clean)
-        wb_scan.close()
-        del wb_scan
+        # 2. SCAN PHASE: Collect all unique translatable strings
+        inline_sheets = None
+        if XLSX_WRITE_MODE == 'openpyxl':
+            # Every cell of every sheet, using read_only mode (LIGHTWEIGHT)
+            strings = set()
+            wb_scan = openpyxl.load_workbook(current_input, read_only=True)
+            for sheet in wb_scan.worksheets:
+                for row in sheet.iter_rows(values_only=True):
+                    for val in row:
+                        if val and isinstance(val, str):
+                            strings.add(val.strip())
+            wb_scan.close()
+            del wb_scan
+        else:
+            # Shared-strings table and inline strings only: no row iteration,
+            # and sheets without inline strings are never parsed
+            from xlsx_translator import scan_strings
+            strings, inline_sheets = scan_strings(current_input)
+        unique_texts = {val for val in strings if len(val) > 1 and not should_preserve(val)}
+        del strings
         gc.collect()
         
         text_list = sorted(list(unique_texts))
@@ -403,67 +644,46 @@ def translate_excel(input_path, output_path, target_lang, source_lang='auto'):
         print(f"Found {total_unique} unique strings to translate")
         
         # 3. TRANSLATION PHASE: Batch translate the dictionary (Smaller batches for RAM safety)
+        # translate_segments serves translation memory hits without any network call
         translation_map = {}
         if text_list:
-            current_batch = []
-            current_len = 0
-            
-            def process_text_batch(batch):
-                if not batch: return
-                sep = " ~|~ "
-                combined = sep.join(batch)
-                try:
-                    translated = translate_text(combined, target_lang, source_lang)
-                    import re
-                    parts = re.split(r'\s*~\|~\s*', translated)
-                    if len(parts) == len(batch):
-                        for orig, trans in zip(batch, parts):
-                            translation_map[orig] = trans.strip()
-                    else:
-                        # Fallback for this batch
-                        for item in batch:
-                            translation_map[item] = translate_text(item, target_lang, source_lang)
-                except:
-                    for item in batch:
-                        try: translation_map[item] = translate_text(item, target_lang, source_lang)
-                        except: translation_map[item] = item
-
-            for text in text_list:
-                current_batch.append(text)
-                current_len += len(text)
-                # Reduced batch size for RAM safety (40 -> 25)
-                if current_len > 2500 or len(current_batch) >= 25:
-                    process_text_batch(current_batch)
-                    current_batch, current_len = [], 0
-                    time.sleep(0.3)
-                    gc.collect() # Clean up after each batch
-            
-            process_text_batch(current_batch)
+            # Reduced batch size for RAM safety (2500 chars / 25 strings per call)
+            translated = translate_segments(text_list, target_lang, source_lang, provider, max_chars=2500)
+            translation_map.update(zip(text_list, translated))
+            del translated
+            gc.collect()
 
-        # 4. MAPPING PHASE: Apply translations back to workbook (Full load only for writing)
-        wb = openpyxl.load_workbook(current_input)
-        translated_cells = 0
-        for sheet in wb.worksheets:
-            for row in sheet.iter_rows():
-                for cell in row:
-                    if cell.value and isinstance(cell.value, str) and not cell.data_type == 'f':
-                        val_stripped = cell.value.strip()
-                        if val_stripped in translation_map:
-                            cell.value = translation_map[val_stripped]
-                            translated_cells += 1
-        
-        wb.save(output_path)
-        print(f"Memory-Safe Excel Fix Complete: {translated_cells} cells updated")
+        # 4. MAPPING PHASE: Apply translations back to the workbook
+        if XLSX_WRITE_MODE == 'openpyxl':
+            # Legacy full load: builds every cell object, needs RAM for the whole workbook
+            wb = openpyxl.load_workbook(current_input)
+            translated_cells = 0
+            for sheet in wb.worksheets:
+                for row in sheet.iter_rows():
+                    for cell in row:
+                        if cell.value and isinstance(cell.value, str) and not cell.data_type == 'f':
+                            val_stripped = cell.value.strip()
+                            if val_stripped in translation_map:
+                                cell.value = translation_map[val_stripped]
+                                translated_cells += 1
+            wb.save(output_path)
+            del wb
+            summary = f"{translated_cells} cells translated"
+        else:
+            # Streaming rewrite of the string parts inside the zip; everything else is copied
+            from xlsx_translator import rewrite_xlsx
+            translated_strings = rewrite_xlsx(current_input, output_path, translation_map, inline_sheets)
+            summary = f"{translated_strings} strings translated"
+        print(f"Memory-Safe Excel Fix Complete: {summary}")
         
         # Immediate cleanup
-        del wb
         del translation_map
         gc.collect()
         
         if temp_xlsx and os.path.exists(temp_xlsx):
             os.remove(temp_xlsx)
             
-        return True, f"Excel translation completed: {translated_cells} cells translated", output_path
+        return True, f"Excel translation completed: {summary}", output_path
         
     except Exception as e:
         if temp_xlsx and os.path.exists(temp_xlsx):
@@ -473,60 +693,77 @@ def translate_excel(input_path, output_path, target_lang, source_lang='auto'):
         traceback.print_exc()
         return False, f"Excel error: {str(e)}", None
 
-def translate_csv(input_path, output_path, target_lang, source_lang='auto'):
-    """Translate CSV files with row-based batching"""
+CSV_WINDOW_ROWS = 500        # Rows held in memory at once
+CSV_SEEN_LIMIT = 20000       # Per-file translations remembered across windows
+
+def translate_csv(input_path, output_path, target_lang, source_lang='auto', provider=None):
+    """Translate CSV files as a stream of row windows
+    
+    Only CSV_WINDOW_ROWS rows are held at a time. Cell strings are deduplicated
+    across each window and translated together, so provider calls grow with
+    unique text rather than row count.
+    """
+    from collections import OrderedDict
+    from progress import report_progress
     try:
-        with open(input_path, 'r', encoding='utf-8-sig') as f:
-            reader = csv.reader(f)
-            rows = list(reader)
+        seen = OrderedDict()  # Bounded LRU of translations already made for this file
+        rows_written = 0
+        
+        def flush(window, writer):
+            pending = []
+            for row in window:
+                for cell in row:
+                    if cell and cell not in seen and not should_preserve(cell):
+                        pending.append(cell)
+            pending = list(dict.fromkeys(pending))
+            if pending:
+                for text, trans in zip(pending, translate_segments(pending, target_lang, source_lang, provider,
+                                                                   progress_stage=None)):
+                    seen[text] = trans
+            for row in window:
+                new_row = []
+                for cell in row:
+                    if cell in seen:
+                        seen.move_to_end(cell)
+                        new_row.append(seen[cell])
+                    else:
+                        new_row.append(cell)
+                writer.writerow(new_row)
+            while len(seen) > CSV_SEEN_LIMIT:
+                seen.popitem(last=False)
         
-        if not rows:
+        with open(input_path, 'r', encoding='utf-8-sig', newline='') as src, \
+             open(output_path, 'w', newline='', encoding='utf-8-sig') as dst:
+            reader = csv.reader(src)
+            writer = csv.writer(dst)
+            window = []
+            for row in reader:
+                window.append(row)
+                if len(window) >= CSV_WINDOW_ROWS:
+                    flush(window, writer)
+                    rows_written += len(window)
+                    window = []
+                    report_progress(rows_written, None, 'Translating rows')
+            if window:
+                flush(window, writer)
+                rows_written += len(window)
+                report_progress(rows_written, None, 'Translating rows')
+        
+        if not rows_written:
             return True, "Empty CSV", output_path
-
-        translated_rows = []
-        for row in rows:
-            # Batch translate the entire row
-            translatable_indices = []
-            row_texts = []
-            
-            for i, cell in enumerate(row):
-                if cell and not should_preserve(cell):
-                    translatable_indices.append(i)
-                    row_texts.append(cell)
             
-            if row_texts:
-                sep = " ||| "
-                translated = translate_text(sep.join(row_texts), target_lang, source_lang)
-                parts = translated.split(sep)
-                
-                new_row = list(row)
-                if len(parts) == len(translatable_indices):
-                    for idx, trans in zip(translatable_indices, parts):
-                        new_row[idx] = trans.strip()
-                else:
-                    # Fallback
-                    for idx in translatable_indices:
-                        new_row[idx] = translate_text(row[idx], target_lang, source_lang)
-                translated_rows.append(new_row)
-            else:
-                translated_rows.append(row)
-                
-        with open(output_path, 'w', newline='', encoding='utf-8-sig') as f:
-            writer = csv.writer(f)
-            writer.writerows(translated_rows)
-            
-        return True, "CSV translation completed", output_path
+        return True, f"CSV translation completed ({rows_written} rows)", output_path
     except Exception as e:
         return False, str(e), None
 
 # ===== TEXT FILE TRANSLATOR =====
-def translate_text_file(input_path, output_path, target_lang, source_lang='auto'):
+def translate_text_file(input_path, output_path, target_lang, source_lang='auto', provider=None):
     """Translate plain text files"""
     try:
         with open(input_path, 'r', encoding='utf-8-sig') as f:
             content = f.read()
         
-        translated = translate_text(content, target_lang, source_lang)
+        translated = translate_text(content, target_lang, source_lang, provider=provider)
         
         # Force UTF-8 with BOM
         with open(output_path, 'w', encoding='utf-8-sig') as f:
@@ -540,7 +777,7 @@ def translate_text_file(input_path, output_path, target_lang, source_lang='auto'
         return False, str(e), None
 
 # ===== MAIN DISPATCHER FUNCTION =====
-def translate_document(input_path, output_path, target_lang, source_lang='auto', file_ext=None):
+def translate_document(input_path, output_path, target_lang, source_lang='auto', file_ext=None, provider=None):
     """Main dispatcher function - supports all formats"""
     if file_ext is None:
         file_ext = os.path.splitext(input_path)[1].lower()
@@ -567,7 +804,7 @@ def translate_document(input_path, output_path, target_lang, source_lang='auto',
             pypandoc.convert_file(input_path, 'docx', outputfile=temp_docx)
             
             # Translate the bridge file
-            success, message, res_path = translate_docx(temp_docx, output_path, target_lang, source_lang)
+            success, message, res_path = translate_docx(temp_docx, output_path, target_lang, source_lang, provider)
             if os.path.exists(temp_docx):
                 os.remove(temp_docx)
             return success, message, res_path
@@ -576,10 +813,46 @@ def translate_document(input_path, output_path, target_lang, source_lang='auto',
             return False, f"Legacy .doc support requires pandoc: {str(de)}", None
 
     if translator:
-        return translator(input_path, output_path, target_lang, source_lang)
+        return translator(input_path, output_path, target_lang, source_lang, provider)
     else:
         return False, f"Unsupported file type: {file_ext}", None
 
 # Backward compatibility (some files might still call translate_file)
-def translate_file(input_path, output_path, target_lang, source_lang='auto'):
-    return translate_document(input_path, output_path, target_lang, source_lang)
\ No newline at end of file
+def translate_file(input_path, output_path, target_lang, source_lang='auto', provider=None):
+    return translate_document(input_path, output_path, target_lang, source_lang, provider=provider)
+# ===== BENCHMARKING =====
+def benchmark_translation(input_paths, target_lang='fr', provider='local', output_dir=None):
+    """Run translate_document over sample files and report wall time and provider usage per file"""
+    import tempfile
+    from translation_backends import get_backend
+    
+    backend = get_backend(provider)
+    output_dir = output_dir or tempfile.mkdtemp(prefix='translate_bench_')
+    results = []
+    
+    for path in input_paths:
+        before = backend.stats()
+        output_path = os.path.join(output_dir, f"bench_{os.path.basename(path)}")
+        start = time.perf_counter()
+        success, message, _ = translate_document(path, output_path, target_lang, provider=provider)
+        elapsed = time.perf_counter() - start
+        after = backend.stats()
+        
+        results.append({
+            'file': os.path.basename(path),
+            'success': success,
+            'message': message,
+            'seconds': round(elapsed, 3),
+            'calls': after['calls'] - before['calls'],
+            'segments': after['segments'] - before['segments'],
+            'characters': after['characters'] - before['characters'],
+            'failures': after['failures'] - before['failures'],
+        })
+    return results
+
+if __name__ == '__main__':
+    # Usage: python translator_engine.py sample.docx sample.xlsx sample.csv
+    # Uses the offline 'local' provider unless TRANSLATION_PROVIDER is set
+    import sys
+    import json
+    print(json.dumps(benchmark_translation(sys.argv[1:], provider=os.environ.get('TRANSLATION_PROVIDER', 'local')), indent=2))
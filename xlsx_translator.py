@@ -0,0 +1,223 @@
+"""
+Streaming XLSX Translator
+Writes translated text back into an .xlsx without loading it as a workbook:
+the zip is copied part by part, and only the parts that hold cell text are
+rewritten on the fly:
+
+- xl/sharedStrings.xml: every <si> entry whose text has a translation
+- worksheets: inline-string cells (<is>), used by some non-Excel writers
+
+Styles, formulas, charts, drawings and every other part are copied through
+unchanged, so memory depends on the translation map, not on the cell count.
+
+The strings themselves are also collected from those parts alone
+(scan_strings): no rows are iterated, and sheets without inline strings are
+never parsed or rewritten.
+"""
+
+import os
+import re
+import html
+import shutil
+import zipfile
+import xml.etree.ElementTree as ET
+
+from progress import report_progress
+
+# ============ CONFIGURATION ============
+XLSX_STREAM_CHUNK = 1024 * 1024  # Bytes of part XML rewritten at a time
+
+CONTENT_TYPES = '[Content_Types].xml'
+SHARED_STRINGS_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml'
+WORKSHEET_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml'
+
+# ============ PART DISCOVERY ============
+
+def text_parts(archive):
+    """(shared_strings_part or None, [worksheet parts]) from [Content_Types].xml"""
+    shared, sheets = None, []
+    root = ET.fromstring(archive.read(CONTENT_TYPES))
+    for override in root:
+        if not override.tag.endswith('Override'):
+            continue
+        name = override.get('PartName', '').lstrip('/')
+        content_type = override.get('ContentType')
+        if content_type == SHARED_STRINGS_TYPE:
+            shared = name
+        elif content_type == WORKSHEET_TYPE:
+            sheets.append(name)
+    return shared, sheets
+
+# ============ RICH TEXT (<si> / <is>) ============
+# Shared-string entries and inline strings share one schema: either a single
+# <t>, or formatted runs <r><rPr/><t/></r>, optionally followed by phonetic
+# <rPh> runs that are not part of the displayed text.
+
+_PHONETIC = re.compile(r'<(?:\w+:)?rPh\b.*?</(?:\w+:)?rPh>', re.DOTALL)
+_TEXT = re.compile(r'<(?:\w+:)?t\b[^>]*?(?:/>|>(.*?)</(?:\w+:)?t>)', re.DOTALL)
+_FIRST_RUN_PROPS = re.compile(r'<(?:\w+:)?rPr\b[^>]*?(?:/>|>.*?</(?:\w+:)?rPr>)', re.DOTALL)
+_ESCAPED_CHAR = re.compile(r'_x([0-9A-Fa-f]{4})_')
+_CONTROL_CHAR = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+_START_TAG = re.compile(r'<((?:\w+:)?)(\w+)\b[^>]*>')
+
+def _element_pattern(tag):
+    name = tag.encode()
+    return re.compile(rb'<(?:\w+:)?%s\b[^>]*?(?:/>|>.*?</(?:\w+:)?%s>)' % (name, name), re.DOTALL)
+
+def _start_pattern(tag):
+    return re.compile(rb'<(?:\w+:)?%s[\s/>]' % tag.encode())
+
+def rich_text(element):
+    """Displayed text of an <si>/<is> element (str, _xHHHH_ escapes decoded)"""
+    body = _PHONETIC.sub('', element)
+    text = ''.join(html.unescape(match.group(1) or '') for match in _TEXT.finditer(body))
+    return _ESCAPED_CHAR.sub(lambda m: chr(int(m.group(1), 16)), text)
+
+def _escape(text):
+    text = html.escape(text, quote=False)
+    return _CONTROL_CHAR.sub(lambda m: f"_x{ord(m.group()):04X}_", text)
+
+def _replace_text(element, text):
+    """Same element with its text replaced; the first run's formatting is kept"""
+    start = _START_TAG.match(element)
+    prefix, tag = start.group(1), start.group(2)
+    body = f'<{prefix}t xml:space="preserve">{_escape(text)}</{prefix}t>'
+    run_props = _FIRST_RUN_PROPS.search(element)
+    if run_props:
+        body = f'<{prefix}r>{run_props.group()}{body}</{prefix}r>'
+    opening = start.group()
+    if opening.endswith('/>'):
+        opening = opening[:-2].rstrip() + '>'
+    return f'{opening}{body}</{prefix}{tag}>'
+
+def translated_element(element, translations):
+    """Rewritten element bytes, or None when its text has no translation
+
+    Lookups use the stripped text, as the scan phase does; surrounding
+    whitespace of the original is kept.
+    """
+    source = element.decode('utf-8')
+    text = rich_text(source)
+    stripped = text.strip()
+    translation = translations.get(stripped) if stripped else None
+    if not translation or translation == stripped:
+        return None
+    lead = text[:len(text) - len(text.lstrip())]
+    trail = text[len(text.rstrip()):]
+    return _replace_text(source, lead + translation + trail).encode('utf-8')
+
+# ============ STREAMING REWRITE ============
+
+def rewrite_elements(src, dst, tag, replace, chunk_size=None):
+    """Copy XML from src to dst, passing every complete <tag> element through replace
+
+    replace(element_bytes) returns new bytes or None to keep the element.
+    Everything else is written through untouched. Only the current chunk and
+    the element that straddles its end are held in memory. Returns the number
+    of elements replaced.
+    """
+    chunk_size = chunk_size or XLSX_STREAM_CHUNK
+    element, start = _element_pattern(tag), _start_pattern(tag)
+    replaced = 0
+
+    def substitute(match):
+        nonlocal replaced
+        new = replace(match.group())
+        if new is None:
+            return match.group()
+        replaced += 1
+        return new
+
+    buffer = b''
+    while True:
+        chunk = src.read(chunk_size)
+        buffer += chunk
+        if not chunk:
+            dst.write(element.sub(substitute, buffer))
+            return replaced
+        # <si>/<is> never nest, so everything before the last start tag is
+        # made of complete elements. Past a complete last element (or with no
+        # element at all) only a possibly partial tag needs holding back.
+        last = None
+        for last in start.finditer(buffer):
+            pass
+        complete = last and element.match(buffer, last.start())
+        if last and not complete:
+            cut = last.start()
+        else:
+            cut = max(complete.end() if complete else 0, buffer.rfind(b'<'))
+        if cut:
+            dst.write(element.sub(substitute, buffer[:cut]))
+            buffer = buffer[cut:]
+
+class _NullSink:
+    def write(self, data):
+        pass
+
+def scan_strings(input_path):
+    """Texts to translate, without iterating rows
+
+    Returns (unique stripped texts of the shared-strings table and inline
+    strings in first-seen order, worksheet parts that contain inline strings).
+    """
+    texts, inline_sheets = {}, []
+
+    def collect(element):
+        text = rich_text(element.decode('utf-8')).strip()
+        if text:
+            texts[text] = None
+        return element  # Counted as "replaced"; the sink discards it anyway
+
+    with zipfile.ZipFile(input_path) as archive:
+        shared, sheets = text_parts(archive)
+        parts = ([shared] if shared else []) + sheets
+        for index, part in enumerate(parts, 1):
+            with archive.open(part) as src:
+                if part == shared:
+                    rewrite_elements(src, _NullSink(), 'si', collect)
+                elif rewrite_elements(src, _NullSink(), 'is', collect):
+                    inline_sheets.append(part)
+            report_progress(index, len(parts), 'Reading strings')
+    return list(texts), inline_sheets
+
+def _copy_info(item):
+    info = zipfile.ZipInfo(item.filename, item.date_time)
+    info.compress_type = item.compress_type
+    info.external_attr = item.external_attr
+    info.file_size = item.file_size  # Lets zipfile decide on ZIP64 up front
+    return info
+
+# ============ MAIN ENTRY POINT ============
+
+def rewrite_xlsx(input_path, output_path, translations, sheets=None):
+    """Write input_path to output_path with shared and inline strings translated
+
+    translations maps stripped cell text to its translation. sheets limits the
+    worksheet parts searched for inline strings (default: all, see
+    scan_strings); the others are copied as is. Returns the number of string
+    entries replaced.
+    """
+    replace = lambda element: translated_element(element, translations)
+    replaced = 0
+
+    with zipfile.ZipFile(input_path) as zin, \
+         zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED, allowZip64=True) as zout:
+        shared, all_sheets = text_parts(zin)
+        sheets = set(all_sheets if sheets is None else sheets)
+        items = zin.infolist()
+        for index, item in enumerate(items, 1):
+            info = _copy_info(item)
+            with zin.open(item) as src:
+                if item.filename == shared:
+                    info.file_size = item.file_size * 3  # Translations may be longer
+                    with zout.open(info, 'w') as dst:
+                        replaced += rewrite_elements(src, dst, 'si', replace)
+                elif item.filename in sheets:
+                    info.file_size = item.file_size * 3
+                    with zout.open(info, 'w') as dst:
+                        replaced += rewrite_elements(src, dst, 'is', replace)
+                else:
+                    with zout.open(info, 'w') as dst:
+                        shutil.copyfileobj(src, dst, XLSX_STREAM_CHUNK)
+            report_progress(index, len(items), 'Writing workbook')
+    return replaced